@@ -10,3 +10,7 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "loefsys.settings")
 celery_app = Celery("loefsys")
 celery_app.config_from_object("django.conf:settings", namespace="CELERY")
 celery_app.autodiscover_tasks()
+celery_app.conf.beat_schedule = {
+    "prewarm-events": {"task": "loefsys.events.tasks.prewarm_events", "schedule": 60.0},
+    "draw-lotteries": {"task": "loefsys.events.tasks.draw_lotteries", "schedule": 60.0},
+}
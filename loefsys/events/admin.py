@@ -6,16 +6,27 @@ This module defines the admin interfaces for managing events and event registrat
 
 from typing import ClassVar
 
-from django.contrib import admin
-
-from .models import Event, EventOrganizer, EventRegistration
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html_join
+from django.utils.translation import gettext_lazy as _
+
+from .export import export_response
+from .models import Event, EventOrganizer, EventRegistration, EventSeries, MemberBalance
 from .models.registration_form_field import (
     BooleanRegistrationInformation,
     DatetimeRegistrationInformation,
     IntegerRegistrationInformation,
     RegistrationFormField,
     TextRegistrationInformation,
+    prefetch_form_fields,
 )
+from .models.series import format_occurrence, parse_occurrence
 
 
 class RegistrationFormInline(admin.TabularInline):
@@ -85,18 +96,161 @@ class EventAdmin(admin.ModelAdmin):
         "cancelation_deadline",
         "price",
         "capacity",
+        "admission",
         "location",
         "category",
         "published",
     )
     inlines: ClassVar[list[type]] = [RegistrationFormInline, EventOrganizerInline]
+    actions = ("export_registrations_csv", "export_registrations_xlsx")
+
+    def _export_registrations(self, request, queryset, export_format):
+        if len(queryset) != 1:
+            self.message_user(
+                request,
+                _("Select a single event to export the registrations of."),
+                messages.WARNING,
+            )
+            return None
+        return export_response(queryset[0], export_format)
+
+    @admin.action(description=_("Export registrations (CSV)"))
+    def export_registrations_csv(self, request, queryset):
+        """Export the registrations of the selected event as CSV."""
+        return self._export_registrations(request, queryset, "csv")
+
+    @admin.action(description=_("Export registrations (XLSX)"))
+    def export_registrations_xlsx(self, request, queryset):
+        """Export the registrations of the selected event as XLSX."""
+        return self._export_registrations(request, queryset, "xlsx")
+
+
+@admin.register(EventSeries)
+class EventSeriesAdmin(admin.ModelAdmin):
+    """Admin interface for series of recurring events.
+
+    The upcoming occurrences link to a view that stores the occurrence after
+    confirmation, after which it can be edited as any other event.
+    """
+
+    fields = (
+        "title",
+        "description",
+        "recurrence",
+        "first_start",
+        "duration",
+        "registration_opens",
+        "registration_closes",
+        "cancelation_closes",
+        "price",
+        "fine",
+        "capacity",
+        "admission",
+        "location",
+        "category",
+        "is_open_event",
+        "published",
+        "upcoming_occurrences",
+    )
+    readonly_fields = ("upcoming_occurrences",)
+    list_display = ("title", "recurrence", "first_start", "published")
+
+    upcoming_count = 10
+
+    def get_urls(self):  # noqa: D102
+        return [
+            path(
+                "<path:object_id>/occurrence/<str:occurrence>/",
+                self.admin_site.admin_view(self.edit_occurrence_view),
+                name="events_eventseries_occurrence",
+            ),
+            *super().get_urls(),
+        ]
+
+    def edit_occurrence_view(self, request, object_id, occurrence):
+        """Store an occurrence and redirect to the page to edit it.
+
+        An occurrence that isn't stored yet is only stored on a confirmed POST, so that
+        following the link doesn't create an event.
+        """
+        series = get_object_or_404(EventSeries, pk=object_id)
+        if not self.has_change_permission(request, series):
+            raise Http404
+        try:
+            start = parse_occurrence(occurrence)
+        except ValueError as error:
+            raise Http404 from error
+        if not series.is_occurrence(start):
+            raise Http404
+        if event := series.events.filter(occurrence=start).first():
+            return redirect("admin:events_event_change", event.pk)
+        if request.method != "POST":
+            return TemplateResponse(
+                request,
+                "admin/events/eventseries/occurrence_confirmation.html",
+                {
+                    **self.admin_site.each_context(request),
+                    "opts": self.opts,
+                    "object": series,
+                    "occurrence": start,
+                    "title": _("Store occurrence"),
+                },
+            )
+        event = series.materialize(start)
+        return redirect("admin:events_event_change", event.pk)
+
+    @admin.display(description=_("Upcoming occurrences"))
+    def upcoming_occurrences(self, obj):
+        """Show the upcoming occurrences, linking to the page to edit them."""
+        if obj.pk is None:
+            return "-"
+        starts = obj.get_occurrences(timezone.now(), None)[: self.upcoming_count]
+        return format_html_join(
+            "",
+            '<div><a href="{}">{}</a></div>',
+            (
+                (
+                    reverse(
+                        "admin:events_eventseries_occurrence",
+                        args=(obj.pk, format_occurrence(start)),
+                    ),
+                    timezone.localtime(start).strftime("%Y-%m-%d %H:%M"),
+                )
+                for start in starts
+            ),
+        )
+
+
+class EventRegistrationChangeList(ChangeList):
+    """Change list loading the answers of all registrations on the page at once."""
+
+    def get_results(self, request):  # noqa: D102
+        super().get_results(request)
+        prefetch_form_fields(self.result_list)
 
 
 @admin.register(EventRegistration)
 class EventRegistrationAdmin(admin.ModelAdmin):
     """Admin interface for managing event registrations."""
 
-    list_display = ("__str__", "status")
+    list_display = ("__str__", "status", "answers")
+    list_filter = ("event",)
+    list_select_related = ("event", "contact")
+
+    def get_changelist(self, request, **kwargs):  # noqa: ARG002 D102
+        return EventRegistrationChangeList
+
+    @admin.display(description=_("Answers"))
+    def answers(self, obj):
+        """Show the answers of the registration on the registration form."""
+        return format_html_join(
+            "",
+            "<div>{}: {}</div>",
+            (
+                (field.subject, "-" if value is None else value)
+                for field, value in obj.form_fields
+            ),
+        )
 
     inlines = (
         BooleanRegistrationInformationInline,
@@ -109,3 +263,51 @@ class EventRegistrationAdmin(admin.ModelAdmin):
 @admin.register(RegistrationFormField)
 class RegistrationFormAdmin(admin.ModelAdmin):
     """Admin interface for managing registration form fields."""
+
+
+class OutstandingFilter(admin.SimpleListFilter):
+    """Filter for balances on whether an amount is outstanding."""
+
+    title = _("outstanding")
+    parameter_name = "outstanding"
+
+    def lookups(self, request, model_admin):  # noqa: ARG002 D102
+        return (
+            ("debt", _("To pay")),
+            ("credit", _("Paid too much")),
+            ("settled", _("Settled")),
+        )
+
+    def queryset(self, request, queryset):  # noqa: ARG002 D102
+        match self.value():
+            case "debt":
+                return queryset.filter(outstanding__gt=0)
+            case "credit":
+                return queryset.filter(outstanding__lt=0)
+            case "settled":
+                return queryset.filter(outstanding=0)
+        return queryset
+
+
+@admin.register(MemberBalance)
+class MemberBalanceAdmin(admin.ModelAdmin):
+    """Report of the outstanding balances of the event costs of users.
+
+    The balances are read from the rollup, so the report doesn't sum over the
+    registrations. They are maintained with the registrations and can't be edited.
+    """
+
+    list_display = ("user", "costs", "paid", "outstanding")
+    list_filter = (OutstandingFilter,)
+    list_select_related = ("user",)
+    search_fields = ("user__email", "user__first_name", "user__last_name")
+    ordering = ("-outstanding",)
+
+    def has_add_permission(self, request):  # noqa: ARG002 D102
+        return False
+
+    def has_change_permission(self, request, obj=None):  # noqa: ARG002 D102
+        return False
+
+    def has_delete_permission(self, request, obj=None):  # noqa: ARG002 D102
+        return False
@@ -7,3 +7,11 @@ class EventsConfig(AppConfig):
     """The app configuration for the events."""
 
     name = "loefsys.events"
+
+    def ready(self):
+        """Run when Django starts."""
+        # The signals use the models, which can't be imported before the app
+        # registry is ready.
+        from . import signals  # noqa: PLC0415
+
+        return signals
@@ -0,0 +1,247 @@
+"""Module containing the benchmark of the registration protocol.
+
+The benchmark seeds an event with thousands of registrations, of which half are
+queued, and measures the requests of the registration protocol against it:
+
+``register``
+    A new user registers for the full event, and is queued.
+``cancel``
+    An admitted user cancels, after which the first queued registration is promoted.
+``detail``
+    An admitted user views the page of the event.
+``form``
+    An admitted user submits the registration form.
+
+For each scenario, the duration and the number of queries of the requests are
+recorded. All data is created in a transaction that is rolled back afterwards, so the
+benchmark can be run against a copy of the production database. The results can be
+compared with those of an earlier run, see :func:`compare_results`.
+"""
+
+import statistics
+import time
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Event, EventRegistration, RegistrationFormField
+from .models.choices import EventCategories, RegistrationStatus
+from .models.managers import actual_registration_counters
+
+SCENARIOS = ("register", "cancel", "detail", "form")
+"""The scenarios of the benchmark, in the order in which they are run."""
+
+
+def _seed(registrations: int, iterations: int) -> tuple[Event, list, list]:
+    """Create the event, its registrations and the users of the benchmark.
+
+    Returns the event, the users that are admitted to it and the users that aren't
+    registered yet.
+    """
+    now = timezone.now()
+    event = Event.objects.create(
+        title="Registration benchmark",
+        start=now + timedelta(days=14),
+        end=now + timedelta(days=15),
+        registration_start=now - timedelta(days=1),
+        registration_deadline=now + timedelta(days=7),
+        cancelation_deadline=now + timedelta(days=7),
+        category=EventCategories.OTHER,
+        capacity=max(registrations // 2, 2 * iterations),
+        location="Benchmark",
+        published=True,
+    )
+    RegistrationFormField.objects.create(
+        event=event, type=RegistrationFormField.TEXT_FIELD, subject="Diet"
+    )
+    RegistrationFormField.objects.create(
+        event=event, type=RegistrationFormField.BOOLEAN_FIELD, subject="Car"
+    )
+
+    user_model = get_user_model()
+    users = []
+    for index in range(registrations + iterations):
+        user = user_model(
+            email=f"benchmark-{event.pk}-{index}@example.com",
+            first_name="Benchmark",
+            last_name=str(index),
+        )
+        user.set_unusable_password()
+        users.append(user)
+    users = user_model.objects.bulk_create(users, batch_size=500)
+
+    EventRegistration.objects.bulk_create(
+        (
+            EventRegistration(
+                event=event,
+                contact=user,
+                status=(
+                    RegistrationStatus.ACTIVE
+                    if index < event.capacity
+                    else RegistrationStatus.QUEUED
+                ),
+                price_at_registration=event.price,
+                fine_at_registration=event.fine,
+                costs_paid=0,
+            )
+            for index, user in enumerate(users[:registrations])
+        ),
+        batch_size=500,
+    )
+    Event.objects.filter(pk=event.pk).update(**actual_registration_counters())
+    event.refresh_from_db()
+    return event, users[: event.capacity], users[registrations:]
+
+
+def _request(event, scenario):
+    """Get the method, URL and data of the request of a scenario."""
+    event_url = reverse("events:event", kwargs={"slug": event.slug})
+    match scenario:
+        case "register":
+            return "post", event_url, {"action": "register"}
+        case "cancel":
+            return "post", event_url, {"action": "cancel"}
+        case "detail":
+            return "get", event_url, {}
+        case "form":
+            fields = event.registrationformfield_set.order_by("pk")
+            return (
+                "post",
+                reverse("events:registration", kwargs={"slug": event.slug}),
+                {
+                    str(field.pk): "on"
+                    if field.type == RegistrationFormField.BOOLEAN_FIELD
+                    else "Vegan"
+                    for field in fields
+                },
+            )
+    raise ValueError(f"Unknown scenario {scenario}.")
+
+
+def _summarize(durations: list[float], queries: list[int]) -> dict:
+    """Summarize the measurements of the requests of a scenario."""
+    durations = sorted(duration * 1000 for duration in durations)
+    return {
+        "median_ms": round(statistics.median(durations), 3),
+        "p95_ms": round(
+            durations[min(len(durations) - 1, len(durations) * 95 // 100)], 3
+        ),
+        "mean_ms": round(statistics.fmean(durations), 3),
+        "queries": max(queries),
+    }
+
+
+def run_benchmark(
+    registrations: int = 2000,
+    iterations: int = 25,
+    scenarios: tuple[str, ...] = SCENARIOS,
+) -> dict:
+    """Run the benchmark of the registration protocol.
+
+    Parameters
+    ----------
+    registrations : int
+        The number of registrations to seed the event with, at least twice the number
+        of iterations. Half of them are admitted and half are queued.
+    iterations : int
+        The number of requests to measure for each scenario. Each request is made by
+        a different user.
+    scenarios : tuple of str
+        The scenarios to run, see :data:`SCENARIOS`.
+
+    Returns
+    -------
+    dict
+        The results, with for each scenario the median, 95th percentile and mean
+        duration in milliseconds, and the maximum number of queries of a request.
+
+    Raises
+    ------
+    ValueError
+        If there are too few registrations for the number of iterations.
+    """
+    if registrations < 2 * iterations:
+        raise ValueError("There must be at least two registrations per iteration.")
+
+    results = {}
+    # The test client is used outside the tests, where it isn't an allowed host.
+    hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+    with override_settings(ALLOWED_HOSTS=hosts), transaction.atomic():
+        event, admitted, new_users = _seed(registrations, iterations)
+        for scenario in scenarios:
+            method, url, data = _request(event, scenario)
+            # Each cancellation removes an admitted user, so the users of the other
+            # scenarios are taken from the end of the list.
+            users = (
+                admitted[:iterations]
+                if scenario == "cancel"
+                else new_users
+                if scenario == "register"
+                else admitted[-iterations:]
+            )
+            durations, queries = [], []
+            for user in users:
+                client = Client()
+                client.force_login(user)
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(url, data)
+                    durations.append(time.perf_counter() - start)
+                if response.status_code >= HTTPStatus.BAD_REQUEST:
+                    raise RuntimeError(
+                        f"The {scenario} request failed with {response.status_code}."
+                    )
+                queries.append(len(context))
+            results[scenario] = _summarize(durations, queries)
+        transaction.set_rollback(True)
+
+    return {
+        "database": connection.vendor,
+        "registrations": registrations,
+        "iterations": iterations,
+        "scenarios": results,
+    }
+
+
+def compare_results(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Compare the results of the benchmark with a baseline.
+
+    A scenario has regressed when its median duration exceeds that of the baseline by
+    more than the threshold, or when it makes more queries. Scenarios that are missing
+    from either side are not compared.
+
+    Parameters
+    ----------
+    results : dict
+        The results of :func:`run_benchmark`.
+    baseline : dict
+        The results of an earlier run.
+    threshold : float
+        The allowed relative increase of the median duration, such as ``0.2`` for 20%.
+
+    Returns
+    -------
+    list of str
+        A description of each regression.
+    """
+    regressions = []
+    for scenario, result in results["scenarios"].items():
+        if (base := baseline.get("scenarios", {}).get(scenario)) is None:
+            continue
+        if result["median_ms"] > base["median_ms"] * (1 + threshold):
+            regressions.append(
+                f"{scenario}: median {result['median_ms']:.1f} ms exceeds "
+                f"{base['median_ms']:.1f} ms by more than {threshold:.0%}"
+            )
+        if result["queries"] > base["queries"]:
+            regressions.append(
+                f"{scenario}: {result['queries']} queries instead of {base['queries']}"
+            )
+    return regressions
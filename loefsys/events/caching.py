@@ -0,0 +1,248 @@
+"""Module containing the cache helpers for the events app.
+
+Responses that are requested often, such as the data for the calendar and the iCal
+feeds, are cached. The cache entries are keyed on the timestamps of the last change to
+the data they are derived from, so that saving an event or a registration implicitly
+invalidates all derived entries. The timestamps are bumped by the signal handlers in
+:mod:`loefsys.events.signals`. They are stored in the default cache, which is shared
+by all processes through Redis, see ``DJANGO_CACHE_URL``, so that a change handled
+by one process invalidates the entries of the others.
+
+Events of which the registration opens shortly are pre-warmed by the task
+:func:`~loefsys.events.tasks.prewarm_events`. The event and its registration form
+fields are then cached, and the event is marked as *hot*: the rush of registrations
+right after opening takes the event from the cache instead of the database.
+"""
+
+import hashlib
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Event, EventRegistration, RegistrationFormField
+
+EVENTS_MODIFIED_KEY = "events:modified"
+
+
+def _registrations_modified_key(user_pk: int) -> str:
+    return f"events:registrations:modified:{user_pk}"
+
+
+def _last_modified(key: str, compute: Callable[[], datetime | None]) -> datetime:
+    """Get a timestamp from the cache, computing it from the database on a miss."""
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = (compute() or timezone.now()).replace(microsecond=0)
+        cache.set(key, stamp, timeout=None)
+    return stamp
+
+
+def _touch(key: str) -> None:
+    """Bump a timestamp in the cache to the current time."""
+    # HTTP dates have a resolution of a second, so a change within the same second
+    # still has to result in a new timestamp.
+    stamp = timezone.now().replace(microsecond=0)
+    previous = cache.get(key)
+    if previous is not None and stamp <= previous:
+        stamp = previous + timedelta(seconds=1)
+    cache.set(key, stamp, timeout=None)
+
+
+def events_last_modified() -> datetime:
+    """Get the timestamp of the last change to any event.
+
+    Returns
+    -------
+    ~datetime.datetime
+        The timestamp of the last change.
+    """
+    return _last_modified(
+        EVENTS_MODIFIED_KEY,
+        lambda: Event.objects.aggregate(Max("modified"))["modified__max"],
+    )
+
+
+def touch_events() -> None:
+    """Mark the events as changed, invalidating all cache entries derived from them.
+
+    Returns
+    -------
+    None
+    """
+    _touch(EVENTS_MODIFIED_KEY)
+
+
+def registrations_last_modified(user_pk: int) -> datetime:
+    """Get the timestamp of the last change to the registrations of a user.
+
+    Parameters
+    ----------
+    user_pk : int
+        The primary key of the user.
+
+    Returns
+    -------
+    ~datetime.datetime
+        The timestamp of the last change.
+    """
+    return _last_modified(
+        _registrations_modified_key(user_pk),
+        lambda: EventRegistration.objects.filter(contact_id=user_pk).aggregate(
+            Max("modified")
+        )["modified__max"],
+    )
+
+
+def touch_registrations(user_pk: int) -> None:
+    """Mark the registrations of a user as changed.
+
+    This invalidates the cache entries specific to that user only.
+
+    Parameters
+    ----------
+    user_pk : int
+        The primary key of the user.
+
+    Returns
+    -------
+    None
+    """
+    _touch(_registrations_modified_key(user_pk))
+
+
+def calendar_cache_key(start: datetime | None, end: datetime | None) -> str:
+    """Get the cache key of the calendar data for the given window.
+
+    Parameters
+    ----------
+    start : ~datetime.datetime, None
+        The start of the window, or ``None`` if the window is unbounded.
+    end : ~datetime.datetime, None
+        The end of the window, or ``None`` if the window is unbounded.
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    window = "|".join(stamp.isoformat() if stamp else "" for stamp in (start, end))
+    return f"events:calendar:{events_last_modified().timestamp():.0f}:{window}"
+
+
+def feed_last_modified(user_pk: int | None) -> datetime:
+    """Get the timestamp of the last change to the data of the feeds of a user.
+
+    Parameters
+    ----------
+    user_pk : int, None
+        The primary key of the user, or ``None`` for the feed of all events.
+
+    Returns
+    -------
+    ~datetime.datetime
+        The timestamp of the last change.
+    """
+    stamp = events_last_modified()
+    if user_pk is None:
+        return stamp
+    return max(stamp, registrations_last_modified(user_pk))
+
+
+def feed_cache_key(name: str, user_pk: int | None) -> str:
+    """Get the cache key of a rendered feed.
+
+    Parameters
+    ----------
+    name : str
+        The name of the feed.
+    user_pk : int, None
+        The primary key of the user, or ``None`` for the feed of all events.
+
+    Returns
+    -------
+    str
+        The cache key.
+    """
+    stamps = [events_last_modified()]
+    if user_pk is not None:
+        stamps.append(registrations_last_modified(user_pk))
+    version = ":".join(f"{stamp.timestamp():.0f}" for stamp in stamps)
+    return f"events:feed:{name}:{user_pk or 'all'}:{version}"
+
+
+def etag_for(key: str) -> str:
+    """Compute an ETag for the cache entry with the given key.
+
+    Parameters
+    ----------
+    key : str
+        The cache key, which changes whenever the content changes.
+
+    Returns
+    -------
+    str
+        The unquoted ETag.
+    """
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def _hot_event_key(slug: str) -> str:
+    return f"events:hot:{slug}"
+
+
+def warm_event(event: Event, until: datetime) -> None:
+    """Cache an event with its form fields and mark it as hot.
+
+    The event is stored in the default cache, so that it is hot for all web processes
+    and not only for the worker that warmed it.
+
+    Parameters
+    ----------
+    event : ~loefsys.events.models.event.Event
+        The event to cache.
+    until : ~datetime.datetime
+        The moment at which the event is no longer hot.
+
+    Returns
+    -------
+    None
+    """
+    fields = list(event.registrationformfield_set.all())
+    event.form_fields_exist = bool(fields)
+    timeout = (until - timezone.now()).total_seconds()
+    if timeout > 0:
+        cache.set(
+            _hot_event_key(event.slug),
+            (events_last_modified(), event, fields),
+            timeout=timeout,
+        )
+
+
+def get_hot_event(slug: str) -> tuple[Event, list[RegistrationFormField]] | None:
+    """Get a hot event with its form fields from the cache.
+
+    The cached event is only returned when no event has changed since it was cached.
+    Its registration counters may be outdated, so capacity decisions must still be
+    made while holding the lock of the event, which reloads them.
+
+    Parameters
+    ----------
+    slug : str
+        The slug of the event.
+
+    Returns
+    -------
+    tuple of ~loefsys.events.models.event.Event and list of \
+            ~loefsys.events.models.registration_form_field.RegistrationFormField, None
+        The event and its form fields, or ``None`` if the event isn't hot.
+    """
+    entry = cache.get(_hot_event_key(slug))
+    if entry is None:
+        return None
+    stamp, event, fields = entry
+    if stamp != events_last_modified():
+        return None
+    return event, fields
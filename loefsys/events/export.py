@@ -0,0 +1,284 @@
+"""Module containing the export of the registrations of an event.
+
+The registrations of an event are exported with the contact details, the status, the
+costs and the answers to the registration form, with one column per form field in the
+order of the form. The exports are streamed, so that the registrations are read from
+the database in chunks while the response is being sent. This keeps the memory usage
+flat, also for events with thousands of registrations.
+
+Both CSV and XLSX exports are supported. The XLSX file is a minimal SpreadsheetML
+workbook with a single sheet, written directly into a streamed ZIP archive.
+"""
+
+import csv
+import re
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from decimal import Decimal
+from itertools import batched
+from typing import Any
+from xml.sax.saxutils import escape
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .models import Event, RegistrationFormField
+from .models.choices import RegistrationStatus
+
+EXPORT_CHUNK_SIZE = 500
+"""The number of registrations that are read from the database at once."""
+
+EXPORT_FORMATS = ("csv", "xlsx")
+"""The supported formats of the export."""
+
+
+def export_rows(event: Event) -> Iterator[list[Any]]:
+    """Generate the rows of the export of the registrations of an event.
+
+    The registrations are read with a server-side cursor, where the database supports
+    it, in chunks of :data:`EXPORT_CHUNK_SIZE`. The answers are loaded per chunk with
+    :meth:`~loefsys.events.models.registration_form_field.RegistrationFormField.get_values`.
+
+    Parameters
+    ----------
+    event : ~loefsys.events.models.event.Event
+        The event to export the registrations of.
+
+    Yields
+    ------
+    list
+        The header, followed by a row for each registration.
+    """
+    fields = list(event.registrationformfield_set.all())
+    yield [
+        _("Name"),
+        _("Email"),
+        _("Phone number"),
+        _("Status"),
+        _("Registered at"),
+        _("Costs"),
+        _("Costs paid"),
+        *(field.subject for field in fields),
+    ]
+
+    registrations = (
+        event.eventregistration_set.select_related("contact")
+        .order_by("created", "pk")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    for chunk in batched(registrations, EXPORT_CHUNK_SIZE):
+        values = RegistrationFormField.get_values(chunk, fields)
+        for registration in chunk:
+            contact = registration.contact
+            yield [
+                contact.full_name if contact else "",
+                contact.email if contact else "",
+                str(contact.phone_number) if contact else "",
+                RegistrationStatus(registration.status).label,
+                registration.created,
+                registration.costs,
+                registration.costs_paid,
+                *(values.get((registration.pk, field.pk)) for field in fields),
+            ]
+
+
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+"""The first characters that make spreadsheet programs read a text as a formula."""
+
+
+def _format_value(value: Any) -> Any:
+    """Convert a value to its representation in the CSV file."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime("%Y-%m-%d %H:%M")
+    return value
+
+
+def _escape_formula(value: Any) -> Any:
+    """Prefix a text with a quote if spreadsheet programs would read it as a formula.
+
+    This only applies to CSV files, as the text cells of an XLSX file are never
+    evaluated.
+    """
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class _Echo:
+    """Pseudo-buffer returning what is written, to stream the output of a writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows: Iterable[list[Any]]) -> Iterator[str]:
+    """Write the rows as CSV, line by line.
+
+    Parameters
+    ----------
+    rows : ~collections.abc.Iterable of list
+        The rows to write.
+
+    Yields
+    ------
+    str
+        A line of the CSV file.
+    """
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([_escape_formula(_format_value(value)) for value in row])
+
+
+class _ZipBuffer:
+    """Unseekable output of a ZIP archive, collecting the bytes written so far.
+
+    The absence of ``seek`` makes :class:`~zipfile.ZipFile` write the archive
+    sequentially, which allows the archive to be streamed.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        if data:
+            self.chunks.append(bytes(data))
+            self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+_SPREADSHEETML = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_RELATIONSHIPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PACKAGE_RELATIONSHIPS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+_XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        f'ContentType="{_CONTENT_TYPE}.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        f'ContentType="{_CONTENT_TYPE}.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        f'<Relationships xmlns="{_PACKAGE_RELATIONSHIPS}">'
+        f'<Relationship Id="rId1" Type="{_RELATIONSHIPS}/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        f'<workbook xmlns="{_SPREADSHEETML}" xmlns:r="{_RELATIONSHIPS}">'
+        '<sheets><sheet name="Registrations" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        f'<Relationships xmlns="{_PACKAGE_RELATIONSHIPS}">'
+        f'<Relationship Id="rId1" Type="{_RELATIONSHIPS}/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
+
+_ILLEGAL_XML_CHARACTERS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_cell(value: Any) -> str:
+    """Convert a value to a cell of a SpreadsheetML sheet."""
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int | float | Decimal):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_ILLEGAL_XML_CHARACTERS.sub("", str(_format_value(value))))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(rows: Iterable[list[Any]]) -> Iterator[bytes]:
+    """Write the rows as an XLSX workbook, in chunks of compressed bytes.
+
+    Parameters
+    ----------
+    rows : ~collections.abc.Iterable of list
+        The rows to write.
+
+    Yields
+    ------
+    bytes
+        The next part of the XLSX file.
+    """
+    buffer = _ZipBuffer()
+    with ZipFile(buffer, "w", compression=ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, _XML_HEADER + content)
+        yield buffer.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                f'{_XML_HEADER}<worksheet xmlns="{_SPREADSHEETML}"><sheetData>'.encode()
+            )
+            for row in rows:
+                cells = "".join(_xlsx_cell(value) for value in row)
+                sheet.write(f"<row>{cells}</row>".encode())
+                if buffer.chunks:
+                    yield buffer.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield buffer.drain()
+
+
+def export_response(event: Event, export_format: str) -> StreamingHttpResponse:
+    """Create a streaming response with the export of the registrations of an event.
+
+    Parameters
+    ----------
+    event : ~loefsys.events.models.event.Event
+        The event to export the registrations of.
+    export_format : str
+        The format of the export, one of :data:`EXPORT_FORMATS`.
+
+    Returns
+    -------
+    ~django.http.StreamingHttpResponse
+        The response streaming the export as an attachment.
+
+    Raises
+    ------
+    ValueError
+        If the format is not supported.
+    """
+    rows = export_rows(event)
+    match export_format:
+        case "xlsx":
+            response = StreamingHttpResponse(
+                stream_xlsx(rows), content_type=f"{_CONTENT_TYPE}.sheet"
+            )
+        case "csv":
+            response = StreamingHttpResponse(
+                stream_csv(rows), content_type="text/csv; charset=utf-8"
+            )
+        case _:
+            raise ValueError(f"Unsupported export format: {export_format}")
+    response["Content-Disposition"] = (
+        f'attachment; filename="{event.slug}-registrations.{export_format}"'
+    )
+    return response
@@ -1,37 +1,60 @@
 """iCalendar feed generation for Loefbijter events."""
 
-from django.db.models import Q
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django_ical.views import ICalFeed
 
-from loefsys.events.models import Event
+from loefsys.events.models import Event, EventSeries
 from loefsys.events.models.feed_token import FeedToken
 
+from .caching import etag_for, feed_cache_key, feed_last_modified
 
-class RegisteredEventFeed(ICalFeed):
-    """Generates an iCalendar feed for events the user is registered for."""
 
-    product_id = "-//Loefsys//RegisteredEventCalendar//"
-    timezone = "Europe/Amsterdam"
-    title = "Registered Loefbijter Events"
+class EventFeed(ICalFeed):
+    """Base class for the iCalendar feeds of events.
 
-    def __call__(self, request, *args, **kwargs):  # noqa: D102
-        if "u" in request.GET:
-            self.user = FeedToken.get_user(request.GET["u"])
-        else:
-            self.user = None
+    The feeds are personalized with the token in the query parameter ``u``. Calendar
+    clients poll the feeds often, so the rendered feed is cached per user, or once for
+    all events when no user is given. The cached feed is regenerated only after an
+    event or a registration of that user has changed. Requests with ``If-None-Match``
+    or ``If-Modified-Since`` receive a ``304 Not Modified`` if the feed is unchanged.
+    """
 
-        return super().__call__(request, args, kwargs)
+    name = ""
+    """The name of the feed, used in the cache key."""
 
-    def file_name(self):  # noqa: D102
-        return "LoefbijterRegistered.ics"
-
-    def items(self):  # noqa: D102
-        query = Q(published=True)
-
-        if self.user:
-            query &= Q(eventregistration__contact=self.user)
+    timezone = "Europe/Amsterdam"
 
-        return Event.objects.filter(query).order_by("-start")
+    def __call__(self, request, *args, **kwargs):  # noqa: D102
+        user_pk = self.get_object(request)
+        key = feed_cache_key(self.name, user_pk)
+        etag = quote_etag(etag_for(key))
+        last_modified = int(feed_last_modified(user_pk).timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            content = cache.get(key)
+            if content is None:
+                content = super().__call__(request, *args, **kwargs).content
+                cache.set(key, content)
+            response = HttpResponse(content, content_type=self.feed_type.mime_type)
+            response["Content-Disposition"] = (
+                f'attachment; filename="{self.file_name()}"'
+            )
+
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def get_object(self, request, *args, **kwargs):  # noqa: ARG002
+        """Get the primary key of the user of the token, if any."""
+        if "u" in request.GET:
+            return FeedToken.get_user_pk(request.GET["u"])
+        return None
 
     def item_title(self, item):  # noqa: D102
         return item.title
@@ -52,46 +75,45 @@ class RegisteredEventFeed(ICalFeed):
         return item.get_absolute_url()
 
 
-class OtherEventFeed(ICalFeed):
-    """Generates an iCalendar feed for events the user is not registered for."""
-
-    product_id = "-//Loefsys//OtherEventCalendar//"
-    timezone = "Europe/Amsterdam"
-    title = "Other Loefbijter Events"
-
-    def __call__(self, request, *args, **kwargs):  # noqa: D102
-        if "u" in request.GET:
-            self.user = FeedToken.get_user(request.GET["u"])
-        else:
-            self.user = None
+class RegisteredEventFeed(EventFeed):
+    """Generates an iCalendar feed for events the user is registered for."""
 
-        return super().__call__(request, args, kwargs)
+    name = "registered"
+    product_id = "-//Loefsys//RegisteredEventCalendar//"
+    title = "Registered Loefbijter Events"
 
     def file_name(self):  # noqa: D102
-        return "LoefbijterOther.ics"
+        return "LoefbijterRegistered.ics"
 
-    def items(self):  # noqa: D102
-        query = Q(published=True)
+    def items(self, user_pk):  # noqa: D102
+        events = Event.objects.published()
+        if user_pk:
+            events = events.filter(eventregistration__contact_id=user_pk)
 
-        if self.user:
-            query &= ~Q(eventregistration__contact=self.user)
+        return events.order_by("-start")
 
-        return Event.objects.filter(query).order_by("-start")
 
-    def item_title(self, item):  # noqa: D102
-        return item.title
+class OtherEventFeed(EventFeed):
+    """Generates an iCalendar feed for events the user is not registered for.
 
-    def item_description(self, item):  # noqa: D102
-        return item.description
+    The feed includes the occurrences of series of recurring events that aren't stored
+    yet, up to :data:`~loefsys.events.models.series.OCCURRENCE_HORIZON` ahead.
+    """
 
-    def item_start_datetime(self, item):  # noqa: D102
-        return item.start
+    name = "other"
+    product_id = "-//Loefsys//OtherEventCalendar//"
+    title = "Other Loefbijter Events"
 
-    def item_end_datetime(self, item):  # noqa: D102
-        return item.end
+    def file_name(self):  # noqa: D102
+        return "LoefbijterOther.ics"
 
-    def item_location(self, item):  # noqa: D102
-        return item.location
+    def items(self, user_pk):  # noqa: D102
+        events = Event.objects.published()
+        if user_pk:
+            events = events.exclude(eventregistration__contact_id=user_pk)
 
-    def item_link(self, item):  # noqa: D102
-        return item.get_absolute_url()
+        return sorted(
+            [*events, *EventSeries.objects.occurrences(None, None)],
+            key=lambda event: event.start,
+            reverse=True,
+        )
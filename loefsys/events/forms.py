@@ -46,5 +46,4 @@ class EventFieldsForm(forms.Form):
     def field_values(self):
         """Get field values."""
         for pk, field in self.form_fields:
-            registration_form_field = RegistrationFormField.objects.get(id=pk)
-            yield pk, self.cleaned_data.get(str(pk), registration_form_field.default)
+            yield pk, self.cleaned_data.get(str(pk), field["default"])
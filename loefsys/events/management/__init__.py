@@ -0,0 +1 @@
+"""Management utilities for the events app."""
@@ -0,0 +1,82 @@
+"""Management command to benchmark the registration protocol."""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loefsys.events.benchmark import SCENARIOS, compare_results, run_benchmark
+
+
+class Command(BaseCommand):
+    """Benchmark the registration protocol and compare it with a baseline.
+
+    The results are written as JSON, to standard output or to a file. When a baseline
+    from an earlier run is given, the command fails if any scenario has regressed, see
+    :func:`~loefsys.events.benchmark.compare_results`. The benchmark data is rolled
+    back afterwards.
+    """
+
+    help = "Benchmark registering, cancelling, the event page and the form."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            "--registrations",
+            type=int,
+            default=2000,
+            help="The number of registrations to seed the event with.",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=25,
+            help="The number of requests to measure for each scenario.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=SCENARIOS,
+            dest="scenarios",
+            help="A scenario to run. By default, all scenarios are run.",
+        )
+        parser.add_argument("--output", type=Path, help="The file for the results.")
+        parser.add_argument(
+            "--baseline", type=Path, help="The results of an earlier run to compare."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="The allowed relative increase of the median duration.",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002 D102
+        baseline = None
+        if options["baseline"]:
+            try:
+                baseline = json.loads(options["baseline"].read_text())
+            except (OSError, ValueError) as error:
+                raise CommandError(f"Unable to read the baseline: {error}") from error
+
+        try:
+            results = run_benchmark(
+                options["registrations"],
+                options["iterations"],
+                tuple(options["scenarios"] or SCENARIOS),
+            )
+        except ValueError as error:
+            raise CommandError(str(error)) from error
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            options["output"].write_text(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if baseline is None:
+            return
+        if regressions := compare_results(results, baseline, options["threshold"]):
+            raise CommandError(
+                "The benchmark has regressed:\n" + "\n".join(regressions)
+            )
+        self.stderr.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,62 @@
+"""Management command to find duplicate answers to registration forms."""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from loefsys.events.models.registration_form_field import INFORMATION_MODELS
+
+
+class Command(BaseCommand):
+    """Find registrations with several answers to a field and optionally repair them.
+
+    Each registration may have a single answer to each field of the registration
+    form, which the unique constraints of the answers enforce. Duplicate answers
+    stored before those constraints were added make the migration adding them fail,
+    so this command must be run before that migration. The duplicates are reported,
+    and when the ``--repair`` option is given, only the answer that was changed last
+    is kept.
+    """
+
+    help = "Find duplicate answers to registration forms and keep the latest ones."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Delete all but the latest answer of each registration to a field.",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002 D102
+        outdated = 0
+        with transaction.atomic():
+            for model in INFORMATION_MODELS.values():
+                newer = model.objects.filter(
+                    Q(changed__gt=OuterRef("changed"))
+                    | Q(changed=OuterRef("changed"), pk__gt=OuterRef("pk")),
+                    registration=OuterRef("registration"),
+                    field=OuterRef("field"),
+                )
+                answers = model.objects.filter(Exists(newer))
+                count = answers.count()
+                if count:
+                    self.stdout.write(
+                        f"{model._meta.verbose_name_plural}: {count} outdated answers"
+                    )
+                    if options["repair"]:
+                        answers.delete()
+                outdated += count
+
+        if not outdated:
+            self.stdout.write(self.style.SUCCESS("No answers are duplicated."))
+        elif options["repair"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Deleted {outdated} outdated answers.")
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{outdated} answers have been replaced by a later answer. "
+                    "Run with --repair to delete them."
+                )
+            )
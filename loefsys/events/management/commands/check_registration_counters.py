@@ -0,0 +1,59 @@
+"""Management command to verify the registration counters of events."""
+
+from django.core.management.base import BaseCommand
+
+from loefsys.events.models import Event
+from loefsys.events.models.managers import actual_registration_counters
+
+
+class Command(BaseCommand):
+    """Verify the registration counters of all events and optionally repair them.
+
+    The counters are recomputed from the registrations in a single query. Events for
+    which a counter has drifted are reported, and are updated when the ``--repair``
+    option is given. The repair doesn't lock the events, so it should be run while no
+    registrations are made, as a registration made during the repair may be missed.
+    """
+
+    help = "Verify the registration counters of events and repair any drift."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            "--repair", action="store_true", help="Update the drifted counters."
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002 D102
+        counters = actual_registration_counters()
+        events = Event.objects.annotate(
+            **{
+                f"actual_{counter}": expression
+                for counter, expression in counters.items()
+            }
+        ).order_by("pk")
+
+        drifted = []
+        for event in events:
+            changes = [
+                f"{counter} {getattr(event, counter)} != {actual}"
+                for counter in counters
+                if getattr(event, counter)
+                != (actual := getattr(event, f"actual_{counter}"))
+            ]
+            if changes:
+                drifted.append(event.pk)
+                self.stdout.write(f"{event} (pk={event.pk}): {', '.join(changes)}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All counters are correct."))
+        elif options["repair"]:
+            Event.objects.filter(pk__in=drifted).update(**counters)
+            self.stdout.write(
+                self.style.SUCCESS(f"Repaired the counters of {len(drifted)} events.")
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"The counters of {len(drifted)} events have drifted. "
+                    "Run with --repair to fix them."
+                )
+            )
@@ -0,0 +1,79 @@
+"""Management command to reconcile the balances of users with their registrations."""
+
+from django.core.management.base import BaseCommand
+
+from loefsys.events.models import EventRegistration, MemberBalance
+from loefsys.events.models.managers import actual_balance
+
+
+class Command(BaseCommand):
+    """Verify the balances of all users and optionally repair them.
+
+    The balances are recomputed from the registrations in a single query. Balances
+    that have drifted are reported, and are updated when the ``--repair`` option is
+    given, which also creates the missing balances. The repair recomputes the balances
+    within the update statement itself, so registrations changed in the meantime are
+    taken into account.
+    """
+
+    help = "Verify the balances of users against their registrations and repair drift."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            "--repair", action="store_true", help="Update the drifted balances."
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002 D102
+        missing = set(
+            EventRegistration.objects.filter(
+                contact__isnull=False, contact__event_balance__isnull=True
+            ).values_list("contact_id", flat=True)
+        )
+        if missing and options["repair"]:
+            MemberBalance.objects.bulk_create(
+                [MemberBalance(user_id=user_id) for user_id in missing],
+                ignore_conflicts=True,
+            )
+
+        expressions = actual_balance()
+        balances = (
+            MemberBalance.objects.annotate(
+                **{
+                    f"actual_{field}": expression
+                    for field, expression in expressions.items()
+                }
+            )
+            .select_related("user")
+            .order_by("pk")
+        )
+
+        drifted = []
+        for balance in balances:
+            changes = [
+                f"{field} {getattr(balance, field)} != {actual}"
+                for field in expressions
+                if getattr(balance, field)
+                != (actual := getattr(balance, f"actual_{field}"))
+            ]
+            if changes:
+                drifted.append(balance.pk)
+                self.stdout.write(
+                    f"{balance.user} (pk={balance.pk}): {', '.join(changes)}"
+                )
+        if missing and not options["repair"]:
+            self.stdout.write(
+                f"{len(missing)} users with registrations have no balance."
+            )
+
+        if not drifted and not missing:
+            self.stdout.write(self.style.SUCCESS("All balances are correct."))
+        elif options["repair"]:
+            MemberBalance.objects.filter(pk__in=drifted).update(**expressions)
+            self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} balances."))
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(drifted) + len(missing)} balances have drifted. "
+                    "Run with --repair to fix them."
+                )
+            )
@@ -1,14 +1,18 @@
 """Module containing the models related to events."""
 
+from .balance import MemberBalance
 from .event import Event, EventOrganizer
 from .feed_token import FeedToken
 from .registration import EventRegistration
 from .registration_form_field import RegistrationFormField
+from .series import EventSeries
 
 __all__ = [
     "Event",
     "EventOrganizer",
     "EventRegistration",
+    "EventSeries",
     "FeedToken",
+    "MemberBalance",
     "RegistrationFormField",
 ]
@@ -0,0 +1,64 @@
+"""Module containing the model for the balance of the event costs of a user."""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import F, Index
+from django.utils.translation import gettext_lazy as _
+
+from .managers import MemberBalanceManager
+
+
+class MemberBalance(models.Model):
+    """Running balance of the costs of the event registrations of a user.
+
+    The balance is the rollup of :attr:`~.registration.EventRegistration.costs` and
+    :attr:`~.registration.EventRegistration.costs_paid` of all registrations of the
+    user. It is updated in the same transaction as the registrations, see
+    :meth:`~.managers.MemberBalanceManager.record`, so that the outstanding amounts
+    don't need to be summed over every registration ever made. The balances can be
+    recomputed from the registrations with the management command
+    ``reconcile_balances``.
+
+    Attributes
+    ----------
+    user : ~loefsys.members.models.user.User
+        The user of the balance.
+    costs : ~decimal.Decimal
+        The total costs of the registrations of the user.
+    paid : ~decimal.Decimal
+        The total amount paid for the registrations of the user.
+    outstanding : ~decimal.Decimal
+        The amount that the user still has to pay, or a negative amount if the user
+        paid too much.
+    """
+
+    user = models.OneToOneField(
+        get_user_model(),
+        models.CASCADE,
+        primary_key=True,
+        related_name="event_balance",
+        verbose_name=_("User"),
+    )
+    costs = models.DecimalField(
+        _("Costs"), max_digits=9, decimal_places=2, default=Decimal("0.00")
+    )
+    paid = models.DecimalField(
+        _("Paid"), max_digits=9, decimal_places=2, default=Decimal("0.00")
+    )
+    outstanding = models.GeneratedField(
+        expression=F("costs") - F("paid"),
+        output_field=models.DecimalField(max_digits=9, decimal_places=2),
+        db_persist=True,
+        verbose_name=_("Outstanding"),
+    )
+
+    objects = MemberBalanceManager()
+
+    class Meta:
+        verbose_name = _("member balance")
+        indexes = (Index(fields=("outstanding",), name="balance_outstanding"),)
+
+    def __str__(self):
+        return f"{self.user} | {self.outstanding}"
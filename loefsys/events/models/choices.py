@@ -42,6 +42,21 @@ class EventCategories(models.IntegerChoices):
     """Used for events meant to train a participant"""
 
 
+class AdmissionModes(models.IntegerChoices):
+    """The ways in which registrations for an event are admitted."""
+
+    FIRST_COME = (0, _("First come, first served"))
+    """Registrations are admitted in order of creation until the event is full."""
+
+    LOTTERY = (1, _("Lottery"))
+    """Registrations are collected during the registration window and drawn after.
+
+    The registrations are pending until the registration deadline has passed, after
+    which they are drawn in random order, see
+    :meth:`~loefsys.events.models.event.Event.draw_lottery`.
+    """
+
+
 class RegistrationStatus(models.IntegerChoices):
     """The various statuses for the registration."""
 
@@ -56,3 +71,6 @@ class RegistrationStatus(models.IntegerChoices):
 
     CANCELLED_FINE = (3, _("Cancelled and fined"))
     """The registration is cancelled and a fine is applied."""
+
+    PENDING = (4, _("Pending lottery"))
+    """The registration awaits the lottery of an event with lottery admission."""
@@ -1,19 +1,34 @@
 """In this module, the models for events are defined."""
 
+import random
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core import validators
 from django.core.files.storage import FileSystemStorage
-from django.db import models
-from django.db.models import CheckConstraint, F, Q
+from django.db import models, transaction
+from django.db.models import CheckConstraint, F, Index, Q, UniqueConstraint
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel, TitleSlugDescriptionModel
 
-from loefsys.events.models.choices import EventCategories, RegistrationStatus
-from loefsys.events.models.managers import EventManager, EventRegistrationManager
+from loefsys.events.models.balance import MemberBalance
+from loefsys.events.models.choices import (
+    AdmissionModes,
+    EventCategories,
+    RegistrationStatus,
+)
+from loefsys.events.models.managers import (
+    QUEUE_ORDER,
+    REGISTRATION_COUNTERS,
+    EventManager,
+    EventRegistrationManager,
+    registration_counter_deltas,
+)
+from loefsys.events.pictures import PICTURE_FORMATS
+from loefsys.events.search import SearchDocument, SearchDocumentIndex
 from loefsys.groups.models import LoefbijterGroup
 
 
@@ -54,6 +69,9 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         An optional description of the event.
     picture : ~django.db.models.fields.files.ImageFieldFile
         The picture for an event.
+    picture_variants : dict of str to list of (int, str)
+        The resized variants of the picture per format, as pairs of the width and the
+        name of the file, see :mod:`loefsys.events.pictures`.
     slug : str
         A slug for the URL of the event, automatically generated from the title.
     start : ~datetime.datetime
@@ -70,6 +88,8 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         The category of the event.
     capacity : ~integer.Integer
         The maximum number of participants if there is one
+    admission : ~loefsys.events.models.choices.AdmissionModes
+        How registrations are admitted, on a first-come basis or by lottery.
     price : ~decimal.Decimal
         The price.
     fine : ~decimal.Decimal
@@ -86,6 +106,22 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         Flag to determine if the event is publicly visible.
     send_cancel_email : ~bool
         Flag to determine if an email should be sent if a participant deregisters
+    num_active : int
+        The number of active registrations, kept up to date by the registrations.
+    num_queued : int
+        The number of queued registrations, kept up to date by the registrations.
+    num_cancelled : int
+        The number of cancelled registrations, kept up to date by the registrations.
+    num_pending : int
+        The number of registrations pending the lottery, kept up to date by the
+        registrations.
+    series : ~loefsys.events.models.series.EventSeries, None
+        The series of recurring events that this event is an occurrence of, if any.
+    occurrence : ~datetime.datetime, None
+        The start of the occurrence of the series, as generated by its recurrence rule.
+    search_document : str
+        The full-text search document of the title, description and location, generated
+        by the database, see :mod:`loefsys.events.search`.
     eventregistration_set : ~loefsys.events.models.managers.EventRegistrationManager
         A manager of registrations for this event.
 
@@ -103,6 +139,7 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         blank=True,
         storage=OverwriteStorage(),
     )
+    picture_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     start = models.DateTimeField(_("Start time"))
     end = models.DateTimeField(_("End time"))
@@ -125,6 +162,15 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
     capacity = models.PositiveSmallIntegerField(
         _("Maximum number of participants"), blank=True, null=True
     )
+    admission = models.PositiveSmallIntegerField(
+        _("Admission"),
+        choices=AdmissionModes,
+        default=AdmissionModes.FIRST_COME,
+        help_text=_(
+            "With a lottery, the places are drawn among all registrations after the "
+            "registration deadline."
+        ),
+    )
 
     price = models.DecimalField(
         _("Price"),
@@ -160,6 +206,33 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         ),
     )
 
+    num_active = models.PositiveIntegerField(
+        _("Active registrations"), default=0, editable=False
+    )
+    num_queued = models.PositiveIntegerField(
+        _("Queued registrations"), default=0, editable=False
+    )
+    num_cancelled = models.PositiveIntegerField(
+        _("Cancelled registrations"), default=0, editable=False
+    )
+    num_pending = models.PositiveIntegerField(
+        _("Pending registrations"), default=0, editable=False
+    )
+
+    series = models.ForeignKey(
+        "EventSeries",
+        models.SET_NULL,
+        related_name="events",
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    occurrence = models.DateTimeField(null=True, blank=True, editable=False)
+
+    search_document = models.GeneratedField(
+        expression=SearchDocument(), output_field=SearchVectorField(), db_persist=True
+    )
+
     @property
     def has_form_fields(self) -> bool:
         """Check if the event has associated form fields.
@@ -169,13 +242,21 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         bool
             ``True`` if the event has form fields, otherwise ``False``.
         """
-        return self.registrationformfield_set.count() > 0
+        if hasattr(self, "form_fields_exist"):
+            # Annotated by EventQuerySet.with_form_fields_exist().
+            return self.form_fields_exist
+        return self.registrationformfield_set.exists()
 
     eventregistration_set: EventRegistrationManager
 
     objects = EventManager()
 
     class Meta:
+        indexes = (
+            Index(fields=("published", "start"), name="event_published_start"),
+            Index(fields=("published", "end"), name="event_published_end"),
+            SearchDocumentIndex(fields=("search_document",), name="event_search"),
+        )
         constraints = (
             CheckConstraint(
                 condition=Q(end__gt=F("start")),
@@ -202,20 +283,96 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
                 name="can_end_gt_reg_start",
                 violation_error_message="cancelation can't be before registration opens",  # noqa: E501
             ),
+            UniqueConstraint(
+                fields=("series", "occurrence"), name="event_unique_occurrence"
+            ),
         )
 
     def __str__(self):
         return f"{self.title}"
 
+    def save(self, *args, **kwargs):
+        """Save the event, without writing its registration counters.
+
+        The counters are only changed in the database, by
+        :meth:`update_registration_counters`. Saving an instance that was fetched
+        before a registration, such as in the admin, would otherwise write back its
+        outdated counters. A new event is saved with all its fields.
+
+        Returns
+        -------
+        None
+        """
+        if not self._state.adding and not kwargs.get("force_insert"):
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = (
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key and not field.generated
+                )
+            counters = REGISTRATION_COUNTERS.values()
+            kwargs["update_fields"] = [
+                field for field in update_fields if field not in counters
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def url(self) -> str:
         """Url for the event."""
         return self.get_absolute_url()
 
     def get_absolute_url(self):
-        """Return the detail page url for this registration."""
+        """Return the detail page url for this registration.
+
+        An occurrence of a series that isn't stored yet has the URL of the occurrence,
+        see :meth:`~loefsys.events.models.series.EventSeries.get_occurrence_url`.
+        """
+        if self.pk is None and self.series_id is not None:
+            return self.series.get_occurrence_url(self.occurrence)
         return reverse("events:event", kwargs={"slug": self.slug})
 
+    @property
+    def picture_sources(self) -> list[dict[str, str]]:
+        """Get the sources of the picture for a ``<picture>`` element.
+
+        Returns
+        -------
+        list of dict of str to str
+            For each format, in the order of preference, the MIME type as ``type`` and
+            the variants as ``srcset``. The list is empty if the variants are not built
+            yet.
+        """
+        storage = self.picture.storage
+        return [
+            {
+                "type": f"image/{extension}",
+                "srcset": ", ".join(
+                    f"{storage.url(name)} {width}w" for width, name in variants
+                ),
+            }
+            # The browser uses the first supported source, so the order of the formats
+            # matters. It isn't kept by JSON columns in all databases.
+            for extension in PICTURE_FORMATS
+            if (variants := self.picture_variants.get(extension))
+        ]
+
+    @property
+    def picture_url(self) -> str | None:
+        """Get the URL of the picture for browsers that don't support ``srcset``.
+
+        Returns
+        -------
+        str, None
+            The URL of the largest JPEG variant, the original if the variants are not
+            built yet, or ``None`` if the event has no picture.
+        """
+        if not self.picture:
+            return None
+        if variants := self.picture_variants.get("jpeg"):
+            return self.picture.storage.url(variants[-1][1])
+        return self.picture.url
+
     def mandatory_registration(self) -> bool:
         """Check whether this event has mandatory registration.
 
@@ -226,6 +383,28 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         """
         return self.capacity is not None and self.capacity > 0
 
+    def is_organizer(self, user) -> bool:
+        """Check whether a user organizes this event.
+
+        A user organizes the event if they are one of the organizers, or a member of
+        one of the organizing groups.
+
+        Parameters
+        ----------
+        user : ~loefsys.members.models.user.User
+            The user to check.
+
+        Returns
+        -------
+        bool
+            ``True`` if the user organizes the event, otherwise ``False``.
+        """
+        if not user.is_authenticated:
+            return False
+        return EventOrganizer.objects.filter(
+            Q(user=user) | Q(groups__user=user), event=self
+        ).exists()
+
     def registrations_open(self) -> bool:
         """Determine whether it is possible for users to register for this event.
 
@@ -238,6 +417,34 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
             return False
         return self.registration_start < timezone.now() < self.registration_deadline
 
+    def lock(self) -> None:
+        """Lock the row of this event for the remainder of the current transaction.
+
+        Capacity decisions for an event, such as admitting a new registration or
+        promoting queued registrations, must be made while holding this lock. This
+        serializes those decisions per event, so that concurrent registrations can't
+        overbook it, while registrations for other events are not blocked. The capacity
+        and the registration counters are reloaded as they may have changed since this
+        instance was fetched.
+
+        Returns
+        -------
+        None
+        """
+        (
+            self.capacity,
+            self.num_active,
+            self.num_queued,
+            self.num_cancelled,
+            self.num_pending,
+        ) = (
+            Event.objects.select_for_update()
+            .values_list(
+                "capacity", "num_active", "num_queued", "num_cancelled", "num_pending"
+            )
+            .get(pk=self.pk)
+        )
+
     def max_capacity_reached(self) -> bool:
         """Check whether the max capacity for this event is reached.
 
@@ -246,10 +453,36 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         bool
             ``True`` when the event is full and ``False`` if there are places available.
         """
-        return (
-            self.capacity is not None
-            and self.capacity <= self.eventregistration_set.active().count()
-        )
+        return self.capacity is not None and self.capacity <= self.num_active
+
+    def update_registration_counters(
+        self,
+        old_status: RegistrationStatus | None,
+        new_status: RegistrationStatus | None,
+        amount: int = 1,
+    ) -> None:
+        """Update the registration counters for a change of registration status.
+
+        The counters are updated atomically in the database, so this method must be
+        called in the same transaction as the change of the registrations.
+
+        Parameters
+        ----------
+        old_status : ~loefsys.events.models.choices.RegistrationStatus, None
+            The status before the change, or ``None`` for a new registration.
+        new_status : ~loefsys.events.models.choices.RegistrationStatus, None
+            The status after the change, or ``None`` for a deleted registration.
+        amount : int
+            The number of registrations that changed status.
+
+        Returns
+        -------
+        None
+        """
+        deltas = registration_counter_deltas(old_status, new_status, amount)
+        Event.objects.update_registration_counters(self.pk, deltas)
+        for counter, delta in deltas.items():
+            setattr(self, counter, getattr(self, counter) + delta)
 
     def fine_on_cancellation(self) -> bool:
         """Check whether the cancellation of a registration will result in a fine.
@@ -268,6 +501,10 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
     def process_cancellation(self) -> None:
         """Process the side effects for an event of a cancellation.
 
+        Queued registrations are promoted in the order of the queue for as long as there
+        are places available. This relies on the counters of the event being up to date,
+        see :meth:`.lock`.
+
         Returns
         -------
         None
@@ -275,20 +512,84 @@ class Event(TitleSlugDescriptionModel, TimeStampedModel):
         if not self.mandatory_registration():
             return
 
-        num_active = self.eventregistration_set.active().count()
-        num_queued = self.eventregistration_set.queued().count()
-        if not num_queued or num_active >= self.capacity:
+        if not self.num_queued or self.num_active >= self.capacity:
             return
 
-        num_available = self.capacity - num_active
-        num_to_add = min(num_available, num_queued)
-        objs = self.eventregistration_set.queued().order_by("created")[:num_to_add]
+        num_available = self.capacity - self.num_active
+        num_to_add = min(num_available, self.num_queued)
+        objs = self.eventregistration_set.queued().order_by(*QUEUE_ORDER)[:num_to_add]
         modified = timezone.now()
         for obj in objs:
             obj.status = RegistrationStatus.ACTIVE
             obj.modified = modified
         # As save() isn't called on the objects, we manually update the field modified.
-        self.eventregistration_set.bulk_update(objs, ["status", "modified"])
+        num_updated = self.eventregistration_set.bulk_update(
+            objs, ["status", "modified"]
+        )
+        self.update_registration_counters(
+            RegistrationStatus.QUEUED, RegistrationStatus.ACTIVE, num_updated
+        )
+        MemberBalance.objects.record(
+            entry for obj in objs for entry in obj.ledger_entries()
+        )
+        for obj in objs:
+            obj.ledger_recorded()
+
+    def draw_lottery(self, seed: int | None = None) -> None:
+        """Draw the pending registrations of an event with lottery admission.
+
+        The pending registrations are shuffled, after which as many as there are places
+        available are made active and the others are queued in the drawn order. All
+        registrations are updated in a single pass while holding the lock of the event.
+
+        Parameters
+        ----------
+        seed : int, None
+            The seed of the draw, which makes the draw reproducible. A random seed is
+            used if it is ``None``.
+
+        Returns
+        -------
+        None
+        """
+        with transaction.atomic():
+            self.lock()
+            # Order the registrations before shuffling, so that the seed determines the
+            # result regardless of the order in which the database returns them.
+            pending = list(self.eventregistration_set.pending().order_by("pk"))
+            random.Random(seed).shuffle(pending)
+
+            num_places = len(pending)
+            # A capacity of zero means that the event is unlimited, like on admission.
+            if self.capacity:
+                num_places = min(max(self.capacity - self.num_active, 0), num_places)
+            modified = timezone.now()
+            for position, registration in enumerate(pending):
+                if position < num_places:
+                    registration.status = RegistrationStatus.ACTIVE
+                    registration.queue_order = None
+                else:
+                    registration.status = RegistrationStatus.QUEUED
+                    registration.queue_order = position - num_places + 1
+                registration.modified = modified
+            self.eventregistration_set.bulk_update(
+                pending, ["status", "queue_order", "modified"]
+            )
+            self.update_registration_counters(
+                RegistrationStatus.PENDING, RegistrationStatus.ACTIVE, num_places
+            )
+            self.update_registration_counters(
+                RegistrationStatus.PENDING,
+                RegistrationStatus.QUEUED,
+                len(pending) - num_places,
+            )
+            MemberBalance.objects.record(
+                entry
+                for registration in pending
+                for entry in registration.ledger_entries()
+            )
+            for registration in pending:
+                registration.ledger_recorded()
 
     def registration_window_open(self) -> bool:
         """Determine whether it is possible for users to register for this event.
@@ -1,27 +1,124 @@
 """Model for personalized iCal feed tokens."""
 
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils.crypto import get_random_string
 
 from loefsys.members.models import User
 
+TOKEN_CACHE_TIMEOUT = 60 * 60
+"""The number of seconds that the user of a token is cached."""
+
+
+def generate_token() -> str:
+    """Generate a new random token for a feed."""
+    return get_random_string(32)
+
+
+def _token_cache_key(token: str) -> str:
+    return f"events:feedtoken:{token}"
+
 
 class FeedToken(models.Model):
-    """Used to personalize the ical Feed."""
+    """Used to personalize the ical Feed.
+
+    The token is part of the feed URLs that users add to their calendar app, so it stays
+    the same until it is explicitly rotated with :meth:`rotate`. As feeds are polled
+    often, the user of a token is cached for :data:`TOKEN_CACHE_TIMEOUT` seconds. The
+    cache is shared by all processes, see ``DJANGO_CACHE_URL``, so a rotated token is
+    removed from the cache of all of them.
+
+    Attributes
+    ----------
+    user : ~loefsys.members.models.user.User
+        The user that the feeds are personalized for.
+    token : str
+        The secret token identifying the user in the feed URLs.
+    """
 
     user = models.OneToOneField(to=User, on_delete=models.CASCADE)
-    token = models.CharField(max_length=32, editable=False)
+    token = models.CharField(
+        max_length=32, editable=False, unique=True, default=generate_token
+    )
+
+    def rotate(self) -> None:
+        """Replace the token with a new one, invalidating the old feed URLs.
 
-    def save(self, **kwargs):  # noqa: D102
-        self.token = get_random_string(32)
-        super().save(**kwargs)
+        The old token is removed from the cache immediately and again once the
+        transaction is committed, as another request may cache it again before then.
+
+        Returns
+        -------
+        None
+        """
+        old_token = self.token
+        self.token = generate_token()
+        self.save(update_fields=["token"])
+        self.invalidate(old_token)
+        transaction.on_commit(lambda: self.invalidate(old_token))
 
     @staticmethod
-    def get_user(token):  # noqa: D102
-        try:
-            return FeedToken.objects.get(token=token).user
-        except FeedToken.DoesNotExist:
+    def invalidate(token: str) -> None:
+        """Remove a token from the cache.
+
+        Parameters
+        ----------
+        token : str
+            The token to remove.
+
+        Returns
+        -------
+        None
+        """
+        cache.delete(_token_cache_key(token))
+
+    @staticmethod
+    def get_user_pk(token: str) -> int | None:
+        """Get the primary key of the user of a token.
+
+        Parameters
+        ----------
+        token : str
+            The token from the feed URL.
+
+        Returns
+        -------
+        int, None
+            The primary key of the user, or ``None`` if the token doesn't exist.
+        """
+        key = _token_cache_key(token)
+        user_pk = cache.get(key)
+        if user_pk is None:
+            user_pk = (
+                FeedToken.objects.filter(token=token)
+                .values_list("user_id", flat=True)
+                .first()
+            )
+            if user_pk is not None:
+                cache.set(key, user_pk, timeout=TOKEN_CACHE_TIMEOUT)
+        return user_pk
+
+    @staticmethod
+    def get_user(token: str) -> User | None:
+        """Get the user of a token.
+
+        Parameters
+        ----------
+        token : str
+            The token from the feed URL.
+
+        Returns
+        -------
+        ~loefsys.members.models.user.User, None
+            The user, or ``None`` if the token doesn't exist.
+        """
+        feed_token = (
+            FeedToken.objects.select_related("user").filter(token=token).first()
+        )
+        if feed_token is None:
             return None
+        cache.set(_token_cache_key(token), feed_token.user_id, TOKEN_CACHE_TIMEOUT)
+        return feed_token.user
 
     def __str__(self):  # noqa: DJ012
         return f"FeedToken(user={self.user}, token={self.token})"
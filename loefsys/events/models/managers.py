@@ -1,19 +1,350 @@
 """Module containing all model managers for the events app."""
 
+from collections import Counter
+from decimal import Decimal
 from typing import TYPE_CHECKING, Self
 
 from django.db import models
-from django.db.models import Q
-from django.db.models.functions import Now
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import Cast, Coalesce, RowNumber
+from django.utils import timezone
 
 from .choices import RegistrationStatus
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import datetime
+
     from .event import Event
 
 
-class EventManager[TEvent: "Event"](models.Manager[TEvent]):
-    """Model manager for events."""
+REGISTRATION_COUNTERS = {
+    RegistrationStatus.ACTIVE: "num_active",
+    RegistrationStatus.QUEUED: "num_queued",
+    RegistrationStatus.CANCELLED_NOFINE: "num_cancelled",
+    RegistrationStatus.CANCELLED_FINE: "num_cancelled",
+    RegistrationStatus.PENDING: "num_pending",
+}
+"""The registration counter of an event for each registration status."""
+
+QUEUE_ORDER = (F("queue_order").asc(nulls_last=True), F("created").asc())
+"""The order of queued registrations: the order drawn by a lottery, else creation."""
+
+
+def registration_counter_deltas(
+    old_status: RegistrationStatus | None,
+    new_status: RegistrationStatus | None,
+    amount: int = 1,
+) -> dict[str, int]:
+    """Calculate the changes of the registration counters for a change of status.
+
+    Parameters
+    ----------
+    old_status : ~loefsys.events.models.choices.RegistrationStatus, None
+        The status before the change, or ``None`` for a new registration.
+    new_status : ~loefsys.events.models.choices.RegistrationStatus, None
+        The status after the change, or ``None`` for a deleted registration.
+    amount : int
+        The number of registrations that changed status.
+
+    Returns
+    -------
+    dict of str to int
+        The change for each counter that is affected.
+    """
+    deltas: Counter[str] = Counter()
+    if old_status is not None:
+        deltas[REGISTRATION_COUNTERS[old_status]] -= amount
+    if new_status is not None:
+        deltas[REGISTRATION_COUNTERS[new_status]] += amount
+    return {counter: delta for counter, delta in deltas.items() if delta}
+
+
+def actual_registration_counters() -> dict[str, Coalesce]:
+    """Get expressions computing the registration counters of an event from scratch.
+
+    Returns
+    -------
+    dict of str to ~django.db.models.functions.Coalesce
+        For each counter, an expression counting the registrations of the event.
+    """
+    from .registration import EventRegistration  # noqa: PLC0415 circular import
+
+    statuses: dict[str, list[int]] = {}
+    for status, counter in REGISTRATION_COUNTERS.items():
+        statuses.setdefault(counter, []).append(status)
+    return {
+        counter: Coalesce(
+            Subquery(
+                EventRegistration.objects.filter(
+                    event=OuterRef("pk"), status__in=counter_statuses
+                )
+                .order_by()
+                .values("event")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            Value(0),
+        )
+        for counter, counter_statuses in statuses.items()
+    }
+
+
+class EventQuerySet(models.QuerySet["Event"]):
+    """Query set for events, with filters on their publication and time.
+
+    The filters on time compare with a single start or end column, so that, combined
+    with :meth:`published`, they use the indexes on ``(published, start)`` and
+    ``(published, end)``.
+    """
+
+    def with_form_fields_exist(self) -> Self:
+        """Annotate whether the events have registration form fields.
+
+        The annotation ``form_fields_exist`` is used by
+        :attr:`~loefsys.events.models.event.Event.has_form_fields`.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            The annotated query.
+        """
+        from .registration_form_field import RegistrationFormField  # noqa: PLC0415 circular import
+
+        return self.annotate(
+            form_fields_exist=Exists(
+                RegistrationFormField.objects.filter(event=OuterRef("pk"))
+            )
+        )
+
+    def with_registration_info(self, user) -> Self:
+        """Annotate the events with the registration information for a user.
+
+        The information that the event page needs is computed in the same query as the
+        event itself. The following attributes are annotated:
+
+        ``user_registration_status``
+            The status of the active, queued or pending registration of the user, or
+            ``None`` when the user isn't registered.
+        ``user_queue_position``
+            The position of the user in the queue, starting at 1, or ``None`` when the
+            user isn't queued. It is computed using ``ROW_NUMBER()`` over the queued
+            registrations in the order of the queue, see :data:`QUEUE_ORDER`.
+        ``form_fields_exist``
+            Whether the event has registration form fields, see
+            :meth:`with_form_fields_exist`.
+
+        Parameters
+        ----------
+        user : ~loefsys.members.models.user.User
+            The user to get the registration information for. For an anonymous user,
+            the user specific attributes are ``None``.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            The annotated query.
+        """
+        from .registration import EventRegistration  # noqa: PLC0415 circular import
+
+        queryset = self.with_form_fields_exist()
+        if not user.is_authenticated:
+            return queryset.annotate(
+                user_registration_status=Value(None, models.IntegerField()),
+                user_queue_position=Value(None, models.IntegerField()),
+            )
+
+        registrations = EventRegistration.objects.filter(event=OuterRef("pk"))
+        status = registrations.filter(
+            contact=user,
+            status__in=(
+                RegistrationStatus.ACTIVE,
+                RegistrationStatus.QUEUED,
+                RegistrationStatus.PENDING,
+            ),
+        ).values("status")[:1]
+        # The position is numbered over all queued registrations, after which the row
+        # of the user is selected.
+        position = (
+            registrations.filter(status=RegistrationStatus.QUEUED)
+            .annotate(
+                position=Case(
+                    When(contact=user, then=Window(RowNumber(), order_by=QUEUE_ORDER)),
+                    default=None,
+                )
+            )
+            .filter(position__isnull=False)
+            .values("position")[:1]
+        )
+        return queryset.annotate(
+            user_registration_status=Subquery(status),
+            user_queue_position=Subquery(position),
+        )
+
+    def organized_by(self, user) -> Self:
+        """Filter for events that a user organizes.
+
+        A user organizes an event if they are one of its organizers, or a member of
+        one of the organizing groups, see
+        :meth:`~loefsys.events.models.event.Event.is_organizer`. The organizers are
+        matched in a subquery, so that the events aren't duplicated by the joins.
+
+        Parameters
+        ----------
+        user : ~loefsys.members.models.user.User
+            The organizer.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            A query of the events organized by the user.
+        """
+        from .event import EventOrganizer  # noqa: PLC0415 circular import
+
+        return self.filter(
+            Exists(
+                EventOrganizer.objects.filter(
+                    Q(user=user) | Q(groups__user=user), event=OuterRef("pk")
+                )
+            )
+        )
+
+    def with_statistics(self) -> Self:
+        """Annotate the events with statistics of their registrations.
+
+        All statistics are computed in the same query as the events, by aggregating
+        the registrations with a filter per statistic. The following attributes are
+        annotated:
+
+        ``active_count``, ``queued_count`` and ``cancelled_count``
+            The number of active, queued and cancelled registrations.
+        ``revenue``
+            The amount paid for the registrations.
+        ``outstanding_fines``
+            The amount of the fines of late cancellations that is not paid yet.
+        ``form_completion_rate``
+            The fraction of the active registrations that answered all required
+            registration form fields, or ``None`` if the event has no active
+            registrations or no form fields.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            The annotated query.
+        """
+        from .registration_form_field import INFORMATION_MODELS, RegistrationFormField  # noqa: PLC0415 circular import
+
+        def count(condition):
+            return Count("eventregistration", filter=condition)
+
+        def total(expression, condition=None):
+            return Coalesce(
+                Sum(expression, filter=condition),
+                Value(Decimal("0.00")),
+                output_field=models.DecimalField(max_digits=9, decimal_places=2),
+            )
+
+        active = Q(eventregistration__status=RegistrationStatus.ACTIVE)
+        fined = Q(eventregistration__status=RegistrationStatus.CANCELLED_FINE)
+        # A registration is complete when none of the required fields of its event is
+        # left unanswered.
+        registration = OuterRef(OuterRef("eventregistration__pk"))
+        unanswered = RegistrationFormField.objects.filter(
+            event=OuterRef("pk"), required=True
+        ).exclude(
+            Q.create(
+                [
+                    Exists(
+                        model.objects.filter(
+                            registration=registration, field=OuterRef("pk")
+                        )
+                    )
+                    for model in INFORMATION_MODELS.values()
+                ],
+                connector=Q.OR,
+            )
+        )
+        return (
+            self.with_form_fields_exist()
+            .annotate(
+                active_count=count(active),
+                queued_count=count(
+                    Q(eventregistration__status=RegistrationStatus.QUEUED)
+                ),
+                cancelled_count=count(
+                    Q(
+                        eventregistration__status__in=(
+                            RegistrationStatus.CANCELLED_NOFINE,
+                            RegistrationStatus.CANCELLED_FINE,
+                        )
+                    )
+                ),
+                completed_count=count(active & ~Exists(unanswered)),
+                revenue=total("eventregistration__costs_paid"),
+                outstanding_fines=total(
+                    F("eventregistration__costs") - F("eventregistration__costs_paid"),
+                    fined
+                    & Q(
+                        eventregistration__costs__gt=F("eventregistration__costs_paid")
+                    ),
+                ),
+            )
+            .annotate(
+                form_completion_rate=Case(
+                    When(
+                        form_fields_exist=True,
+                        active_count__gt=0,
+                        then=Cast("completed_count", models.FloatField())
+                        / Cast("active_count", models.FloatField()),
+                    ),
+                    default=None,
+                    output_field=models.FloatField(),
+                )
+            )
+        )
+
+    def published(self) -> Self:
+        """Filter for events that are publicly visible.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            A query of the published events.
+        """
+        return self.filter(published=True)
+
+    def upcoming(self) -> Self:
+        """Filter for events that have not started yet.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            A query of the upcoming events.
+        """
+        return self.filter(start__gte=timezone.now())
+
+    def ongoing(self) -> Self:
+        """Filter for events that have started, but have not ended yet.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            A query of the ongoing events.
+        """
+        now = timezone.now()
+        return self.filter(start__lt=now, end__gt=now)
 
     def active(self) -> Self:
         """Filter for events that are going to happen or are currently ongoing.
@@ -23,7 +354,81 @@ class EventManager[TEvent: "Event"](models.Manager[TEvent]):
         ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
             A query of all active events.
         """
-        return self.filter(event_end__lte=Now())
+        return self.filter(end__gt=timezone.now())
+
+    def past(self) -> Self:
+        """Filter for events that have ended.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            A query of the past events.
+        """
+        return self.filter(end__lte=timezone.now())
+
+    def overlapping(self, start: "datetime | None", end: "datetime | None") -> Self:
+        """Filter for events that overlap a window, such as the page of a calendar.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime, None
+            The start of the window, or ``None`` if the window has no start.
+        end : ~datetime.datetime, None
+            The end of the window, or ``None`` if the window has no end.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            A query of the events overlapping the window.
+        """
+        events = self
+        if start is not None:
+            events = events.filter(end__gt=start)
+        if end is not None:
+            events = events.filter(start__lt=end)
+        return events
+
+    def open_for_registration(self) -> Self:
+        """Filter for events for which users can register at the moment.
+
+        These are the events for which
+        :meth:`~loefsys.events.models.event.Event.registrations_open` is ``True``.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+            A query of the events that are open for registration.
+        """
+        now = timezone.now()
+        return self.filter(
+            published=True, registration_start__lt=now, registration_deadline__gt=now
+        )
+
+
+class EventManager[TEvent: "Event"](models.Manager.from_queryset(EventQuerySet)):  # type: ignore
+    """Model manager for events.
+
+    The filters of :class:`EventQuerySet` are available on the manager as well.
+    """
+
+    def update_registration_counters(self, pk: int, deltas: dict[str, int]) -> None:
+        """Atomically apply changes to the registration counters of an event.
+
+        Parameters
+        ----------
+        pk : int
+            The primary key of the event.
+        deltas : dict of str to int
+            The change for each counter, see :func:`registration_counter_deltas`.
+
+        Returns
+        -------
+        None
+        """
+        if deltas:
+            self.filter(pk=pk).update(
+                **{counter: F(counter) + delta for counter, delta in deltas.items()}
+            )
 
 
 # TODO fix typing
@@ -60,6 +465,16 @@ class EventRegistrationManager(models.Manager["EventRegistration"]):  # type: ig
         """
         return self.filter(status=RegistrationStatus.QUEUED)
 
+    def pending(self) -> Self:
+        """Filter and only return registrations pending a lottery.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of ~loefsys.events.models.EventRegistration
+            A query containing pending registrations only.
+        """
+        return self.filter(status=RegistrationStatus.PENDING)
+
     def cancelled(self) -> Self:
         """Filter and only return cancelled registrations.
 
@@ -72,3 +487,135 @@ class EventRegistrationManager(models.Manager["EventRegistration"]):  # type: ig
             Q(status=RegistrationStatus.CANCELLED_FINE)
             | Q(status=RegistrationStatus.CANCELLED_NOFINE)
         )
+
+
+class EventSeriesManager(models.Manager["EventSeries"]):
+    """Model manager for series of recurring events."""
+
+    def occurrences(
+        self, start: "datetime | None", end: "datetime | None", published: bool = True
+    ) -> list["Event"]:
+        """Generate the occurrences overlapping a window that are not stored yet.
+
+        Occurrences that are stored as events are left out, as they are found among
+        the events themselves.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime, None
+            The start of the window, or ``None`` if the window is unbounded.
+        end : ~datetime.datetime, None
+            The end of the window, or ``None`` to end the window
+            :data:`~loefsys.events.models.series.OCCURRENCE_HORIZON` from now.
+        published : bool
+            Whether to generate the occurrences of published series only.
+
+        Returns
+        -------
+        list of ~loefsys.events.models.event.Event
+            The unsaved events of the occurrences, ordered by start.
+        """
+        from .event import Event  # noqa: PLC0415 circular import
+
+        series = self.all()
+        if published:
+            series = series.filter(published=True)
+        if end is not None:
+            series = series.filter(first_start__lt=end)
+        series = list(series)
+        if not series:
+            return []
+
+        stored = Event.objects.filter(series__in=series, occurrence__isnull=False)
+        if start is not None:
+            longest = max(item.duration for item in series)
+            stored = stored.filter(occurrence__gt=start - longest)
+        if end is not None:
+            stored = stored.filter(occurrence__lt=end)
+        stored = set(stored.values_list("series_id", "occurrence"))
+
+        occurrences = [
+            item.build_occurrence(occurrence)
+            for item in series
+            for occurrence in item.get_occurrences(start, end)
+            if (item.pk, occurrence) not in stored
+        ]
+        return sorted(occurrences, key=lambda event: event.start)
+
+
+def actual_balance() -> dict[str, Coalesce]:
+    """Get expressions computing the balance of a user from scratch.
+
+    Returns
+    -------
+    dict of str to ~django.db.models.functions.Coalesce
+        For the costs and the amount paid, an expression summing it over the
+        registrations of the user.
+    """
+    from .registration import EventRegistration  # noqa: PLC0415 circular import
+
+    registrations = (
+        EventRegistration.objects.filter(contact=OuterRef("user"))
+        .order_by()
+        .values("contact")
+    )
+    return {
+        field: Coalesce(
+            Subquery(registrations.annotate(total=Sum(source)).values("total")),
+            Value(Decimal("0.00")),
+            output_field=models.DecimalField(max_digits=9, decimal_places=2),
+        )
+        for field, source in (("costs", "costs"), ("paid", "costs_paid"))
+    }
+
+
+class MemberBalanceManager(models.Manager["MemberBalance"]):
+    """Model manager for the balances of users."""
+
+    def record(self, entries: "Iterable[tuple[int, Decimal, Decimal]]") -> None:
+        """Atomically apply changes to the balances of users.
+
+        The balances that don't exist yet are created. All balances are updated in a
+        single query, so this method must be called in the same transaction as the
+        change of the registrations.
+
+        Parameters
+        ----------
+        entries : iterable of tuple of int, ~decimal.Decimal and ~decimal.Decimal
+            The primary key of a user, with the change of the costs and of the amount
+            paid, see
+            :meth:`~loefsys.events.models.registration.EventRegistration.ledger_entries`.
+            The entries of the same user are added up.
+
+        Returns
+        -------
+        None
+        """
+        changes: dict[int, list[Decimal]] = {}
+        for user_id, costs, paid in entries:
+            change = changes.setdefault(user_id, [Decimal(0), Decimal(0)])
+            change[0] += costs
+            change[1] += paid
+        changes = {
+            user_id: change for user_id, change in changes.items() if any(change)
+        }
+        if not changes:
+            return
+
+        self.bulk_create(
+            [self.model(user_id=user_id) for user_id in changes], ignore_conflicts=True
+        )
+        self.filter(user_id__in=changes).update(
+            **{
+                field: F(field)
+                + Case(
+                    *(
+                        When(user_id=user_id, then=Value(change[index]))
+                        for user_id, change in changes.items()
+                    ),
+                    default=Value(Decimal(0)),
+                    output_field=models.DecimalField(max_digits=9, decimal_places=2),
+                )
+                for index, field in enumerate(("costs", "paid"))
+            }
+        )
@@ -9,10 +9,20 @@ from django.db.models import Case, F, Q, When
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
 
-from .choices import RegistrationStatus
+from .balance import MemberBalance
+from .choices import AdmissionModes, RegistrationStatus
 from .event import Event
 from .managers import EventRegistrationManager
 
+LEDGER_FIELDS = {
+    "contact_id",
+    "status",
+    "price_at_registration",
+    "fine_at_registration",
+    "costs_paid",
+}
+"""The fields of a registration that determine its entry in the balance of a user."""
+
 
 class EventRegistration(TimeStampedModel):
     """Registration model for an event.
@@ -32,7 +42,11 @@ class EventRegistration(TimeStampedModel):
     contact : ~loefsys.contacts.models.Contact
         The contact that the registration is for.
     status : ~loefsys.events.models.choices.RegistrationStatus
-        The status is active, in the queue, or cancelled, either with or without fine.
+        The status is active, in the queue, pending the lottery, or cancelled, either
+        with or without fine.
+    queue_order : int, None
+        The position in the queue drawn by the lottery, or ``None`` if the registration
+        is queued in order of creation.
     price_at_registration : ~decimal.Decimal
         The agreed price of the event at the time of registration.
     fine_at_registration : ~decimal.Decimal
@@ -50,6 +64,8 @@ class EventRegistration(TimeStampedModel):
         choices=RegistrationStatus, blank=True, verbose_name=_("Status")
     )
 
+    queue_order = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
     price_at_registration = models.DecimalField(
         _("Price"), max_digits=5, decimal_places=2, blank=True
     )
@@ -73,37 +89,137 @@ class EventRegistration(TimeStampedModel):
 
     @property
     def form_fields(self):
-        """Get form fields and their values on the registration form."""
-        fields = self.event.registrationformfield_set.all()
-        return [(field, field.get_value_for(self)) for field in fields]
+        """Get form fields and their values on the registration form.
+
+        The form fields of many registrations can be loaded at once with
+        :func:`~loefsys.events.models.registration_form_field.prefetch_form_fields`.
+        """
+        if self._form_fields is None:
+            # The module of the form fields imports this module.
+            from .registration_form_field import prefetch_form_fields  # noqa: PLC0415
+
+            prefetch_form_fields([self])
+        return self._form_fields
 
     objects = EventRegistrationManager()
 
+    _loaded_status: RegistrationStatus | None = None
+    """The status as it is stored in the database, used to track status changes."""
+
+    _loaded_entry: tuple[int | None, Decimal, Decimal] | None = None
+    """The balance entry as stored in the database, see :meth:`ledger_entries`."""
+
+    _form_fields: list[tuple[Any, Any]] | None = None
+    """The form fields and their values, loaded by :attr:`form_fields`."""
+
     class Meta:
         unique_together = ("event", "contact", "status")
 
     def __str__(self) -> str:
         return f"{self.event} | {self.contact}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):  # noqa: D102
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get("status")
+        if not instance.get_deferred_fields() & LEDGER_FIELDS:
+            instance._loaded_entry = instance.ledger_entry()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):  # noqa: D102
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or "status" in fields:
+            self._loaded_status = self.status
+        if fields is None or LEDGER_FIELDS & set(fields):
+            self._loaded_entry = self.ledger_entry()
+
+    def ledger_entry(self) -> tuple[int | None, Decimal, Decimal]:
+        """Get the entry of this registration in the balance of its contact.
+
+        The costs are computed in the same way as :attr:`.costs`, which is only updated
+        by the database.
+
+        Returns
+        -------
+        tuple of int, ~decimal.Decimal and ~decimal.Decimal
+            The primary key of the contact, or ``None`` if there is no contact, the
+            costs and the amount paid.
+        """
+        match self.status:
+            case RegistrationStatus.ACTIVE:
+                costs = self.price_at_registration
+            case RegistrationStatus.CANCELLED_FINE:
+                costs = self.fine_at_registration
+            case _:
+                costs = Decimal("0.00")
+        return self.contact_id, Decimal(costs or 0), Decimal(self.costs_paid or 0)
+
+    def ledger_entries(self) -> list[tuple[int, Decimal, Decimal]]:
+        """Get the changes of the balances since this registration was loaded.
+
+        After the changes are recorded with
+        :meth:`~loefsys.events.models.managers.MemberBalanceManager.record`, the
+        registration must be marked as recorded with :meth:`ledger_recorded`.
+
+        Returns
+        -------
+        list of tuple of int, ~decimal.Decimal and ~decimal.Decimal
+            The changes of the costs and the amount paid for each contact.
+        """
+        entries = []
+        if self._loaded_entry is not None and self._loaded_entry[0] is not None:
+            user_id, costs, paid = self._loaded_entry
+            entries.append((user_id, -costs, -paid))
+        user_id, costs, paid = self.ledger_entry()
+        if user_id is not None:
+            entries.append((user_id, costs, paid))
+        return entries
+
+    def ledger_recorded(self) -> None:
+        """Mark the changes of the balances of this registration as recorded."""
+        self._loaded_entry = self.ledger_entry()
+
     def save(self, **kwargs: Any) -> None:
         """Save the model to the database.
 
         When creating a new registration, the attributes :attr:`.price_at_registration`
-        and :attr:`.fine_at_registration` are copied from the :attr`.event`.
+        and :attr:`.fine_at_registration` are copied from the :attr`.event`. The
+        registration is admitted while holding the lock of the event, see
+        :meth:`~loefsys.events.models.event.Event.lock`, unless the event admits by
+        lottery: the registration is then pending until the lottery is drawn. The
+        registration counters of the event and the balance of the contact are updated
+        in the same transaction when they change.
 
         Returns
         -------
         None
         """
-        if self._state.adding:
-            self.status = (
-                RegistrationStatus.QUEUED
-                if self.event.max_capacity_reached() and self.event.capacity
-                else RegistrationStatus.ACTIVE
-            )
-            self.price_at_registration = self.event.price
-            self.fine_at_registration = self.event.fine
-        return super().save(**kwargs)
+        with transaction.atomic():
+            if self._state.adding:
+                if self.event.admission == AdmissionModes.LOTTERY:
+                    # No places are allocated until the draw, so the event isn't locked.
+                    self.status = RegistrationStatus.PENDING
+                else:
+                    self.event.lock()
+                    self.status = (
+                        RegistrationStatus.QUEUED
+                        if self.event.max_capacity_reached() and self.event.capacity
+                        else RegistrationStatus.ACTIVE
+                    )
+                self.price_at_registration = self.event.price
+                self.fine_at_registration = self.event.fine
+            elif self._loaded_entry is None:
+                # The entry wasn't loaded, as fields of the registration were deferred.
+                stored = EventRegistration.objects.get(pk=self.pk)
+                self._loaded_entry = stored.ledger_entry()
+            super().save(**kwargs)
+            if self.status != self._loaded_status:
+                self.event.update_registration_counters(
+                    self._loaded_status, self.status
+                )
+            MemberBalance.objects.record(self.ledger_entries())
+        self._loaded_status = self.status
+        self.ledger_recorded()
 
     def costs_to_pay(self) -> Decimal:
         """Calculate the amount needed to be paid by the registration contact.
@@ -134,6 +250,17 @@ class EventRegistration(TimeStampedModel):
             return
 
         with transaction.atomic():
+            # Promoting registrations from the queue is a capacity decision.
+            self.event.lock()
+
+            # The registration may have been cancelled concurrently.
+            self.refresh_from_db(fields=["status"])
+            if self.status in {
+                RegistrationStatus.CANCELLED_FINE,
+                RegistrationStatus.CANCELLED_NOFINE,
+            }:
+                return
+
             # Set status to cancelled
             self.status = (
                 RegistrationStatus.CANCELLED_FINE
@@ -144,7 +271,7 @@ class EventRegistration(TimeStampedModel):
 
             # Remove old cancelled registrations
             EventRegistration.objects.filter(
-                contact=self.contact, event=self.event
+                contact_id=self.contact_id, event_id=self.event_id
             ).filter(
                 Q(status=RegistrationStatus.CANCELLED_FINE)
                 | Q(status=RegistrationStatus.CANCELLED_NOFINE)
@@ -4,7 +4,12 @@ Defines the RegistrationForm model.
 This model is used to handle registrations for events in the application.
 """
 
-from django.db import models
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
 from loefsys.events.models import event
@@ -84,26 +89,117 @@ class RegistrationFormField(models.Model):
         ):
             return None
 
+    @staticmethod
+    def get_values(
+        registrations: Iterable[EventRegistration],
+        fields: Iterable["RegistrationFormField"],
+    ) -> dict[tuple[int, int], Any]:
+        """Get the values of many registrations and fields at once.
+
+        The values are loaded with at most one query per type of field, instead of one
+        query for every registration and field as with :meth:`get_value_for`.
+
+        Parameters
+        ----------
+        registrations : ~collections.abc.Iterable of \
+                ~loefsys.events.models.registration.EventRegistration
+            The registrations to get the values of.
+        fields : ~collections.abc.Iterable of RegistrationFormField
+            The fields to get the values of.
+
+        Returns
+        -------
+        dict of (int, int) to ~typing.Any
+            A mapping of the primary keys of the registration and the field to the
+            value. Fields that have not been filled in are missing from the mapping.
+        """
+        registration_pks = [registration.pk for registration in registrations]
+        field_pks = defaultdict(list)
+        for field in fields:
+            field_pks[field.type].append(field.pk)
+        if not registration_pks:
+            return {}
+
+        values = {}
+        for field_type, pks in field_pks.items():
+            values.update(
+                ((registration_pk, field_pk), value)
+                for registration_pk, field_pk, value in INFORMATION_MODELS[field_type]
+                .objects.filter(registration__in=registration_pks, field__in=pks)
+                .values_list("registration_id", "field_id", "value")
+            )
+        return values
+
     def set_value_for(self, registration, value):
         """Set value for registration form field based on registration and value."""
-        value_set = self.__get_field_set()
-
-        try:
-            field_value = value_set.get(registration=registration)
-        except BooleanRegistrationInformation.DoesNotExist:
-            field_value = BooleanRegistrationInformation()
-        except TextRegistrationInformation.DoesNotExist:
-            field_value = TextRegistrationInformation()
-        except IntegerRegistrationInformation.DoesNotExist:
-            field_value = IntegerRegistrationInformation()
-        except DatetimeRegistrationInformation.DoesNotExist:
-            field_value = DatetimeRegistrationInformation()
-
-        field_value.registration = registration
-        field_value.field = self
-        field_value.value = value
-        field_value.full_clean()
-        field_value.save()
+        self.set_values(registration, [(self, value)])
+
+    @staticmethod
+    def set_values(
+        registration: EventRegistration,
+        values: Iterable[tuple["RegistrationFormField", Any]],
+    ) -> None:
+        """Save the values of many fields of a registration at once.
+
+        All values are validated before anything is written. The values are then
+        inserted or updated with a single query per type of field, in one transaction.
+        A value of ``None`` removes the value of the field.
+
+        Parameters
+        ----------
+        registration : ~loefsys.events.models.registration.EventRegistration
+            The registration to save the values for.
+        values : ~collections.abc.Iterable of (RegistrationFormField, ~typing.Any)
+            The fields and their new values.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ~django.core.exceptions.ValidationError
+            If any of the values is invalid. The errors are keyed by the primary key
+            of the field, as a string.
+        """
+        answers = defaultdict(list)
+        cleared = defaultdict(list)
+        errors = {}
+        for field, value in values:
+            if value is None:
+                cleared[field.type].append(field.pk)
+                continue
+
+            answer = INFORMATION_MODELS[field.type](
+                registration=registration, field=field, value=value
+            )
+            try:
+                # The registration and the field are known to exist and uniqueness is
+                # handled by the upsert, so skip the checks that query the database.
+                answer.full_clean(
+                    exclude=["registration", "field"],
+                    validate_unique=False,
+                    validate_constraints=False,
+                )
+            except ValidationError as error:
+                errors[str(field.pk)] = error.messages
+            else:
+                answers[field.type].append(answer)
+        if errors:
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            for field_type, pks in cleared.items():
+                INFORMATION_MODELS[field_type].objects.filter(
+                    registration=registration, field__in=pks
+                ).delete()
+            for field_type, objs in answers.items():
+                INFORMATION_MODELS[field_type].objects.bulk_create(
+                    objs,
+                    update_conflicts=True,
+                    unique_fields=["registration", "field"],
+                    update_fields=["value", "changed"],
+                )
 
 
 class AbstractRegistrationInformation(models.Model):
@@ -115,6 +211,11 @@ class AbstractRegistrationInformation(models.Model):
 
     class Meta:
         abstract = True
+        constraints = (
+            models.UniqueConstraint(
+                fields=("registration", "field"), name="%(class)s_unique_answer"
+            ),
+        )
 
     def __str__(self):
         return f"{self.registration} - {self.field}: {self.value}"
@@ -142,3 +243,54 @@ class DatetimeRegistrationInformation(AbstractRegistrationInformation):
     """Checkbox information filled in by members when registering."""
 
     value = models.DateTimeField()
+
+
+INFORMATION_MODELS: dict[str, type[AbstractRegistrationInformation]] = {
+    RegistrationFormField.BOOLEAN_FIELD: BooleanRegistrationInformation,
+    RegistrationFormField.TEXT_FIELD: TextRegistrationInformation,
+    RegistrationFormField.INTEGER_FIELD: IntegerRegistrationInformation,
+    RegistrationFormField.DATETIME_FIELD: DatetimeRegistrationInformation,
+}
+"""The model storing the values for each type of field."""
+
+
+def prefetch_form_fields(
+    registrations: Iterable[EventRegistration],
+    fields: Iterable[RegistrationFormField] | None = None,
+) -> None:
+    """Load the form fields and their values of many registrations at once.
+
+    This sets :attr:`~loefsys.events.models.registration.EventRegistration.form_fields`
+    of all registrations, using one query for the fields and at most one query per
+    type of field for the values.
+
+    Parameters
+    ----------
+    registrations : ~collections.abc.Iterable of \
+            ~loefsys.events.models.registration.EventRegistration
+        The registrations to load the form fields of.
+    fields : ~collections.abc.Iterable of \
+            ~loefsys.events.models.registration_form_field.RegistrationFormField, None
+        The form fields of the events of the registrations in the order of the form,
+        when they are already loaded. Only the values are queried then.
+
+    Returns
+    -------
+    None
+    """
+    registrations = list(registrations)
+    fields_per_event = defaultdict(list)
+    if fields is None:
+        fields = RegistrationFormField.objects.filter(
+            event__in={registration.event_id for registration in registrations}
+        ).order_by("event", "_order")
+    fields = list(fields)
+    for field in fields:
+        fields_per_event[field.event_id].append(field)
+
+    values = RegistrationFormField.get_values(registrations, fields)
+    for registration in registrations:
+        registration._form_fields = [
+            (field, values.get((registration.pk, field.pk)))
+            for field in fields_per_event[registration.event_id]
+        ]
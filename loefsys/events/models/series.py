@@ -0,0 +1,341 @@
+"""Module containing the model for a series of recurring events."""
+
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+from dateutil.rrule import rrule, rrulestr
+from django.core import validators
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django_extensions.db.models import TimeStampedModel, TitleSlugDescriptionModel
+
+from .choices import AdmissionModes, EventCategories
+from .event import Event
+from .managers import EventSeriesManager
+
+OCCURRENCE_FORMAT = "%Y%m%dT%H%M%SZ"
+"""The format of the start of an occurrence in its URL, in UTC."""
+
+OCCURRENCE_HORIZON = timedelta(days=366)
+"""How far ahead occurrences are generated when a window has no end."""
+
+
+def format_occurrence(start: datetime) -> str:
+    """Format the start of an occurrence for its URL.
+
+    Parameters
+    ----------
+    start : ~datetime.datetime
+        The start of the occurrence.
+
+    Returns
+    -------
+    str
+        The start in :data:`OCCURRENCE_FORMAT`.
+    """
+    return start.astimezone(UTC).strftime(OCCURRENCE_FORMAT)
+
+
+def parse_occurrence(value: str) -> datetime:
+    """Parse the start of an occurrence from its URL.
+
+    Parameters
+    ----------
+    value : str
+        The start in :data:`OCCURRENCE_FORMAT`.
+
+    Returns
+    -------
+    ~datetime.datetime
+        The start of the occurrence.
+
+    Raises
+    ------
+    ValueError
+        If the value doesn't have the right format.
+    """
+    return datetime.strptime(value, OCCURRENCE_FORMAT).replace(tzinfo=UTC)
+
+
+class EventSeries(TitleSlugDescriptionModel, TimeStampedModel):
+    """Model for a series of recurring events, such as the weekly sail trainings.
+
+    The occurrences of a series are generated from its recurrence rule for the
+    requested window only, as unsaved :class:`~loefsys.events.models.event.Event`
+    instances, see :meth:`build_occurrence`. An occurrence is stored as a real event
+    when someone registers for it or when an organizer edits it, see
+    :meth:`materialize`. From then on, the stored event replaces the generated one.
+
+    Attributes
+    ----------
+    title : str
+        The title of the events.
+    description : str, None
+        An optional description of the events.
+    slug : str
+        A slug for the URLs of the occurrences, generated from the title.
+    recurrence : str
+        The recurrence rule of the occurrences as an RFC 5545 ``RRULE``, for example
+        ``FREQ=WEEKLY;BYDAY=TU;COUNT=20``.
+    first_start : ~datetime.datetime
+        The start of the first occurrence. The occurrences start at the same local
+        time.
+    duration : ~datetime.timedelta
+        The duration of each occurrence.
+    registration_opens : ~datetime.timedelta, None
+        How long before the start of an occurrence the registration opens.
+    registration_closes : ~datetime.timedelta, None
+        How long before the start of an occurrence the registration closes.
+    cancelation_closes : ~datetime.timedelta, None
+        How long before the start of an occurrence cancelation is no longer free.
+    category : ~loefsys.events.models.choices.EventCategories
+        The category of the events.
+    capacity : int, None
+        The maximum number of participants per occurrence, if there is one.
+    admission : ~loefsys.events.models.choices.AdmissionModes
+        How registrations are admitted.
+    price : ~decimal.Decimal
+        The price.
+    fine : ~decimal.Decimal
+        The fine if a participant does not show up.
+    location : str
+        The location of the events.
+    is_open_event : bool
+        Flag to determine if non-members can register.
+    published : bool
+        Flag to determine if the occurrences are publicly visible.
+    events : ~django.db.models.Manager
+        The stored occurrences.
+    """
+
+    recurrence = models.CharField(
+        _("Recurrence rule"),
+        max_length=255,
+        help_text=_("An RFC 5545 RRULE, for example FREQ=WEEKLY;BYDAY=TU;COUNT=20."),
+    )
+    first_start = models.DateTimeField(_("Start of the first event"))
+    duration = models.DurationField(_("Duration"))
+
+    registration_opens = models.DurationField(
+        _("Registration opens before the start"), blank=True, null=True
+    )
+    registration_closes = models.DurationField(
+        _("Registration closes before the start"), blank=True, null=True
+    )
+    cancelation_closes = models.DurationField(
+        _("Cancelation closes before the start"), blank=True, null=True
+    )
+
+    category = models.PositiveSmallIntegerField(
+        choices=EventCategories, verbose_name=_("Category")
+    )
+    capacity = models.PositiveSmallIntegerField(
+        _("Maximum number of participants"), blank=True, null=True
+    )
+    admission = models.PositiveSmallIntegerField(
+        _("Admission"), choices=AdmissionModes, default=AdmissionModes.FIRST_COME
+    )
+    price = models.DecimalField(
+        _("Price"),
+        max_digits=5,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        blank=True,
+        validators=[validators.MinValueValidator(0)],
+    )
+    fine = models.DecimalField(
+        _("Fine"),
+        max_digits=5,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        blank=True,
+        validators=[validators.MinValueValidator(0)],
+    )
+    location = models.CharField(_("Location"), max_length=255)
+    is_open_event = models.BooleanField(
+        help_text=_("Event is open for non-members"), default=False
+    )
+    published = models.BooleanField(_("Published"), default=False)
+
+    events: models.Manager[Event]
+
+    objects = EventSeriesManager()
+
+    class Meta:
+        verbose_name_plural = _("event series")
+
+    def __str__(self):
+        return f"{self.title}"
+
+    def clean(self):
+        """Validate the recurrence rule and the registration window."""
+        super().clean()
+        if self.recurrence and self.first_start:
+            try:
+                self.get_rule()
+            except ValueError as error:
+                raise ValidationError({"recurrence": str(error)}) from error
+        if (
+            self.registration_opens is not None
+            and self.registration_closes is not None
+            and self.registration_opens <= self.registration_closes
+        ):
+            raise ValidationError(
+                {
+                    "registration_closes": _(
+                        "The registration must close after it opens."
+                    )
+                }
+            )
+
+    def get_rule(self) -> rrule:
+        """Get the recurrence rule, starting at the first occurrence.
+
+        The rule is evaluated in local time, so that the occurrences keep starting at
+        the same time of day when daylight saving time starts or ends.
+
+        Returns
+        -------
+        ~dateutil.rrule.rrule
+            The recurrence rule.
+
+        Raises
+        ------
+        ValueError
+            If the recurrence rule is invalid.
+        """
+        rule = rrulestr(self.recurrence, dtstart=timezone.localtime(self.first_start))
+        if not isinstance(rule, rrule):
+            raise ValueError(_("Only a single RRULE is supported."))
+        return rule
+
+    def get_occurrences(
+        self, start: datetime | None, end: datetime | None
+    ) -> list[datetime]:
+        """Get the starts of the occurrences overlapping a window.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime, None
+            The start of the window, or ``None`` if the window is unbounded.
+        end : ~datetime.datetime, None
+            The end of the window, or ``None`` to end the window
+            :data:`OCCURRENCE_HORIZON` from now.
+
+        Returns
+        -------
+        list of ~datetime.datetime
+            The starts of the occurrences, in order.
+        """
+        after = (start or self.first_start) - self.duration
+        before = end or timezone.now() + OCCURRENCE_HORIZON
+        return self.get_rule().between(after, before)
+
+    def build_occurrence(self, start: datetime) -> Event:
+        """Build the unsaved event of an occurrence.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime
+            The start of the occurrence.
+
+        Returns
+        -------
+        ~loefsys.events.models.event.Event
+            The occurrence, with all fields taken from this series.
+        """
+
+        def before_start(offset):
+            return None if offset is None else start - offset
+
+        return Event(
+            series=self,
+            occurrence=start,
+            title=self.title,
+            description=self.description,
+            start=start,
+            end=start + self.duration,
+            registration_start=before_start(self.registration_opens),
+            registration_deadline=before_start(self.registration_closes),
+            cancelation_deadline=before_start(self.cancelation_closes),
+            category=self.category,
+            capacity=self.capacity,
+            admission=self.admission,
+            price=self.price,
+            fine=self.fine,
+            location=self.location,
+            is_open_event=self.is_open_event,
+            published=self.published,
+        )
+
+    def is_occurrence(self, start: datetime) -> bool:
+        """Check whether an occurrence of this series starts at the given time.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime
+            The start to check.
+
+        Returns
+        -------
+        bool
+            ``True`` if an occurrence starts at that time, otherwise ``False``.
+        """
+        return timezone.localtime(start) in self.get_rule()
+
+    def materialize(self, start: datetime) -> Event:
+        """Store the event of an occurrence, if it isn't stored yet.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime
+            The start of the occurrence.
+
+        Returns
+        -------
+        ~loefsys.events.models.event.Event
+            The stored event of the occurrence.
+
+        Raises
+        ------
+        ValueError
+            If no occurrence of this series starts at that time.
+        """
+        if not self.is_occurrence(start):
+            raise ValueError(f"No occurrence of {self} starts at {start}.")
+        occurrence = self.build_occurrence(start)
+        try:
+            with transaction.atomic():
+                event, _ = self.events.get_or_create(
+                    occurrence=start,
+                    defaults={
+                        field.attname: getattr(occurrence, field.attname)
+                        for field in Event._meta.concrete_fields
+                        if field.editable and not field.primary_key
+                    },
+                )
+        except IntegrityError:
+            # The occurrence was stored concurrently.
+            event = self.events.get(occurrence=start)
+        return event
+
+    def get_occurrence_url(self, start: datetime) -> str:
+        """Get the URL of an occurrence.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime
+            The start of the occurrence.
+
+        Returns
+        -------
+        str
+            The URL of the page of the occurrence.
+        """
+        return reverse(
+            "events:occurrence",
+            kwargs={"slug": self.slug, "occurrence": format_occurrence(start)},
+        )
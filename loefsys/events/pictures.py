@@ -0,0 +1,100 @@
+"""Module containing the derivatives of the pictures of events.
+
+The uploaded picture of an event is stored as-is, which is often a photo of several
+megabytes. Pages don't serve this original, but resized variants of it in WebP and
+JPEG at a number of fixed widths. The browser picks the variant that fits best from a
+``srcset``.
+
+The variants are built by a Celery task after a picture is uploaded. They don't
+contain the metadata of the original, such as the EXIF data of the camera. Their names
+contain a hash of their content, so they never change and can be cached indefinitely.
+"""
+
+import hashlib
+import io
+from typing import TYPE_CHECKING
+
+from PIL import Image, ImageOps
+from django.core.files.base import ContentFile
+
+if TYPE_CHECKING:
+    from .models import Event
+
+PICTURE_WIDTHS = (320, 640, 1024, 1600)
+"""The widths in pixels of the variants of a picture."""
+
+PICTURE_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+"""The formats of the variants, as a mapping of extension to Pillow format."""
+
+PICTURE_QUALITY = 80
+"""The quality of the lossy compression of the variants."""
+
+
+def _variant_widths(width: int) -> list[int]:
+    """Get the widths of the variants of a picture with the given width.
+
+    A picture is never enlarged, so the variants are limited to the width of the
+    original. An original smaller than all widths gets a single variant at its own
+    width.
+    """
+    widths = [w for w in PICTURE_WIDTHS if w < width]
+    if width <= PICTURE_WIDTHS[-1]:
+        widths.append(width)
+    return widths
+
+
+def build_variants(event: "Event") -> dict[str, list[tuple[int, str]]]:
+    """Build the variants of the picture of an event and store them.
+
+    Parameters
+    ----------
+    event : ~loefsys.events.models.event.Event
+        The event with the picture.
+
+    Returns
+    -------
+    dict of str to list of (int, str)
+        For each extension in :data:`PICTURE_FORMATS`, the widths and the names in the
+        storage of the variants, ordered by width.
+    """
+    storage = event.picture.storage
+    with event.picture.open("rb") as file, Image.open(file) as original:
+        # Apply the orientation from the EXIF data, as the data itself is dropped.
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    variants = {extension: [] for extension in PICTURE_FORMATS}
+    for width in _variant_widths(image.width):
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for extension, image_format in PICTURE_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, quality=PICTURE_QUALITY, optimize=True)
+            content = buffer.getvalue()
+            digest = hashlib.sha256(content).hexdigest()[:16]
+            name = f"events/{event.slug}/picture-{width}w-{digest}.{extension}"
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+            variants[extension].append((width, name))
+    return variants
+
+
+def delete_variants(event: "Event", keep: dict[str, list[tuple[int, str]]]) -> None:
+    """Delete the stored variants of an event that are no longer in use.
+
+    Parameters
+    ----------
+    event : ~loefsys.events.models.event.Event
+        The event with the variants in :attr:`picture_variants`.
+    keep : dict of str to list of (int, str)
+        The variants that are still in use.
+
+    Returns
+    -------
+    None
+    """
+    storage = event.picture.storage
+    in_use = {name for variants in keep.values() for _, name in variants}
+    for variants in event.picture_variants.values():
+        for _, name in variants:
+            if name not in in_use:
+                storage.delete(name)
@@ -0,0 +1,188 @@
+"""Module containing the full-text search of events.
+
+On PostgreSQL, events have a generated ``tsvector`` column with the title,
+description and location, with a GIN index. The text is indexed with both the Dutch
+and the English configuration, as events are described in either language. Search
+results are ranked on the weights of the fields, and come with a snippet of the
+description in which the matches are highlighted.
+
+Other databases, such as SQLite in the tests, don't support this. The column then
+contains the plain text of the fields, which is searched for each of the terms with
+``LIKE``.
+"""
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.db import connection
+from django.db.models import Case, F, Func, Index, QuerySet, TextField, Value, When
+from django.db.models.functions import Coalesce, Concat
+from django.utils.html import escape
+
+SEARCH_CONFIGS = ("dutch", "english")
+"""The text search configurations with which the events are indexed."""
+
+SEARCH_WEIGHTS = {"title": "A", "description": "B", "location": "C"}
+"""The weight of each field in the ranking of the results."""
+
+# Characters from the private use area of Unicode that mark the start and the end of a
+# match in a snippet, which are replaced after the snippet is escaped.
+_START_SELECTION = "\ue000"
+_STOP_SELECTION = "\ue001"
+
+_FALLBACK_SNIPPET_LENGTH = 200
+
+
+class SearchDocument(Func):
+    """Expression of the search document of an event, for a generated column.
+
+    On PostgreSQL, this is the weighted ``tsvector`` of the fields in all
+    :data:`SEARCH_CONFIGS`. On other databases it is the concatenated text of the
+    fields.
+    """
+
+    output_field = SearchVectorField()
+
+    def __init__(self):
+        vectors = [
+            SearchVector(field, config=config, weight=weight)
+            for config in SEARCH_CONFIGS
+            for field, weight in SEARCH_WEIGHTS.items()
+        ]
+        vector = vectors[0]
+        for other in vectors[1:]:
+            vector = vector + other
+        text = Concat(
+            *(Coalesce(field, Value("")) for field in SEARCH_WEIGHTS), separator=" "
+        )
+        super().__init__(vector, text)
+
+    def as_sql(self, compiler, connection, **extra_context):  # noqa: ARG002 D102
+        return compiler.compile(self.source_expressions[1])
+
+    def as_postgresql(self, compiler, connection, **extra_context):  # noqa: ARG002 D102
+        return compiler.compile(self.source_expressions[0])
+
+
+class SearchDocumentIndex(GinIndex):
+    """GIN index of the search document, or a regular index on other databases."""
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):  # noqa: D102
+        if schema_editor.connection.vendor != "postgresql":
+            return Index.create_sql(self, model, schema_editor, using, **kwargs)
+        return super().create_sql(model, schema_editor, using, **kwargs)
+
+
+def search_events(events: QuerySet, text: str) -> QuerySet:
+    """Filter events on a search text and order them by relevance.
+
+    The events are annotated with their ``rank`` and with a ``snippet`` of the
+    description in which the matches are marked, see :func:`highlight`.
+
+    Parameters
+    ----------
+    events : ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+        The events to search.
+    text : str
+        The search text, in the syntax of web search engines on PostgreSQL.
+
+    Returns
+    -------
+    ~django.db.models.query.QuerySet of ~loefsys.events.models.event.Event
+        The matching events, the most relevant first.
+    """
+    if connection.vendor != "postgresql":
+        return _search_events_fallback(events, text)
+
+    query = SearchQuery(text, config=SEARCH_CONFIGS[0], search_type="websearch")
+    for config in SEARCH_CONFIGS[1:]:
+        query |= SearchQuery(text, config=config, search_type="websearch")
+    return (
+        events.filter(search_document=query)
+        .annotate(
+            rank=SearchRank(F("search_document"), query),
+            snippet=SearchHeadline(
+                Coalesce("description", Value(""), output_field=TextField()),
+                query,
+                config=SEARCH_CONFIGS[0],
+                start_sel=_START_SELECTION,
+                stop_sel=_STOP_SELECTION,
+                max_words=35,
+                min_words=15,
+            ),
+        )
+        .order_by("-rank", "-start")
+    )
+
+
+def _search_events_fallback(events: QuerySet, text: str) -> QuerySet:
+    """Search events with ``LIKE``, ranking matches in the title higher."""
+    terms = text.split()
+    for term in terms:
+        events = events.filter(search_document__icontains=term)
+    rank = sum(
+        (
+            Case(When(title__icontains=term, then=Value(1.0)), default=Value(0.1))
+            for term in terms
+        ),
+        start=Value(0.0),
+    )
+    return events.annotate(
+        rank=rank, snippet=Coalesce("description", Value(""), output_field=TextField())
+    ).order_by("-rank", "-start")
+
+
+def _mark_terms(snippet: str, text: str) -> str:
+    """Cut a snippet around the first term of the search text and mark the terms."""
+    lowered = snippet.lower()
+    terms = [term.lower() for term in text.split()]
+    positions = [index for term in terms if (index := lowered.find(term)) >= 0]
+    if positions and len(snippet) > _FALLBACK_SNIPPET_LENGTH:
+        start = max(min(positions) - _FALLBACK_SNIPPET_LENGTH // 4, 0)
+        snippet = snippet[start : start + _FALLBACK_SNIPPET_LENGTH]
+        lowered = snippet.lower()
+    marked = []
+    index = 0
+    while index < len(snippet):
+        term = next((term for term in terms if lowered.startswith(term, index)), None)
+        if term:
+            marked.append(
+                f"{_START_SELECTION}{snippet[index : index + len(term)]}"
+                f"{_STOP_SELECTION}"
+            )
+            index += len(term)
+        else:
+            marked.append(snippet[index])
+            index += 1
+    return "".join(marked)
+
+
+def highlight(snippet: str, text: str) -> str:
+    """Convert a snippet of a search result to HTML with the matches marked.
+
+    Parameters
+    ----------
+    snippet : str
+        The ``snippet`` annotated by :func:`search_events`.
+    text : str
+        The search text. Without full-text search, the snippet is the complete
+        description, which is then cut around the first match and in which the terms
+        are marked.
+
+    Returns
+    -------
+    str
+        The escaped snippet, with each match in a ``<mark>`` element.
+    """
+    if connection.vendor != "postgresql":
+        snippet = _mark_terms(snippet, text)
+    return (
+        escape(snippet)
+        .replace(_START_SELECTION, "<mark>")
+        .replace(_STOP_SELECTION, "</mark>")
+    )
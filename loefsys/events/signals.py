@@ -0,0 +1,69 @@
+"""Module for registering signals for event-related models."""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch.dispatcher import receiver
+
+from .caching import touch_events, touch_registrations
+from .models import (
+    Event,
+    EventRegistration,
+    EventSeries,
+    FeedToken,
+    MemberBalance,
+    RegistrationFormField,
+)
+from .models.managers import registration_counter_deltas
+from .tasks import build_event_picture_variants
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=RegistrationFormField)
+@receiver(post_delete, sender=RegistrationFormField)
+@receiver(post_save, sender=EventSeries)
+@receiver(post_delete, sender=EventSeries)
+def on_event_change(**_):
+    """Invalidate the cached event data when an event, its form or a series changes."""
+    touch_events()
+
+
+@receiver(pre_save, sender=Event)
+def on_event_pre_save(*, instance, **_):
+    """Detect whether a new picture is uploaded or the picture is removed."""
+    picture = instance.picture
+    instance._picture_changed = bool(
+        (picture and not picture._committed)
+        or (not picture and instance.picture_variants)
+    )
+
+
+@receiver(post_save, sender=Event)
+def on_event_post_save(*, instance, **_):
+    """Build the variants of the picture of an event when it has changed."""
+    if getattr(instance, "_picture_changed", False):
+        build_event_picture_variants.delay_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=EventRegistration)
+def on_registration_delete(*, instance, **_):
+    """Update the registration counters and the balance of a deleted registration."""
+    Event.objects.update_registration_counters(
+        instance.event_id, registration_counter_deltas(instance.status, None)
+    )
+    user_id, costs, paid = instance.ledger_entry()
+    if user_id is not None:
+        MemberBalance.objects.record([(user_id, -costs, -paid)])
+
+
+@receiver(post_save, sender=EventRegistration)
+@receiver(post_delete, sender=EventRegistration)
+def on_registration_change(*, instance, **_):
+    """Invalidate the cached data of the user of a saved or deleted registration."""
+    if instance.contact_id is not None:
+        touch_registrations(instance.contact_id)
+
+
+@receiver(post_delete, sender=FeedToken)
+def on_feed_token_delete(*, instance, **_):
+    """Remove the token of a deleted feed token from the cache."""
+    FeedToken.invalidate(instance.token)
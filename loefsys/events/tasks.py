@@ -0,0 +1,79 @@
+"""Module containing the tasks of the events app."""
+
+from datetime import timedelta
+
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import warm_event
+from .models import Event
+from .models.choices import AdmissionModes
+from .models.managers import actual_registration_counters
+from .pictures import build_variants, delete_variants
+
+PREWARM_AHEAD = timedelta(minutes=5)
+"""How long before the registration opens an event is pre-warmed."""
+
+HOT_DURATION = timedelta(minutes=30)
+"""How long after the registration opens an event stays hot."""
+
+
+@shared_task(ignore_result=True)
+def build_event_picture_variants(event_pk: int):
+    """Task that builds the resized variants of the picture of an event."""
+    event = Event.objects.filter(pk=event_pk).first()
+    if event is None:
+        return
+
+    variants = build_variants(event) if event.picture else {}
+    delete_variants(event, keep=variants)
+    Event.objects.filter(pk=event_pk).update(picture_variants=variants)
+
+
+@shared_task(ignore_result=True)
+def prewarm_events():
+    """Task that pre-warms the events of which the registration opens shortly.
+
+    It is scheduled every minute by Celery beat. Before the registration opens, the
+    registration counters of each event are recomputed while holding the lock of the
+    event, so that the recount can't interleave with a registration updating them.
+    Once it has opened, the counters are kept up to date by the registrations, so the
+    runs only cache the event again instead of blocking the rush. The events are
+    cached and marked as hot in the cache shared by all processes, see
+    :func:`~loefsys.events.caching.warm_event`. Events stay hot until
+    :data:`HOT_DURATION` after the registration opened, or until the registration
+    closes. An event that changes while it is hot is warmed again by the next run.
+    """
+    now = timezone.now()
+    events = Event.objects.published().filter(
+        registration_start__range=(now - HOT_DURATION, now + PREWARM_AHEAD)
+    )
+    for pk in events.filter(registration_start__gt=now).values_list("pk", flat=True):
+        with transaction.atomic():
+            Event(pk=pk).lock()
+            Event.objects.filter(pk=pk).update(**actual_registration_counters())
+
+    for event in events:
+        if event.registration_start <= now and not event.registrations_open():
+            continue
+        until = event.registration_start + HOT_DURATION
+        if event.registration_deadline:
+            until = min(until, event.registration_deadline)
+        warm_event(event, until)
+
+
+@shared_task(ignore_result=True)
+def draw_lotteries():
+    """Task that draws the lotteries of events of which the registration has closed.
+
+    It is scheduled every minute by Celery beat. Each lottery is drawn once, as no
+    registrations are pending after the draw.
+    """
+    events = Event.objects.filter(
+        admission=AdmissionModes.LOTTERY,
+        registration_deadline__lte=timezone.now(),
+        num_pending__gt=0,
+    )
+    for event in events:
+        event.draw_lottery()
@@ -0,0 +1,109 @@
+"""Module defining the concurrency tests for the admission of registrations."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Barrier
+
+from django.db import close_old_connections, connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.models import Event, EventRegistration
+from loefsys.events.models.choices import EventCategories, RegistrationStatus
+from loefsys.members.models import User
+
+
+def run_in_parallel(function, arguments):
+    """Call the function for all arguments at the same time, each in its own thread.
+
+    All threads wait on a barrier before calling the function, so that the calls hit
+    the database in the same instant. Every thread uses its own database connection,
+    which is closed afterwards.
+    """
+    barrier = Barrier(len(arguments))
+
+    def run(argument):
+        try:
+            barrier.wait()
+            return function(argument)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(arguments)) as executor:
+        return list(executor.map(run, arguments))
+
+
+def register(event_pk, user):
+    """Register the user for the event as the event view does."""
+    event = Event.objects.get(pk=event_pk)
+    registration = EventRegistration(event=event, contact=user, costs_paid=0)
+    registration.save()
+    return registration.status
+
+
+@skipUnlessDBFeature("has_select_for_update")
+class AdmissionConcurrencyTestCase(TransactionTestCase):
+    """Tests firing parallel registrations and cancellations for a single event.
+
+    The tests require a database that supports row locks and concurrent writers, such
+    as PostgreSQL. They are skipped on SQLite.
+    """
+
+    num_users = 20
+    capacity = 5
+
+    def setUp(self):
+        """Set up an event with limited capacity and a set of users."""
+        now = timezone.now()
+        self.event = G(
+            Event,
+            title="Popular event",
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            category=EventCategories.LEISURE,
+            capacity=self.capacity,
+            price=0.00,
+            fine=0.00,
+            published=True,
+        )
+        self.users = [
+            G(User, email=f"{i}@user.nl", picture=None) for i in range(self.num_users)
+        ]
+
+    def tearDown(self):
+        """Release the connections of the worker threads."""
+        close_old_connections()
+
+    def test_parallel_registrations(self):
+        """Test that exactly ``capacity`` parallel registrations become active."""
+        statuses = run_in_parallel(
+            lambda user: register(self.event.pk, user), self.users
+        )
+
+        self.assertEqual(statuses.count(RegistrationStatus.ACTIVE), self.capacity)
+        self.assertEqual(
+            statuses.count(RegistrationStatus.QUEUED), self.num_users - self.capacity
+        )
+        self.assertEqual(
+            self.event.eventregistration_set.active().count(), self.capacity
+        )
+
+    def test_parallel_cancellations(self):
+        """Test that parallel cancellations don't promote too many registrations."""
+        for user in self.users:
+            register(self.event.pk, user)
+        active = list(self.event.eventregistration_set.active())
+
+        run_in_parallel(lambda registration: registration.cancel(), active)
+
+        self.assertEqual(
+            self.event.eventregistration_set.active().count(), self.capacity
+        )
+        self.assertEqual(
+            self.event.eventregistration_set.queued().count(),
+            self.num_users - 2 * self.capacity,
+        )
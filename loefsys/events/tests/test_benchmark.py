@@ -0,0 +1,67 @@
+"""Module defining the tests for the benchmark of the registration protocol."""
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from loefsys.events.benchmark import compare_results
+from loefsys.events.models import Event, EventRegistration
+
+
+class BenchmarkTestCase(TestCase):
+    """Tests for running the benchmark and comparing it with a baseline."""
+
+    def benchmark(self, *args):
+        """Run a small benchmark and return its results."""
+        out = StringIO()
+        call_command(
+            "benchmark_registrations",
+            "--registrations=20",
+            "--iterations=3",
+            "--scenario=register",
+            "--scenario=cancel",
+            "--scenario=form",
+            *args,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        return json.loads(out.getvalue())
+
+    def test_results(self):
+        """Test that the scenarios are measured and the data is rolled back."""
+        results = self.benchmark()
+        self.assertEqual(set(results["scenarios"]), {"register", "cancel", "form"})
+        for result in results["scenarios"].values():
+            self.assertGreater(result["queries"], 0)
+            self.assertLessEqual(result["median_ms"], result["p95_ms"])
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(EventRegistration.objects.exists())
+
+    def test_baseline(self):
+        """Test that the command fails when a scenario makes more queries."""
+        results = self.benchmark()
+        results["scenarios"]["cancel"]["queries"] -= 1
+        results["scenarios"]["cancel"]["median_ms"] = 1e6
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / "baseline.json"
+            baseline.write_text(json.dumps(results))
+            with self.assertRaisesMessage(CommandError, "cancel: "):
+                self.benchmark(f"--baseline={baseline}")
+
+    def test_compare(self):
+        """Test that slower scenarios regress beyond the threshold only."""
+        baseline = {"scenarios": {"detail": {"median_ms": 10.0, "queries": 3}}}
+
+        def results(median_ms, queries=3):
+            return {
+                "scenarios": {"detail": {"median_ms": median_ms, "queries": queries}}
+            }
+
+        self.assertEqual(compare_results(results(11.9), baseline, 0.2), [])
+        self.assertEqual(len(compare_results(results(12.1), baseline, 0.2)), 1)
+        self.assertEqual(len(compare_results(results(12.1, 4), baseline, 0.2)), 2)
+        self.assertEqual(compare_results(results(50.0), {"scenarios": {}}, 0.2), [])
@@ -0,0 +1,107 @@
+"""Module defining the tests for the dashboard of event organizers."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.models import Event, EventRegistration, RegistrationFormField
+from loefsys.events.models.choices import RegistrationStatus
+from loefsys.events.models.event import EventOrganizer
+from loefsys.events.views import OrganizerDashboardView
+from loefsys.groups.models import LoefbijterGroup
+from loefsys.members.models import User
+
+PAYMENTS = (Decimal("10.00"), Decimal("10.00"), *[Decimal("1.00")] * 4)
+"""The amounts paid for the registrations of the first event."""
+
+
+class OrganizerDashboardTestCase(TestCase):
+    """Tests for listing the events of an organizer with their statistics."""
+
+    def setUp(self):
+        """Set up an event organized by a user and one organized by their group."""
+        now = timezone.now()
+        self.organizer = G(User, email="organizer@user.nl", picture=None)
+        self.group = G(LoefbijterGroup)
+        self.organizer.groups.add(self.group)
+        self.events = [
+            G(
+                Event,
+                start=now + timedelta(days=7 + i),
+                end=now + timedelta(days=8 + i),
+                capacity=None,
+                price=Decimal("10.00"),
+                fine=Decimal("4.00"),
+            )
+            for i in range(3)
+        ]
+        G(EventOrganizer, event=self.events[0]).user.add(self.organizer)
+        G(EventOrganizer, event=self.events[1]).groups.add(self.group)
+        G(EventOrganizer, event=self.events[2])
+
+        self.field = RegistrationFormField.objects.create(
+            event=self.events[0], type=RegistrationFormField.TEXT_FIELD, subject="Diet"
+        )
+        RegistrationFormField.objects.create(
+            event=self.events[0],
+            type=RegistrationFormField.BOOLEAN_FIELD,
+            subject="Car",
+            required=False,
+        )
+        statuses = (
+            RegistrationStatus.ACTIVE,
+            RegistrationStatus.ACTIVE,
+            RegistrationStatus.ACTIVE,
+            RegistrationStatus.QUEUED,
+            RegistrationStatus.CANCELLED_FINE,
+            RegistrationStatus.CANCELLED_NOFINE,
+        )
+        for i, (status, paid) in enumerate(zip(statuses, PAYMENTS, strict=True)):
+            registration = G(
+                EventRegistration,
+                event=self.events[0],
+                contact=G(User, email=f"{i}@user.nl", picture=None),
+                costs_paid=paid,
+            )
+            # The status is set afterwards, as saving admits new registrations.
+            EventRegistration.objects.filter(pk=registration.pk).update(status=status)
+            if i == 0:
+                RegistrationFormField.set_values(registration, [(self.field, "Vegan")])
+
+    def test_organized_by(self):
+        """Test that the events organized directly or through a group are found."""
+        events = Event.objects.organized_by(self.organizer)
+        self.assertCountEqual(events, self.events[:2])
+        self.assertFalse(Event.objects.organized_by(G(User, picture=None)).exists())
+
+    def test_statistics(self):
+        """Test that the statistics of all events are computed in a single query."""
+        with self.assertNumQueries(1):
+            events = {
+                event.pk: event
+                for event in Event.objects.organized_by(
+                    self.organizer
+                ).with_statistics()
+            }
+        event = events[self.events[0].pk]
+        self.assertEqual(
+            (event.active_count, event.queued_count, event.cancelled_count), (3, 1, 2)
+        )
+        self.assertEqual(event.revenue, Decimal("24.00"))
+        self.assertEqual(event.outstanding_fines, Decimal("3.00"))
+        self.assertAlmostEqual(event.form_completion_rate, 1 / 3)
+
+        empty = events[self.events[1].pk]
+        self.assertEqual((empty.active_count, empty.revenue), (0, Decimal("0.00")))
+        self.assertIsNone(empty.form_completion_rate)
+
+    def test_view(self):
+        """Test that the dashboard lists the events of the organizer, latest first."""
+        request = RequestFactory().get("/")
+        request.user = self.organizer
+        view = OrganizerDashboardView()
+        view.setup(request)
+        self.assertEqual(list(view.get_queryset()), self.events[1::-1])
@@ -0,0 +1,145 @@
+"""Module defining the tests for the export of event registrations."""
+
+import csv
+import io
+from datetime import timedelta
+from unittest import mock
+from xml.etree import ElementTree
+from zipfile import ZipFile
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.models import Event, EventRegistration, RegistrationFormField
+from loefsys.events.models.event import EventOrganizer
+from loefsys.groups.models import LoefbijterGroup
+from loefsys.members.models import User
+
+SPREADSHEETML = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+class RegistrationExportTestCase(TestCase):
+    """Tests for exporting the registrations of an event."""
+
+    def setUp(self):
+        """Set up an event with form fields, registrations and an organizer."""
+        now = timezone.now()
+        self.event = G(
+            Event,
+            title="Export event",
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=None,
+            price=5.00,
+            published=True,
+        )
+        self.question = RegistrationFormField.objects.create(
+            event=self.event, type=RegistrationFormField.TEXT_FIELD, subject="Diet"
+        )
+        self.boolean = RegistrationFormField.objects.create(
+            event=self.event, type=RegistrationFormField.BOOLEAN_FIELD, subject="Car"
+        )
+        for i in range(5):
+            registration = EventRegistration(
+                event=self.event,
+                contact=G(
+                    User, email=f"{i}@user.nl", first_name=f"User {i}", last_name=""
+                ),
+                costs_paid=0,
+            )
+            registration.save()
+            RegistrationFormField.set_values(
+                registration, [(self.question, f"Diet {i}"), (self.boolean, i % 2 == 0)]
+            )
+
+        self.organizer = G(User, email="organizer@user.nl", picture=None)
+        G(EventOrganizer, event=self.event).user.add(self.organizer)
+        self.client = Client()
+        self.client.force_login(self.organizer)
+
+    def export(self, export_format):
+        """Request the export and return the streamed content."""
+        response = self.client.get(
+            reverse("events:registration_export", kwargs={"slug": self.event.slug}),
+            {"format": export_format},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_csv(self):
+        """Test that the CSV export has a row per registration with the answers."""
+        rows = list(csv.reader(io.StringIO(self.export("csv").decode())))
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0][-2:], ["Diet", "Car"])
+        self.assertEqual(rows[1][0], "User 0")
+        self.assertEqual(rows[1][1], "0@user.nl")
+        self.assertEqual(rows[1][-2:], ["Diet 0", "True"])
+        self.assertEqual(rows[2][-2:], ["Diet 1", "False"])
+
+    def test_formula(self):
+        """Test that answers that would be read as a formula are escaped in CSV."""
+        registration = EventRegistration.objects.filter(event=self.event).first()
+        answer = '=HYPERLINK("http://example.com")'
+        RegistrationFormField.set_values(registration, [(self.question, answer)])
+
+        rows = list(csv.reader(io.StringIO(self.export("csv").decode())))
+        self.assertEqual(rows[1][-2], f"'{answer}")
+
+        with ZipFile(io.BytesIO(self.export("xlsx"))) as archive:
+            sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+        texts = [text.text for text in sheet.iter(f"{SPREADSHEETML}t")]
+        self.assertIn(answer, texts)
+        self.assertNotIn(f"'{answer}", texts)
+
+    def test_xlsx(self):
+        """Test that the XLSX export is a workbook with the same rows."""
+        with ZipFile(io.BytesIO(self.export("xlsx"))) as archive:
+            self.assertIn("xl/workbook.xml", archive.namelist())
+            sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+
+        rows = sheet.findall(f"{SPREADSHEETML}sheetData/{SPREADSHEETML}row")
+        self.assertEqual(len(rows), 6)
+        cells = rows[1].findall(f"{SPREADSHEETML}c")
+        self.assertEqual(
+            cells[0].findtext(f"{SPREADSHEETML}is/{SPREADSHEETML}t"), "User 0"
+        )
+        self.assertEqual(cells[-1].get("t"), "b")
+        self.assertEqual(cells[-1].findtext(f"{SPREADSHEETML}v"), "1")
+
+    def test_chunked(self):
+        """Test that the answers are loaded per chunk of registrations."""
+        with (
+            mock.patch("loefsys.events.export.EXPORT_CHUNK_SIZE", 2),
+            # Session, user, event, organizer, fields, registrations, and two answer
+            # tables for each of the three chunks.
+            self.assertNumQueries(12),
+        ):
+            rows = self.export("csv").decode().splitlines()
+        self.assertEqual(len(rows), 6)
+
+    def test_permission(self):
+        """Test that only organizers and superusers can export the registrations."""
+        url = reverse("events:registration_export", kwargs={"slug": self.event.slug})
+        user = G(User, email="other@user.nl", picture=None)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        group = G(LoefbijterGroup)
+        user.groups.add(group)
+        self.event.eventorganizer.groups.add(group)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_login(G(User, email="admin@user.nl", is_superuser=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_unknown_format(self):
+        """Test that an unsupported format results in a 404."""
+        url = reverse("events:registration_export", kwargs={"slug": self.event.slug})
+        self.assertEqual(self.client.get(url, {"format": "pdf"}).status_code, 404)
@@ -3,17 +3,23 @@
 import io
 import shutil
 import tempfile
+from base64 import urlsafe_b64encode
 from datetime import timedelta
 
 from PIL import Image
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.http import Http404
+from django.test import Client, RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django_dynamic_fixture import G
 
-from loefsys.events.models import Event
+from loefsys.events.models import Event, EventRegistration, RegistrationFormField
 from loefsys.events.models.choices import EventCategories
+from loefsys.events.models.feed_token import FeedToken, _token_cache_key
+from loefsys.events.views import EventView
 from loefsys.members.models import User
 
 
@@ -263,3 +269,457 @@ class EventRegistrationTestCase(TestCase):
         # Check if fine amount is on cancellation form
         response = self.client.get(self.event_with_10_euro_fine.get_absolute_url())
         self.assertContains(response=response, text="(€10,00 boete)")
+
+
+class EventFillerTestCase(TestCase):
+    """Tests for the data of the event calendar."""
+
+    def setUp(self):
+        """Set up events inside and outside of the requested window."""
+        self.client = Client()
+        self.now = timezone.now()
+        self.event_in_window = G(
+            Event,
+            title="Event in window",
+            start=self.now + timedelta(days=2),
+            end=self.now + timedelta(days=3),
+            published=True,
+        )
+        self.event_overlapping_window = G(
+            Event,
+            title="Event overlapping window",
+            start=self.now - timedelta(days=2),
+            end=self.now + timedelta(days=1),
+            published=True,
+        )
+        self.event_outside_window = G(
+            Event,
+            title="Event outside window",
+            start=self.now + timedelta(weeks=10),
+            end=self.now + timedelta(weeks=11),
+            published=True,
+        )
+        self.event_unpublished = G(
+            Event,
+            title="Unpublished event",
+            start=self.now + timedelta(days=2),
+            end=self.now + timedelta(days=3),
+            published=False,
+        )
+        self.window = {
+            "start": self.now.isoformat(),
+            "end": (self.now + timedelta(weeks=1)).isoformat(),
+        }
+
+    def test_window(self):
+        """Test that only published events overlapping the window are returned."""
+        response = self.client.get(reverse("events:event_filler"), self.window)
+        self.assertEqual(response.status_code, 200)
+        titles = [event["title"] for event in response.json()]
+        self.assertEqual(titles, ["Event overlapping window", "Event in window"])
+        self.assertEqual(
+            response.json()[1]["url"], self.event_in_window.get_absolute_url()
+        )
+
+    def test_no_window(self):
+        """Test that all published events are returned without a window."""
+        response = self.client.get(reverse("events:event_filler"))
+        self.assertEqual(len(response.json()), 3)
+
+    def test_not_modified(self):
+        """Test that a revalidation with a matching ETag results in a 304."""
+        response = self.client.get(reverse("events:event_filler"), self.window)
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        response = self.client.get(
+            reverse("events:event_filler"),
+            self.window,
+            headers={"if-none-match": response["ETag"]},
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalidated_on_save(self):
+        """Test that saving an event invalidates the cached response."""
+        response = self.client.get(reverse("events:event_filler"), self.window)
+        etag = response["ETag"]
+
+        self.event_outside_window.start = self.now + timedelta(days=4)
+        self.event_outside_window.end = self.now + timedelta(days=5)
+        self.event_outside_window.save()
+
+        response = self.client.get(
+            reverse("events:event_filler"), self.window, headers={"if-none-match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+
+class EventDetailQueryTestCase(TestCase):
+    """Tests for the data of the event detail page."""
+
+    def setUp(self):
+        """Set up an event with a full queue."""
+        now = timezone.now()
+        self.event = G(
+            Event,
+            title="Event with queue",
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=2,
+            fine=10,
+            published=True,
+        )
+        G(RegistrationFormField, event=self.event)
+        self.users = [G(User, email=f"{i}@user.nl", picture=None) for i in range(6)]
+        for user in self.users:
+            EventRegistration(event=self.event, contact=user, costs_paid=0).save()
+
+    def get_context(self, user):
+        """Get the context of the event view without rendering the template."""
+        request = RequestFactory().get(self.event.get_absolute_url())
+        request.user = user
+        view = EventView()
+        view.setup(request, slug=self.event.slug)
+        view.object = view.get_object()
+        return view.get_context_data(object=view.object)
+
+    def test_queue_position(self):
+        """Test that the registration information of the user is correct."""
+        context = self.get_context(self.users[0])
+        self.assertTrue(context["registration_active"])
+        self.assertEqual(context["queue_position"], 0)
+        self.assertEqual(context["num_registrations"], 2)
+        self.assertEqual(context["fine_amount_display"], "10,00")
+
+        context = self.get_context(self.users[4])
+        self.assertTrue(context["registration_active"])
+        self.assertEqual(context["queue_position"], 3)
+
+        context = self.get_context(G(User, email="other@user.nl", picture=None))
+        self.assertFalse(context["registration_active"])
+        self.assertEqual(context["queue_position"], 0)
+
+    def test_query_count(self):
+        """Test that the event page data is loaded in a single query."""
+        for user in (self.users[0], self.users[5], AnonymousUser()):
+            with self.assertNumQueries(1):
+                context = self.get_context(user)
+                self.assertTrue(context["event"].has_form_fields)
+
+    def test_unpublished(self):
+        """Test that unpublished events are not found."""
+        Event.objects.filter(pk=self.event.pk).update(published=False)
+        with self.assertRaises(Http404):
+            self.get_context(self.users[0])
+
+
+class EventFeedTestCase(TestCase):
+    """Tests for the cached iCalendar feeds."""
+
+    def setUp(self):
+        """Set up users with feed tokens and events."""
+        self.client = Client()
+        now = timezone.now()
+        self.user1 = G(User, email="1@user.nl", picture=None)
+        self.user2 = G(User, email="2@user.nl", picture=None)
+        self.token1 = FeedToken.objects.create(user=self.user1).token
+        self.token2 = FeedToken.objects.create(user=self.user2).token
+        self.event = G(
+            Event,
+            title="Feed event",
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=None,
+            published=True,
+        )
+
+    def get_feed(self, name, token, **headers):
+        """Request a feed with the given token."""
+        return self.client.get(reverse(name), {"u": token}, headers=headers)
+
+    def test_not_modified(self):
+        """Test that a revalidation of an unchanged feed results in a 304."""
+        response = self.get_feed("events:other_event_feed", self.token1)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Feed event")
+
+        for headers in (
+            {"if-none-match": response["ETag"]},
+            {"if-modified-since": response["Last-Modified"]},
+        ):
+            response = self.get_feed("events:other_event_feed", self.token1, **headers)
+            self.assertEqual(response.status_code, 304)
+
+    def test_cached(self):
+        """Test that a cached feed is served without rendering it again."""
+        self.get_feed("events:registered_event_feed", self.token1)
+        with self.assertNumQueries(0):
+            response = self.get_feed("events:registered_event_feed", self.token1)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    def test_registration_invalidates_own_feed(self):
+        """Test that a registration only invalidates the feeds of its user."""
+        etag1 = self.get_feed("events:registered_event_feed", self.token1)["ETag"]
+        etag2 = self.get_feed("events:registered_event_feed", self.token2)["ETag"]
+
+        EventRegistration(event=self.event, contact=self.user1, costs_paid=0).save()
+
+        response = self.get_feed(
+            "events:registered_event_feed", self.token1, if_none_match=etag1
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Feed event")
+        response = self.get_feed(
+            "events:registered_event_feed", self.token2, if_none_match=etag2
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_event_invalidates_all_feeds(self):
+        """Test that a change to an event invalidates the feeds of all users."""
+        etag = self.get_feed("events:other_event_feed", self.token2)["ETag"]
+
+        self.event.title = "Renamed event"
+        self.event.save()
+
+        response = self.get_feed(
+            "events:other_event_feed", self.token2, if_none_match=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Renamed event")
+
+
+class FeedTokenTestCase(TestCase):
+    """Tests for the resolution and rotation of feed tokens."""
+
+    def setUp(self):
+        """Set up a user with a feed token."""
+        self.user = G(User, email="1@user.nl", picture=None)
+        self.feed_token = FeedToken.objects.create(user=self.user)
+
+    def test_token_stable(self):
+        """Test that saving a feed token doesn't change the token."""
+        token = self.feed_token.token
+        self.feed_token.save()
+        self.feed_token.refresh_from_db()
+        self.assertEqual(self.feed_token.token, token)
+
+    def test_get_user(self):
+        """Test that the user of a token is resolved in a single query."""
+        with self.assertNumQueries(1):
+            self.assertEqual(FeedToken.get_user(self.feed_token.token), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(FeedToken.get_user_pk(self.feed_token.token), self.user.pk)
+        self.assertIsNone(FeedToken.get_user("unknown"))
+
+    def test_rotate(self):
+        """Test that rotating a token invalidates the old token."""
+        old_token = self.feed_token.token
+        self.assertEqual(FeedToken.get_user_pk(old_token), self.user.pk)
+
+        self.feed_token.rotate()
+
+        self.assertNotEqual(self.feed_token.token, old_token)
+        self.assertIsNone(FeedToken.get_user_pk(old_token))
+        self.assertEqual(FeedToken.get_user_pk(self.feed_token.token), self.user.pk)
+
+    def test_rotate_cached_before_commit(self):
+        """Test that a token cached again before the rotation commits is removed."""
+        old_token = self.feed_token.token
+        with self.captureOnCommitCallbacks(execute=True):
+            self.feed_token.rotate()
+            cache.set(_token_cache_key(old_token), self.user.pk)
+
+        self.assertIsNone(FeedToken.get_user_pk(old_token))
+
+    def test_delete(self):
+        """Test that deleting a feed token invalidates the token."""
+        token = self.feed_token.token
+        self.assertEqual(FeedToken.get_user_pk(token), self.user.pk)
+
+        self.feed_token.delete()
+
+        self.assertIsNone(FeedToken.get_user_pk(token))
+
+
+class RegistrationFormSubmitTestCase(TestCase):
+    """Tests for submitting the registration form of an event."""
+
+    def setUp(self):
+        """Set up an event with many form fields and a registered user."""
+        now = timezone.now()
+        self.user = G(User, email="1@user.nl", picture=None)
+        self.event = G(
+            Event,
+            title="Form event",
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=None,
+            published=True,
+        )
+        EventRegistration(event=self.event, contact=self.user, costs_paid=0).save()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def add_fields(self, amount):
+        """Add text and integer fields to the form of the event."""
+        return [
+            RegistrationFormField.objects.create(
+                event=self.event,
+                type=field_type,
+                subject=f"Question {i}",
+                required=False,
+            )
+            for i in range(amount)
+            for field_type in (
+                RegistrationFormField.TEXT_FIELD,
+                RegistrationFormField.INTEGER_FIELD,
+            )
+        ]
+
+    def submit(self, fields):
+        """Submit an answer for every field."""
+        data = {str(field.pk): i for i, field in enumerate(fields)}
+        return self.client.post(
+            reverse("events:registration", kwargs={"slug": self.event.slug}), data
+        )
+
+    def test_submit(self):
+        """Test that the answers are saved."""
+        fields = self.add_fields(2)
+        response = self.submit(fields)
+        self.assertRedirects(
+            response, self.event.get_absolute_url(), fetch_redirect_response=False
+        )
+
+        registration = EventRegistration.objects.get(contact=self.user)
+        self.assertEqual(
+            [value for _, value in registration.form_fields], ["0", 1, "2", 3]
+        )
+
+    def test_submit_queries(self):
+        """Test that the number of queries doesn't depend on the number of fields."""
+        fields = self.add_fields(1)
+        with self.assertNumQueries(11):
+            self.submit(fields)
+
+        fields += self.add_fields(15)
+        with self.assertNumQueries(11):
+            self.submit(fields)
+
+
+class EventListApiTestCase(TestCase):
+    """Tests for the paginated JSON list of events."""
+
+    def setUp(self):
+        """Set up events, some starting at the same time, and a registered user."""
+        now = timezone.now().replace(microsecond=0)
+        self.user = G(User, email="1@user.nl", picture=None)
+        self.events = [
+            G(
+                Event,
+                title=f"Event {i}",
+                start=now + timedelta(days=i // 2 + 1),
+                end=now + timedelta(days=i // 2 + 2),
+                registration_start=now - timedelta(days=1),
+                registration_deadline=now + timedelta(hours=12),
+                cancelation_deadline=now + timedelta(hours=12),
+                category=(
+                    EventCategories.LEISURE if i % 2 else EventCategories.COMPETITION
+                ),
+                capacity=1,
+                published=True,
+            )
+            for i in range(7)
+        ]
+        G(Event, start=now, end=now + timedelta(days=1), published=False)
+        EventRegistration(
+            event=self.events[3], contact=G(User, email="2@user.nl"), costs_paid=0
+        ).save()
+        EventRegistration(event=self.events[3], contact=self.user, costs_paid=0).save()
+        self.client = Client()
+
+    def get_all(self, **params):
+        """Page through all events and return the titles."""
+        titles = []
+        url = reverse("events:event_list_api")
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            titles += [event["title"] for event in data["results"]]
+            url, params = data["next"], {}
+        return titles
+
+    def test_pagination(self):
+        """Test that paging returns every event once, in order of start."""
+        self.assertEqual(self.get_all(limit=2), [event.title for event in self.events])
+
+    def test_page_query(self):
+        """Test that a page is loaded with a single query, besides the series."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("events:event_list_api"), {"limit": 3})
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_filters(self):
+        """Test the filters on category, date range and registration."""
+        self.assertEqual(
+            self.get_all(category=EventCategories.LEISURE),
+            ["Event 1", "Event 3", "Event 5"],
+        )
+        self.assertEqual(
+            self.get_all(
+                start=self.events[2].start.isoformat(),
+                end=self.events[4].start.isoformat(),
+            ),
+            ["Event 2", "Event 3"],
+        )
+        self.assertEqual(self.get_all(registered="true"), [])
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.get_all(registered="true"), ["Event 3"])
+
+    def test_registration_info(self):
+        """Test that the counts and the status of the user are included."""
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("events:event_list_api"), {"registered": "true"}
+        )
+        (event,) = response.json()["results"]
+        self.assertEqual(event["num_active"], 1)
+        self.assertEqual(event["num_queued"], 1)
+        self.assertEqual(event["registration_status"], "queued")
+        self.assertEqual(event["queue_position"], 1)
+        self.assertEqual(event["url"], self.events[3].get_absolute_url())
+
+    def test_unpublished(self):
+        """Test that only superusers can list unpublished events."""
+        url = reverse("events:event_list_api")
+        self.assertEqual(len(self.get_all(published="all")), 7)
+
+        self.client.force_login(G(User, email="admin@user.nl", is_superuser=True))
+        self.assertEqual(len(self.get_all(published="all")), 8)
+        self.assertEqual(len(self.get_all(published="false")), 1)
+        self.assertEqual(self.client.get(url, {"published": "maybe"}).status_code, 400)
+
+    def test_invalid(self):
+        """Test that invalid parameters result in a 400."""
+        url = reverse("events:event_list_api")
+        # The start in the cursor must include its timezone.
+        naive = urlsafe_b64encode(b"2025-01-01T12:00:00|1").decode()
+        for params in (
+            {"cursor": "nonsense"},
+            {"cursor": naive},
+            {"limit": "0"},
+            {"category": "99"},
+        ):
+            self.assertEqual(self.client.get(url, params).status_code, 400)
@@ -1,8 +1,26 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
 from django_dynamic_fixture import G
 
-from loefsys.events.models import Event, EventRegistration
+from loefsys.events.models import Event, EventRegistration, MemberBalance
+from loefsys.events.models.choices import AdmissionModes, RegistrationStatus
 from loefsys.events.models.event import EventOrganizer
+from loefsys.events.models.registration_form_field import (
+    RegistrationFormField,
+    TextRegistrationInformation,
+    prefetch_form_fields,
+)
+from loefsys.events.tasks import draw_lotteries
+from loefsys.members.models import User
 
 
 class EventTestCase(TestCase):
@@ -41,3 +59,461 @@ class EventRegistrationTestCase(TestCase):
                                  end="2023-01-01 00:00:00+00:00"))
         self.assertIsNotNone(registration)
         self.assertIsNotNone(registration.pk)
+
+
+class RegistrationCounterTestCase(TestCase):
+    """Tests for the registration counters of an event."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.event = G(
+            Event,
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=2,
+        )
+        self.users = [G(User, email=f"{i}@user.nl", picture=None) for i in range(4)]
+
+    def register(self, user):
+        registration = EventRegistration(event=self.event, contact=user, costs_paid=0)
+        registration.save()
+        return registration
+
+    def assertCounters(self, active, queued, cancelled):  # noqa: N802
+        self.event.refresh_from_db()
+        self.assertEqual(
+            (self.event.num_active, self.event.num_queued, self.event.num_cancelled),
+            (active, queued, cancelled),
+        )
+        self.assertEqual(self.event.eventregistration_set.active().count(), active)
+        self.assertEqual(self.event.eventregistration_set.queued().count(), queued)
+        self.assertEqual(
+            self.event.eventregistration_set.cancelled().count(), cancelled
+        )
+
+    def test_register(self):
+        """Test that registering updates the active and queued counters."""
+        registrations = [self.register(user) for user in self.users]
+        self.assertEqual(
+            [registration.status for registration in registrations],
+            [RegistrationStatus.ACTIVE] * 2 + [RegistrationStatus.QUEUED] * 2,
+        )
+        self.assertCounters(active=2, queued=2, cancelled=0)
+
+    def test_cancel_with_promotion(self):
+        """Test that cancelling and promoting from the queue update the counters."""
+        registrations = [self.register(user) for user in self.users]
+        registrations[0].cancel()
+        self.assertCounters(active=2, queued=1, cancelled=1)
+
+        registrations[3].cancel()
+        self.assertCounters(active=2, queued=0, cancelled=2)
+
+    def test_cancel_twice(self):
+        """Test that a stale cancellation doesn't change the counters twice."""
+        registration = self.register(self.users[0])
+        stale = EventRegistration.objects.get(pk=registration.pk)
+        registration.cancel()
+        stale.cancel()
+        self.assertCounters(active=0, queued=0, cancelled=1)
+
+    def test_reregister_after_cancel(self):
+        """Test that removing an old cancelled registration updates the counters."""
+        self.register(self.users[0]).cancel()
+        self.register(self.users[0]).cancel()
+        self.assertCounters(active=0, queued=0, cancelled=1)
+
+    def test_delete(self):
+        """Test that deleting a registration updates the counters."""
+        self.register(self.users[0])
+        self.register(self.users[1]).delete()
+        self.assertCounters(active=1, queued=0, cancelled=0)
+
+    def test_save_stale_event(self):
+        """Test that saving an outdated event doesn't overwrite the counters."""
+        stale = Event.objects.get(pk=self.event.pk)
+        self.register(self.users[0])
+        self.register(self.users[1])
+        stale.title = "Renamed"
+        stale.save()
+        self.assertCounters(active=2, queued=0, cancelled=0)
+        self.assertEqual(self.event.title, "Renamed")
+
+        self.assertEqual(self.register(self.users[2]).status, RegistrationStatus.QUEUED)
+
+    def test_check_command(self):
+        """Test that the management command detects and repairs drift."""
+        for user in self.users:
+            self.register(user)
+        Event.objects.filter(pk=self.event.pk).update(num_active=0, num_queued=5)
+
+        out = StringIO()
+        call_command("check_registration_counters", stdout=out)
+        self.assertIn("num_active 0 != 2", out.getvalue())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.num_active, 0)
+
+        call_command("check_registration_counters", "--repair", stdout=StringIO())
+        self.assertCounters(active=2, queued=2, cancelled=0)
+
+
+class MemberBalanceTestCase(TestCase):
+    """Tests for the balances of the event costs of users."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.event = G(
+            Event,
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now - timedelta(hours=1),
+            capacity=1,
+            price=Decimal("12.50"),
+            fine=Decimal("5.00"),
+        )
+        self.users = [G(User, email=f"{i}@user.nl", picture=None) for i in range(2)]
+
+    def register(self, user):
+        registration = EventRegistration(event=self.event, contact=user, costs_paid=0)
+        registration.save()
+        return registration
+
+    def assertBalance(self, user, costs, paid):  # noqa: N802
+        balance = MemberBalance.objects.get(user=user)
+        self.assertEqual((balance.costs, balance.paid), (Decimal(costs), Decimal(paid)))
+        self.assertEqual(balance.outstanding, Decimal(costs) - Decimal(paid))
+
+    def test_register_and_pay(self):
+        """Test that registering and paying update the balance."""
+        registration = self.register(self.users[0])
+        self.assertBalance(self.users[0], "12.50", "0")
+
+        registration.costs_paid = Decimal("10.00")
+        registration.save()
+        self.assertBalance(self.users[0], "12.50", "10.00")
+
+    def test_fine_and_promotion(self):
+        """Test that a late cancellation is fined and the promotion is charged."""
+        registration = self.register(self.users[0])
+        self.register(self.users[1])
+        self.assertFalse(MemberBalance.objects.filter(user=self.users[1]).exists())
+
+        registration.cancel()
+        self.assertBalance(self.users[0], "5.00", "0")
+        self.assertBalance(self.users[1], "12.50", "0")
+
+    def test_delete(self):
+        """Test that deleting a registration removes its costs."""
+        self.register(self.users[0]).delete()
+        self.assertBalance(self.users[0], "0", "0")
+
+    def test_reconcile_command(self):
+        """Test that the management command detects and repairs drift."""
+        for user in self.users:
+            self.register(user)
+        MemberBalance.objects.filter(user=self.users[0]).update(costs=Decimal(1))
+        MemberBalance.objects.filter(user=self.users[0]).delete()
+        MemberBalance.objects.create(user=self.users[1], paid=Decimal(3))
+
+        out = StringIO()
+        call_command("reconcile_balances", stdout=out)
+        self.assertIn("paid 3.00 != 0", out.getvalue())
+        self.assertIn("1 users with registrations have no balance.", out.getvalue())
+
+        call_command("reconcile_balances", "--repair", stdout=StringIO())
+        self.assertBalance(self.users[0], "12.50", "0")
+        self.assertBalance(self.users[1], "0", "0")
+
+
+class LotteryTestCase(TestCase):
+    """Tests for the admission of registrations by lottery."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.event = G(
+            Event,
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=2,
+            admission=AdmissionModes.LOTTERY,
+        )
+        self.users = [G(User, email=f"{i}@user.nl", picture=None) for i in range(5)]
+        self.registrations = []
+        for user in self.users:
+            registration = EventRegistration(
+                event=self.event, contact=user, costs_paid=0
+            )
+            registration.save()
+            self.registrations.append(registration)
+
+    def test_pending(self):
+        """Test that registrations are pending until the draw."""
+        self.assertTrue(
+            all(r.status == RegistrationStatus.PENDING for r in self.registrations)
+        )
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.num_active, self.event.num_pending), (0, 5))
+
+    def test_draw(self):
+        """Test that the draw admits up to the capacity and queues the others."""
+        self.event.draw_lottery(seed=42)
+
+        drawn = sorted(registration.pk for registration in self.registrations)
+        random.Random(42).shuffle(drawn)
+        registrations = self.event.eventregistration_set.order_by("queue_order")
+        self.assertEqual(
+            {r.pk for r in registrations if r.status == RegistrationStatus.ACTIVE},
+            set(drawn[:2]),
+        )
+        self.assertEqual(
+            [
+                (r.pk, r.queue_order)
+                for r in registrations
+                if r.status == RegistrationStatus.QUEUED
+            ],
+            [(pk, i) for i, pk in enumerate(drawn[2:], 1)],
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(
+            (self.event.num_active, self.event.num_queued, self.event.num_pending),
+            (2, 3, 0),
+        )
+
+    def test_draw_unlimited(self):
+        """Test that everyone is admitted to an event without capacity."""
+        for capacity in (None, 0):
+            Event.objects.filter(pk=self.event.pk).update(capacity=capacity)
+            self.event.eventregistration_set.update(status=RegistrationStatus.PENDING)
+            Event.objects.filter(pk=self.event.pk).update(num_active=0, num_pending=5)
+
+            self.event.draw_lottery()
+
+            self.assertFalse(self.event.eventregistration_set.queued().exists())
+            self.event.refresh_from_db()
+            self.assertEqual((self.event.num_active, self.event.num_pending), (5, 0))
+
+    def test_queue_order(self):
+        """Test that the queue follows the drawn order."""
+        self.event.draw_lottery(seed=7)
+        queued = list(self.event.eventregistration_set.queued().order_by("queue_order"))
+
+        user = queued[1].contact
+        event = Event.objects.with_registration_info(user).get(pk=self.event.pk)
+        self.assertEqual(event.user_queue_position, 2)
+
+        active = self.event.eventregistration_set.active().first()
+        active.cancel()
+        queued[0].refresh_from_db()
+        self.assertEqual(queued[0].status, RegistrationStatus.ACTIVE)
+
+    def test_task(self):
+        """Test that the task only draws lotteries of which the registration closed."""
+        draw_lotteries()
+        self.assertEqual(self.event.eventregistration_set.pending().count(), 5)
+
+        Event.objects.filter(pk=self.event.pk).update(
+            registration_deadline=timezone.now() - timedelta(minutes=1)
+        )
+        draw_lotteries()
+        self.assertFalse(self.event.eventregistration_set.pending().exists())
+        self.assertEqual(self.event.eventregistration_set.active().count(), 2)
+
+
+class EventQuerySetTestCase(TestCase):
+    """Tests for the filters on the publication and time of events."""
+
+    def setUp(self):
+        """Set up past, ongoing and upcoming events."""
+        now = timezone.now()
+        self.events = {}
+        for title, start, end, published in (
+            ("Past", -3, -2, True),
+            ("Ongoing", -1, 1, True),
+            ("Upcoming", 2, 3, True),
+            ("Unpublished", 2, 3, False),
+        ):
+            self.events[title] = G(
+                Event,
+                title=title,
+                start=now + timedelta(days=start),
+                end=now + timedelta(days=end),
+                registration_start=now + timedelta(days=start - 2),
+                registration_deadline=now + timedelta(days=start - 1),
+                cancelation_deadline=now + timedelta(days=start - 1),
+                published=published,
+            )
+        Event.objects.filter(title="Upcoming").update(
+            registration_deadline=now + timedelta(days=1)
+        )
+
+    def assertTitles(self, events, titles):  # noqa: N802
+        """Assert that a query contains the events with the given titles."""
+        self.assertEqual({event.title for event in events}, set(titles))
+
+    def test_time(self):
+        """Test the filters on the start and end of events."""
+        self.assertTitles(Event.objects.upcoming(), ("Upcoming", "Unpublished"))
+        self.assertTitles(Event.objects.ongoing(), ("Ongoing",))
+        self.assertTitles(Event.objects.past(), ("Past",))
+        self.assertTitles(
+            Event.objects.active(), ("Ongoing", "Upcoming", "Unpublished")
+        )
+
+    def test_chained(self):
+        """Test that the filters are combined with the other filters."""
+        self.assertTitles(Event.objects.published().upcoming(), ("Upcoming",))
+        self.assertTitles(
+            Event.objects.filter(start__gt=timezone.now()).published(), ("Upcoming",)
+        )
+
+    def test_open_for_registration(self):
+        """Test that the filter agrees with the method on the event."""
+        self.assertTitles(Event.objects.open_for_registration(), ("Upcoming",))
+        for event in Event.objects.all():
+            self.assertEqual(event.registrations_open(), event.title == "Upcoming")
+
+
+class FormFieldValuesTestCase(TestCase):
+    """Tests for loading the values of registration form fields in bulk."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.event = G(
+            Event,
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=None,
+        )
+        self.fields = [
+            RegistrationFormField.objects.create(
+                event=self.event, type=field_type, subject=field_type
+            )
+            for field_type, _ in RegistrationFormField.FIELD_TYPES
+        ]
+        self.registrations = []
+        for i in range(3):
+            registration = EventRegistration(
+                event=self.event,
+                contact=G(User, email=f"{i}@user.nl", picture=None),
+                costs_paid=0,
+            )
+            registration.save()
+            self.registrations.append(registration)
+
+        boolean, integer, text, _ = self.fields
+        for i, registration in enumerate(self.registrations):
+            boolean.set_value_for(registration, True)
+            integer.set_value_for(registration, i)
+            text.set_value_for(registration, f"Answer {i}")
+
+    def test_get_values(self):
+        """Test that the values are loaded with one query per type of field."""
+        with self.assertNumQueries(4):
+            values = RegistrationFormField.get_values(self.registrations, self.fields)
+
+        boolean, integer, text, datetime = self.fields
+        for i, registration in enumerate(self.registrations):
+            self.assertIs(values[registration.pk, boolean.pk], True)
+            self.assertEqual(values[registration.pk, integer.pk], i)
+            self.assertEqual(values[registration.pk, text.pk], f"Answer {i}")
+            self.assertNotIn((registration.pk, datetime.pk), values)
+            for field in self.fields:
+                self.assertEqual(
+                    values.get((registration.pk, field.pk)),
+                    field.get_value_for(registration),
+                )
+
+    def test_prefetch_form_fields(self):
+        """Test that the form fields of many registrations are loaded at once."""
+        registrations = list(EventRegistration.objects.filter(event=self.event))
+        with self.assertNumQueries(5):
+            prefetch_form_fields(registrations)
+
+        with self.assertNumQueries(0):
+            form_fields = [registration.form_fields for registration in registrations]
+        for registration, fields in zip(registrations, form_fields, strict=True):
+            self.assertEqual([field for field, _ in fields], self.fields)
+            self.assertEqual(
+                [value for _, value in fields],
+                [field.get_value_for(registration) for field in self.fields],
+            )
+
+    def test_set_values(self):
+        """Test that the values of all fields are saved with one query per type."""
+        registration = self.registrations[0]
+        boolean, integer, text, datetime = self.fields
+        now = timezone.now()
+
+        # The transaction adds a savepoint and its release.
+        with self.assertNumQueries(6):
+            RegistrationFormField.set_values(
+                registration,
+                [(boolean, False), (integer, 42), (text, "Updated"), (datetime, now)],
+            )
+
+        self.assertEqual(
+            RegistrationFormField.get_values([registration], self.fields),
+            {
+                (registration.pk, boolean.pk): False,
+                (registration.pk, integer.pk): 42,
+                (registration.pk, text.pk): "Updated",
+                (registration.pk, datetime.pk): now,
+            },
+        )
+        self.assertEqual(text.textregistrationinformation_set.count(), 3)
+
+    def test_set_values_invalid(self):
+        """Test that nothing is saved if any of the values is invalid."""
+        registration = self.registrations[0]
+        _, integer, text, _ = self.fields
+
+        with self.assertRaises(ValidationError) as context:
+            RegistrationFormField.set_values(
+                registration, [(text, "Updated"), (integer, "many")]
+            )
+
+        self.assertIn(str(integer.pk), context.exception.message_dict)
+        self.assertEqual(text.get_value_for(registration), "Answer 0")
+
+    @skipUnless(connection.vendor == "postgresql", "Requires transactional DDL.")
+    def test_check_answers_command(self):
+        """Test that only the latest of duplicate answers is kept on repair."""
+        registration = self.registrations[0]
+        _, _, text, _ = self.fields
+        model = TextRegistrationInformation
+        # Duplicates could be stored before the unique constraint was added.
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(model, model._meta.constraints[0])
+        model.objects.create(registration=registration, field=text, value="Latest")
+
+        out = StringIO()
+        call_command("check_registration_answers", stdout=out)
+        self.assertIn("1 answers have been replaced", out.getvalue())
+        self.assertEqual(text.textregistrationinformation_set.count(), 4)
+
+        call_command("check_registration_answers", "--repair", stdout=StringIO())
+        self.assertEqual(text.textregistrationinformation_set.count(), 3)
+        self.assertEqual(text.get_value_for(registration), "Latest")
+
+    def test_set_values_clear(self):
+        """Test that a value of ``None`` removes the value of a field."""
+        registration = self.registrations[0]
+        _, integer, _, _ = self.fields
+
+        RegistrationFormField.set_values(registration, [(integer, None)])
+
+        self.assertIsNone(integer.get_value_for(registration))
+        self.assertEqual(integer.get_value_for(self.registrations[1]), 1)
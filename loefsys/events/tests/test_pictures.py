@@ -0,0 +1,131 @@
+"""Module defining the tests for the variants of the pictures of events."""
+
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.models import Event
+from loefsys.events.pictures import PICTURE_WIDTHS
+from loefsys.events.tasks import build_event_picture_variants
+
+
+def generate_photo(size, orientation=None):
+    """Generate a JPEG photo with EXIF data, as taken by a camera."""
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    if orientation is not None:
+        exif[0x0112] = orientation
+    file = io.BytesIO()
+    Image.new("RGB", size, (255, 0, 0)).save(file, "JPEG", exif=exif)
+    return SimpleUploadedFile("photo.jpg", file.getvalue(), content_type="image/jpeg")
+
+
+class PictureVariantTestCase(TestCase):
+    """Tests for building the resized variants of the picture of an event."""
+
+    def setUp(self):
+        """Set up a temporary media directory and an event."""
+        self.media_dir = tempfile.mkdtemp()
+        self.override = self.settings(MEDIA_ROOT=self.media_dir)
+        self.override.enable()
+        now = timezone.now()
+        self.event = G(
+            Event,
+            title="Picture event",
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            picture=None,
+        )
+
+    def tearDown(self):
+        """Remove the temporary media directory."""
+        self.override.disable()
+        shutil.rmtree(self.media_dir)
+
+    def upload(self, photo):
+        """Upload a picture and build its variants."""
+        self.event.picture = photo
+        self.event.save()
+        build_event_picture_variants(self.event.pk)
+        self.event.refresh_from_db()
+
+    def test_variants(self):
+        """Test that variants are built for all widths and formats."""
+        self.upload(generate_photo((2000, 1000)))
+
+        storage = self.event.picture.storage
+        for extension in ("webp", "jpeg"):
+            variants = self.event.picture_variants[extension]
+            self.assertEqual([width for width, _ in variants], list(PICTURE_WIDTHS))
+            for width, name in variants:
+                with storage.open(name) as file, Image.open(file) as image:
+                    self.assertEqual(image.size, (width, width // 2))
+                    self.assertEqual(image.format, extension.upper())
+                    self.assertFalse(image.getexif())
+
+        (webp, jpeg) = self.event.picture_sources
+        self.assertEqual(webp["type"], "image/webp")
+        self.assertIn(" 320w, ", webp["srcset"])
+        self.assertEqual(len(jpeg["srcset"].split(", ")), len(PICTURE_WIDTHS))
+        self.assertEqual(
+            self.event.picture_url,
+            storage.url(self.event.picture_variants["jpeg"][-1][1]),
+        )
+
+    def test_small_picture(self):
+        """Test that a small picture is not enlarged."""
+        self.upload(generate_photo((200, 100)))
+        self.assertEqual(
+            [width for width, _ in self.event.picture_variants["jpeg"]], [200]
+        )
+
+    def test_orientation(self):
+        """Test that the orientation of the photo is applied to the variants."""
+        # Orientation 6 means that the photo has to be rotated by 90 degrees.
+        self.upload(generate_photo((1000, 500), orientation=6))
+        _, name = self.event.picture_variants["jpeg"][-1]
+        with self.event.picture.storage.open(name) as file, Image.open(file) as image:
+            self.assertEqual(image.size, (500, 1000))
+
+    def test_content_hashed_names(self):
+        """Test that replacing the picture replaces the variants."""
+        self.upload(generate_photo((400, 200)))
+        old_names = [name for _, name in self.event.picture_variants["webp"]]
+
+        self.upload(generate_photo((800, 200)))
+        new_names = [name for _, name in self.event.picture_variants["webp"]]
+
+        storage = self.event.picture.storage
+        self.assertTrue(set(old_names).isdisjoint(new_names))
+        self.assertFalse(any(storage.exists(name) for name in old_names))
+        self.assertTrue(all(storage.exists(name) for name in new_names))
+
+    def test_no_variants(self):
+        """Test that the original is used before the variants are built."""
+        self.event.picture = generate_photo((400, 200))
+        self.event.save()
+        self.assertEqual(self.event.picture_sources, [])
+        self.assertEqual(self.event.picture_url, self.event.picture.url)
+
+    def test_task_scheduled(self):
+        """Test that the variants are only built when the picture changes."""
+        with mock.patch("loefsys.events.signals.build_event_picture_variants") as task:
+            self.event.picture = generate_photo((400, 200))
+            self.event.save()
+            task.delay_on_commit.assert_called_once_with(self.event.pk)
+
+            task.reset_mock()
+            self.event.title = "Renamed event"
+            self.event.save()
+            task.delay_on_commit.assert_not_called()
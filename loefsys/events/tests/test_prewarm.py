@@ -0,0 +1,133 @@
+"""Module defining the tests for pre-warming events before the registration opens."""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.caching import get_hot_event
+from loefsys.events.models import Event, EventRegistration, RegistrationFormField
+from loefsys.events.tasks import prewarm_events
+from loefsys.members.models import User
+
+
+class PrewarmTestCase(TestCase):
+    """Tests for the pre-warming of events and the admission of hot events."""
+
+    def setUp(self):
+        """Clear the cache and set up an event of which the registration opens soon."""
+        cache.clear()
+        self.event = self.create_event("Opens soon", timedelta(minutes=2))
+        self.field = RegistrationFormField.objects.create(
+            event=self.event, type=RegistrationFormField.TEXT_FIELD, subject="Diet"
+        )
+
+    def create_event(self, title, opens_in, closes_in=timedelta(days=1), **kwargs):
+        """Create an event of which the registration opens after the given time."""
+        now = timezone.now()
+        return G(
+            Event,
+            title=title,
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now + opens_in,
+            registration_deadline=now + closes_in,
+            cancelation_deadline=now + closes_in,
+            capacity=None,
+            published=kwargs.pop("published", True),
+            **kwargs,
+        )
+
+    def test_prewarm(self):
+        """Test that only events of which the registration opens shortly are hot."""
+        later = self.create_event("Opens later", timedelta(hours=1))
+        unpublished = self.create_event(
+            "Unpublished", timedelta(minutes=2), published=False
+        )
+        opened = self.create_event("Opened", timedelta(minutes=-10))
+        closed = self.create_event(
+            "Closed", timedelta(minutes=-10), timedelta(minutes=-5)
+        )
+
+        prewarm_events()
+
+        event, fields = get_hot_event(self.event.slug)
+        self.assertEqual(event.pk, self.event.pk)
+        self.assertTrue(event.has_form_fields)
+        self.assertEqual(fields, [self.field])
+        self.assertIsNotNone(get_hot_event(opened.slug))
+        for cold in (later, unpublished, closed):
+            self.assertIsNone(get_hot_event(cold.slug))
+
+    def test_counters_repaired(self):
+        """Test that drifted registration counters are recomputed before opening."""
+        opened = self.create_event("Opened", timedelta(minutes=-10))
+        Event.objects.filter(pk__in=(self.event.pk, opened.pk)).update(
+            num_active=3, num_queued=1
+        )
+
+        prewarm_events()
+
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.num_active, self.event.num_queued), (0, 0))
+        # Once the registration has opened, the event is no longer locked to recount.
+        opened.refresh_from_db()
+        self.assertEqual((opened.num_active, opened.num_queued), (3, 1))
+
+    def test_invalidated(self):
+        """Test that an event is no longer hot when it or its form changes."""
+        prewarm_events()
+        RegistrationFormField.objects.create(
+            event=self.event, type=RegistrationFormField.TEXT_FIELD, subject="Car"
+        )
+        self.assertIsNone(get_hot_event(self.event.slug))
+
+        prewarm_events()
+        self.assertEqual(len(get_hot_event(self.event.slug)[1]), 2)
+        self.event.save()
+        self.assertIsNone(get_hot_event(self.event.slug))
+
+    def register(self):
+        """Register a new user for the event and count the queries."""
+        client = Client()
+        client.force_login(G(User, picture=None))
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                reverse("events:event", kwargs={"slug": self.event.slug}),
+                {"action": "register"},
+            )
+        self.assertRedirects(
+            response,
+            reverse("events:registration", kwargs={"slug": self.event.slug}),
+            fetch_redirect_response=False,
+        )
+        return client, len(queries)
+
+    def test_admission(self):
+        """Test that registering for a hot event takes the event from the cache."""
+        Event.objects.filter(pk=self.event.pk).update(
+            registration_start=timezone.now() - timedelta(minutes=1)
+        )
+        _, cold_queries = self.register()
+
+        prewarm_events()
+        client, hot_queries = self.register()
+        self.assertLess(hot_queries, cold_queries)
+        self.assertEqual(EventRegistration.objects.filter(event=self.event).count(), 2)
+
+        response = client.post(
+            reverse("events:registration", kwargs={"slug": self.event.slug}),
+            {str(self.field.pk): "Vegan"},
+        )
+        self.assertRedirects(
+            response, self.event.get_absolute_url(), fetch_redirect_response=False
+        )
+        registration = EventRegistration.objects.filter(event=self.event).latest(
+            "created"
+        )
+        self.assertEqual(registration.form_fields, [(self.field, "Vegan")])
@@ -0,0 +1,107 @@
+"""Module defining the tests for the query budgets of the event views."""
+
+from datetime import timedelta
+
+from django.test import Client, TestCase, modify_settings, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.models import Event, RegistrationFormField
+from loefsys.members.models import User
+from loefsys.querybudget import QueryBudgetExceededError
+from loefsys.tests.utils import QueryBudgetTestMixin
+
+
+class EventQueryBudgetTestCase(QueryBudgetTestMixin, TestCase):
+    """Tests that the event views stay within their query budgets."""
+
+    def setUp(self):
+        """Set up a full event with a registration form and registered users."""
+        now = timezone.now()
+        self.event = G(
+            Event,
+            title="Budget event",
+            start=now + timedelta(days=7),
+            end=now + timedelta(days=8),
+            registration_start=now - timedelta(days=1),
+            registration_deadline=now + timedelta(days=6),
+            cancelation_deadline=now + timedelta(days=6),
+            capacity=2,
+            published=True,
+        )
+        for subject in ("Diet", "Car", "Remarks"):
+            RegistrationFormField.objects.create(
+                event=self.event, type=RegistrationFormField.TEXT_FIELD, subject=subject
+            )
+        self.url = reverse("events:event", kwargs={"slug": self.event.slug})
+        self.clients = [self.register() for _ in range(4)]
+
+    def register(self):
+        """Register a new user for the event and return its client."""
+        client = Client()
+        client.force_login(G(User, picture=None))
+        with self.assertQueryBudget("events:event", "POST"):
+            client.post(self.url, {"action": "register"})
+        return client
+
+    def test_event_page(self):
+        """Test the budget of the page of the event."""
+        with self.assertQueryBudget("events:event"):
+            response = self.clients[0].get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cancel(self):
+        """Test the budget of cancelling, which promotes a queued registration."""
+        with self.assertQueryBudget("events:event", "POST"):
+            self.clients[0].post(self.url, {"action": "cancel"})
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.num_active, self.event.num_queued), (2, 1))
+
+    def test_registration_form(self):
+        """Test the budget of the registration form, for any number of fields."""
+        url = reverse("events:registration", kwargs={"slug": self.event.slug})
+        data = {
+            str(field.pk): "Answer"
+            for field in self.event.registrationformfield_set.all()
+        }
+        with self.assertQueryBudget("events:registration"):
+            self.clients[0].get(url)
+        with self.assertQueryBudget("events:registration", "POST"):
+            self.clients[0].post(url, data)
+
+
+@modify_settings(MIDDLEWARE={"prepend": "loefsys.querybudget.QueryBudgetMiddleware"})
+class QueryBudgetMiddlewareTestCase(TestCase):
+    """Tests for reporting the requests that exceed their query budget."""
+
+    url = "/events/api"
+
+    @override_settings(QUERY_BUDGETS={"events:event_list_api": 0})
+    def test_exceeded(self):
+        """Test that the queries are logged when the budget is exceeded."""
+        with self.assertLogs("loefsys.querybudget", "WARNING") as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("events:event_list_api executed 2 queries", logs.output[0])
+
+    @override_settings(QUERY_BUDGETS={"events:event_list_api": 0})
+    def test_strict(self):
+        """Test that the request fails in strict mode."""
+        with (
+            self.settings(QUERY_BUDGET_STRICT=True),
+            self.assertRaises(QueryBudgetExceededError),
+        ):
+            self.client.get(self.url)
+
+    @override_settings(QUERY_BUDGETS={"events:event_list_api": 2})
+    def test_within_budget(self):
+        """Test that nothing is logged for requests within the budget."""
+        with self.assertNoLogs("loefsys.querybudget", "WARNING"):
+            self.client.get(self.url)
+
+    @override_settings(QUERY_BUDGETS={"events:event_list_api": {"POST": 0}})
+    def test_budget_per_method(self):
+        """Test that only the budget of the method of the request is enforced."""
+        with self.assertNoLogs("loefsys.querybudget", "WARNING"):
+            self.client.get(self.url)
@@ -0,0 +1,74 @@
+"""Module defining the tests for the full-text search of events."""
+
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.models import Event
+
+
+class EventSearchTestCase(TestCase):
+    """Tests for searching events."""
+
+    def setUp(self):
+        """Set up events with different descriptions."""
+        now = timezone.now()
+        self.client = Client()
+        for title, description, published in (
+            ("Regatta on the Kaag", "Racing for the cup.", True),
+            ("Borrel", "Drinks after the <b>regatta</b> in the club house.", True),
+            ("Training", "The boat sails from the harbour at noon.", True),
+            ("Secret regatta", "Not published yet.", False),
+        ):
+            G(
+                Event,
+                title=title,
+                description=description,
+                location="Loosdrecht",
+                start=now + timedelta(days=7),
+                end=now + timedelta(days=8),
+                registration_start=now - timedelta(days=1),
+                registration_deadline=now + timedelta(days=6),
+                cancelation_deadline=now + timedelta(days=6),
+                published=published,
+            )
+
+    def search(self, text, status_code=200):
+        """Search the events and return the results."""
+        response = self.client.get(reverse("events:event_search"), {"q": text})
+        self.assertEqual(response.status_code, status_code)
+        return response.json().get("results")
+
+    def test_ranked(self):
+        """Test that matches in the title rank higher than in the description."""
+        results = self.search("regatta")
+        self.assertEqual(
+            [result["title"] for result in results], ["Regatta on the Kaag", "Borrel"]
+        )
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+    def test_snippet(self):
+        """Test that the matches are marked and no other markup is kept."""
+        (result,) = self.search("club")
+        self.assertIn("<mark>club</mark>", result["snippet"])
+        self.assertNotIn("<b>", result["snippet"])
+
+    def test_no_match(self):
+        """Test that searching for an unknown word finds nothing."""
+        self.assertEqual(self.search("cantus"), [])
+
+    def test_missing_text(self):
+        """Test that the search text is required."""
+        self.search(" ", status_code=400)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires full-text search.")
+    def test_stemming(self):
+        """Test that the words are matched on their stem."""
+        self.assertEqual(
+            [result["title"] for result in self.search("sailing")], ["Training"]
+        )
@@ -0,0 +1,189 @@
+"""Module defining the tests for series of recurring events."""
+
+from datetime import UTC, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.events.feeds import OtherEventFeed
+from loefsys.events.models import Event, EventRegistration, EventSeries
+from loefsys.events.models.choices import EventCategories
+from loefsys.events.models.series import format_occurrence
+from loefsys.members.models import User
+
+AMSTERDAM = ZoneInfo("Europe/Amsterdam")
+
+
+class EventSeriesTestCase(TestCase):
+    """Tests for generating and storing the occurrences of a series."""
+
+    def setUp(self):
+        """Set up a weekly series, of which the first occurrence is next week."""
+        cache.clear()
+        self.client = Client()
+        first_start = timezone.localtime().replace(
+            hour=19, minute=0, second=0, microsecond=0
+        ) + timedelta(days=7)
+        self.series = EventSeries.objects.create(
+            title="Sail training",
+            recurrence="FREQ=WEEKLY;COUNT=4",
+            first_start=first_start,
+            duration=timedelta(hours=2),
+            registration_opens=timedelta(days=14),
+            registration_closes=timedelta(hours=1),
+            cancelation_closes=timedelta(days=1),
+            category=EventCategories.SAILING,
+            location="Kaag",
+            published=True,
+        )
+        self.starts = self.series.get_occurrences(None, None)
+
+    def test_occurrences(self):
+        """Test that the occurrences follow the rule and copy the series."""
+        self.assertEqual(len(self.starts), 4)
+        self.assertEqual(self.starts[1] - self.starts[0], timedelta(days=7))
+        occurrence = self.series.build_occurrence(self.starts[2])
+        self.assertEqual(occurrence.end - occurrence.start, timedelta(hours=2))
+        self.assertEqual(
+            occurrence.registration_deadline, self.starts[2] - timedelta(hours=1)
+        )
+        self.assertEqual(occurrence.location, "Kaag")
+
+    def test_daylight_saving_time(self):
+        """Test that the occurrences keep their local time when the clocks change."""
+        self.series.first_start = datetime(2026, 10, 18, 10, tzinfo=AMSTERDAM)
+        with timezone.override(AMSTERDAM):
+            starts = self.series.get_occurrences(None, None)
+        self.assertEqual(
+            [start.astimezone(AMSTERDAM).hour for start in starts], [10] * 4
+        )
+        self.assertEqual(
+            starts[1].astimezone(UTC) - starts[0].astimezone(UTC),
+            timedelta(days=7, hours=1),
+        )
+
+    def test_materialize(self):
+        """Test that storing an occurrence twice gives the same event."""
+        event = self.series.materialize(self.starts[1])
+        self.assertEqual(self.series.materialize(self.starts[1]), event)
+        self.assertEqual((event.series, event.start), (self.series, self.starts[1]))
+        self.assertEqual(event.title, "Sail training")
+        with self.assertRaises(ValueError):
+            self.series.materialize(self.starts[1] + timedelta(hours=1))
+
+    def test_stored_occurrences_left_out(self):
+        """Test that the stored occurrences are no longer generated."""
+        self.series.materialize(self.starts[0])
+        occurrences = EventSeries.objects.occurrences(None, None)
+        self.assertEqual([event.start for event in occurrences], self.starts[1:])
+
+    def test_unpublished(self):
+        """Test that the occurrences of unpublished series are not generated."""
+        EventSeries.objects.filter(pk=self.series.pk).update(published=False)
+        self.assertEqual(EventSeries.objects.occurrences(None, None), [])
+
+    def test_calendar(self):
+        """Test that the calendar shows both generated and stored occurrences."""
+        event = self.series.materialize(self.starts[0])
+        response = self.client.get(
+            reverse("events:event_filler"),
+            {
+                "start": (self.starts[0] - timedelta(days=1)).isoformat(),
+                "end": (self.starts[-1] + timedelta(days=1)).isoformat(),
+            },
+        )
+        urls = [item["url"] for item in response.json()]
+        self.assertEqual(
+            urls,
+            [
+                event.get_absolute_url(),
+                *(self.series.get_occurrence_url(start) for start in self.starts[1:]),
+            ],
+        )
+
+    def test_api(self):
+        """Test that the event list pages through generated occurrences."""
+        self.series.materialize(self.starts[1])
+        url = reverse("events:event_list_api")
+        params = {"limit": 3}
+        response = self.client.get(url, params).json()
+        self.assertEqual(
+            [item["slug"] is None for item in response["results"]], [True, False, True]
+        )
+        response = self.client.get(response["next"]).json()
+        self.assertEqual(len(response["results"]), 1)
+        self.assertIsNone(response["next"])
+
+    def test_feed(self):
+        """Test that the feed includes the generated occurrences."""
+        self.series.materialize(self.starts[0])
+        items = OtherEventFeed().items(None)
+        self.assertEqual(len(items), 4)
+        self.assertEqual([item.start for item in items], self.starts[::-1])
+
+    def test_register(self):
+        """Test that registering for an occurrence stores it."""
+        url = self.series.get_occurrence_url(self.starts[0])
+        user = G(User, picture=None)
+        self.client.force_login(user)
+        response = self.client.post(url, {"action": "register"})
+        event = Event.objects.get(series=self.series)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            EventRegistration.objects.filter(event=event, contact=user).exists()
+        )
+        self.assertRedirects(
+            self.client.get(url),
+            event.get_absolute_url(),
+            fetch_redirect_response=False,
+        )
+
+    def test_register_closed(self):
+        """Test that an occurrence isn't stored before its registration opens."""
+        url = self.series.get_occurrence_url(self.starts[-1])
+        response = self.client.post(url, {"action": "register"})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+
+        self.client.force_login(G(User, picture=None))
+        response = self.client.post(url, {"action": "register"})
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertFalse(Event.objects.filter(series=self.series).exists())
+
+    def test_admin(self):
+        """Test that the admin only stores an occurrence after confirmation."""
+        self.client.force_login(
+            G(User, email="admin@user.nl", is_superuser=True, is_staff=True)
+        )
+        url = reverse(
+            "admin:events_eventseries_occurrence",
+            args=(self.series.pk, format_occurrence(self.starts[0])),
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Event.objects.filter(series=self.series).exists())
+
+        response = self.client.post(url)
+        event = Event.objects.get(series=self.series)
+        change_url = reverse("admin:events_event_change", args=(event.pk,))
+        self.assertRedirects(response, change_url, fetch_redirect_response=False)
+        self.assertRedirects(
+            self.client.get(url), change_url, fetch_redirect_response=False
+        )
+
+    def test_unknown_occurrence(self):
+        """Test that a time at which no occurrence starts is not found."""
+        start = self.starts[0] + timedelta(hours=1)
+        response = self.client.get(
+            reverse(
+                "events:occurrence",
+                kwargs={
+                    "slug": self.series.slug,
+                    "occurrence": format_occurrence(start),
+                },
+            )
+        )
+        self.assertEqual(response.status_code, 404)
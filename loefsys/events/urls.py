@@ -7,7 +7,12 @@ from .views import (
     CalendarView,
     EventFeedView,
     EventFillerView,
+    EventListApiView,
+    EventOccurrenceView,
+    EventSearchView,
     EventView,
+    OrganizerDashboardView,
+    RegistrationExportView,
     RegistrationFormView,
 )
 
@@ -19,8 +24,21 @@ urlpatterns = [
     path(
         "<slug:slug>/registration/", RegistrationFormView.as_view(), name="registration"
     ),
+    path(
+        "<slug:slug>/registrations/export/",
+        RegistrationExportView.as_view(),
+        name="registration_export",
+    ),
+    path(
+        "series/<slug:slug>/<str:occurrence>/",
+        EventOccurrenceView.as_view(),
+        name="occurrence",
+    ),
     path("", CalendarView.as_view(), name="events"),
     path("event_filler", EventFillerView.as_view(), name="event_filler"),
+    path("api", EventListApiView.as_view(), name="event_list_api"),
+    path("search", EventSearchView.as_view(), name="event_search"),
+    path("dashboard", OrganizerDashboardView.as_view(), name="organizer_dashboard"),
     path("registeredical", RegisteredEventFeed(), name="registered_event_feed"),
     path("otherical", OtherEventFeed(), name="other_event_feed"),
     path("feed", EventFeedView.as_view(), name="event_feed_view"),
@@ -1,86 +1,86 @@
 """Module defining the views for events."""
 
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.db import IntegrityError
 from django.db.models import Q
 from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 from django.views import View
-from django.views.generic import DetailView, FormView, TemplateView
+from django.views.decorators.http import condition
+from django.views.generic import DetailView, FormView, ListView, TemplateView
 
 from loefsys.events.exceptions import NoUserObjectError
 from loefsys.events.models.feed_token import FeedToken
 
+from .caching import calendar_cache_key, etag_for, events_last_modified, get_hot_event
 from .exceptions import RegistrationError
+from .export import EXPORT_FORMATS, export_response
 from .forms import EventFieldsForm
-from .models import Event, EventRegistration, RegistrationFormField
-from .models.choices import RegistrationStatus
+from .models import Event, EventRegistration, EventSeries, RegistrationFormField
+from .models.choices import EventCategories, RegistrationStatus
+from .models.registration_form_field import prefetch_form_fields
+from .models.series import parse_occurrence
+from .search import highlight, search_events
 
 
 class EventView(DetailView, LoginRequiredMixin):
-    """View for viewing an event."""
+    """View for viewing an event.
+
+    The event and all registration information of the current user are loaded with a
+    single query, see
+    :meth:`~loefsys.events.models.managers.EventQuerySet.with_registration_info`.
+    """
 
     model = Event
     template_name = "events/event.html"
     event = None
 
+    def get_queryset(self):
+        """Get the published events annotated for the current user."""
+        return Event.objects.published().with_registration_info(self.request.user)
+
     def get_context_data(self, **kwargs):
         """Add variables to the context.
 
         The template needs these variables to render the correct page.
         (E.g. whether to render the registration or cancellation button.)
         """
-        if not self.get_object().published:
-            raise Http404("Not found")
-
         context = super().get_context_data(**kwargs)
         context["registration_active"] = (
-            self.get_registrations_for_current_user().count() > 0
-        )
-        context["queue_position"] = (
-            0
-            if self.get_object()
-            .eventregistration_set.queued()
-            .filter(contact=self.request.user)
-            .count()
-            == 0
-            else EventRegistration.objects.filter(
-                created__lt=EventRegistration.objects.get(
-                    contact=self.request.user,
-                    event=self.get_object(),
-                    status=RegistrationStatus.QUEUED,
-                ).created,
-                event=self.get_object(),
-                status=RegistrationStatus.QUEUED,
-            ).count()
-            + 1
+            self.object.user_registration_status is not None
         )
-        context["num_registrations"] = (
-            self.get_object().eventregistration_set.active().count()
-        )
-        context["fine_amount_display"] = f"{self.get_object().fine:.2f}".replace(
-            ".", ","
+        context["registration_pending"] = (
+            self.object.user_registration_status == RegistrationStatus.PENDING
         )
+        context["queue_position"] = self.object.user_queue_position or 0
+        context["num_registrations"] = self.object.num_active
+        context["fine_amount_display"] = f"{self.object.fine:.2f}".replace(".", ",")
         return context
 
-    def get_object(self, queryset=None):  # noqa ARG002
-        """Get event object based on url arguments."""
-        if "pk" in self.kwargs:
-            return get_object_or_404(Event, pk=self.kwargs["pk"])
-        return get_object_or_404(Event, slug=self.kwargs["slug"])
-
     def post(self, request, *args, **kwargs):  # noqa ARG002
-        """Handle the post request for the event view."""
-        event = self.get_object()
+        """Handle the post request for the event view.
+
+        The event is taken from the cache when it is hot, see
+        :func:`~loefsys.events.caching.get_hot_event`.
+        """
+        hot = get_hot_event(self.kwargs["slug"]) if "slug" in self.kwargs else None
+        event = hot[0] if hot else self.get_object()
         action = request.POST.get("action")
         if action == "register":
             # Check registration deadline
-            if self.get_object().registrations_open():
+            if event.registrations_open():
                 try:
                     register = EventRegistration(
                         event=event,
@@ -99,40 +99,102 @@ class EventView(DetailView, LoginRequiredMixin):
             # Only cancel if cancellation deadline is NOT due or
             # it is due and consent was given to be fined
             if (
-                not self.get_object().cancelation_deadline < timezone.now()
+                not event.cancelation_deadline < timezone.now()
                 or request.POST.get("fine-consent") is not None
             ):
-                self.get_registrations_for_current_user().first().cancel()
+                registration = self.get_registrations_for_current_user(event).first()
+                # Reuse the loaded event instead of loading it again.
+                registration.event = event
+                registration.cancel()
 
         return redirect(event)
 
-    def get_registrations_for_current_user(self):
-        """Get active registrations for logged in user."""
+    def get_registrations_for_current_user(self, event):
+        """Get active, queued or pending registrations for logged in user."""
         return EventRegistration.objects.filter(
-            Q(status=RegistrationStatus.ACTIVE) | Q(status=RegistrationStatus.QUEUED),
-            event=self.get_object(),
+            Q(status=RegistrationStatus.ACTIVE)
+            | Q(status=RegistrationStatus.QUEUED)
+            | Q(status=RegistrationStatus.PENDING),
+            event=event,
             contact=self.request.user,
         )
 
 
+class EventOccurrenceView(EventView):
+    """View for an occurrence of a series of recurring events.
+
+    As long as the occurrence isn't stored, its page shows the event generated from
+    the series. Registering stores the occurrence, after which the registration is
+    handled as for any other event. Once stored, the page of the occurrence redirects
+    to the page of the event.
+    """
+
+    def get_occurrence(self):
+        """Get the series and the start of the occurrence from the URL."""
+        series = get_object_or_404(
+            EventSeries, slug=self.kwargs["slug"], published=True
+        )
+        try:
+            start = parse_occurrence(self.kwargs["occurrence"])
+        except ValueError as error:
+            raise Http404 from error
+        if not series.is_occurrence(start):
+            raise Http404
+        return series, start
+
+    def get(self, request, *args, **kwargs):  # noqa: ARG002
+        """Show the occurrence, or redirect to its event if it is stored."""
+        series, start = self.get_occurrence()
+        if event := series.events.filter(occurrence=start).first():
+            return redirect(event)
+
+        self.object = series.build_occurrence(start)
+        self.object.user_registration_status = None
+        self.object.user_queue_position = None
+        self.object.form_fields_exist = False
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+    def post(self, request, *args, **kwargs):  # noqa: ARG002
+        """Store the occurrence when registering, and handle the registration.
+
+        The occurrence is only stored when the registration is accepted, so that
+        attempts to register before the registration opens don't store it.
+        """
+        series, start = self.get_occurrence()
+        if request.POST.get("action") != "register":
+            return redirect(series.get_occurrence_url(start))
+        event = series.events.filter(occurrence=start).first()
+        if event is None:
+            if (
+                not request.user.is_authenticated
+                or not series.build_occurrence(start).registrations_open()
+            ):
+                return redirect(series.get_occurrence_url(start))
+            event = series.materialize(start)
+        return EventView.as_view()(request, slug=event.slug)
+
+
 class RegistrationFormView(FormView, LoginRequiredMixin):
     """View for the registration form."""
 
     template_name = "events/registration_form.html"
     form_class = EventFieldsForm
     event = None
+    event_fields = None
+    registration = None
     success_url = None
 
     def __get_registration(self, event, contact):
         """Get the registration for the event and contact.
 
         Used for updating the registration when additional form fields are filled out.
-        This function only retrieves active or queued registrations.
+        This function only retrieves active, queued or pending registrations.
         """
         try:
             registration = EventRegistration.objects.get(
                 Q(status=RegistrationStatus.ACTIVE)
-                | Q(status=RegistrationStatus.QUEUED),
+                | Q(status=RegistrationStatus.QUEUED)
+                | Q(status=RegistrationStatus.PENDING),
                 event=event,
                 contact=contact,
             )
@@ -151,7 +213,9 @@ class RegistrationFormView(FormView, LoginRequiredMixin):
         """Get form keyword arguments."""
         kwargs = super().get_form_kwargs()
         contact = self.request.user
-        registration = self.__get_registration(self.event, contact)
+        registration = self.registration = self.__get_registration(self.event, contact)
+        if self.event_fields is not None:
+            prefetch_form_fields([registration], self.event_fields)
 
         kwargs["form_fields"] = [
             (
@@ -172,18 +236,28 @@ class RegistrationFormView(FormView, LoginRequiredMixin):
 
     def form_valid(self, form):
         """Handle valid form."""
-        values = form.field_values()
-        registration = self.__get_registration(self.event, self.request.user)
-
-        for field_id, field_value in values:
-            field = RegistrationFormField.objects.get(id=field_id)
-            field.set_value_for(registration, field_value)
+        fields = {field.pk: field for field, _ in self.registration.form_fields}
+        values = [(fields[pk], value) for pk, value in form.field_values()]
+        try:
+            RegistrationFormField.set_values(self.registration, values)
+        except ValidationError as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
 
         return super().form_valid(form)
 
     def dispatch(self, request, *args, **kwargs):
-        """Return the proper response to a request."""
-        self.event = get_object_or_404(Event, slug=self.kwargs["slug"])
+        """Return the proper response to a request.
+
+        The event and its form fields are taken from the cache when it is hot, see
+        :func:`~loefsys.events.caching.get_hot_event`.
+        """
+        if hot := get_hot_event(self.kwargs["slug"]):
+            self.event, self.event_fields = hot
+        else:
+            self.event = get_object_or_404(
+                Event.objects.with_form_fields_exist(), slug=self.kwargs["slug"]
+            )
         self.success_url = self.event.get_absolute_url()
         if self.event.has_form_fields:
             return super().dispatch(request, *args, **kwargs)
@@ -200,28 +274,341 @@ class CalendarView(DetailView, LoginRequiredMixin):
         return render(request, "events/calendar.html")
 
 
+def _calendar_window(request):
+    """Get the window requested by the calendar from the query parameters.
+
+    FullCalendar sends the visible range as the ISO 8601 parameters ``start`` and
+    ``end``. A parameter that is missing or can't be parsed leaves that side of the
+    window unbounded.
+    """
+    window = []
+    for key in ("start", "end"):
+        try:
+            # An unencoded "+" of the UTC offset arrives as a space.
+            stamp = parse_datetime(request.GET.get(key, "").replace(" ", "+"))
+        except ValueError:
+            stamp = None
+        if stamp is not None and timezone.is_naive(stamp):
+            stamp = timezone.make_aware(stamp)
+        window.append(stamp)
+    return tuple(window)
+
+
+def _calendar_etag(request, *args, **kwargs):  # noqa: ARG001
+    """Compute the ETag of the calendar data from its cache key."""
+    return etag_for(calendar_cache_key(*_calendar_window(request)))
+
+
+def _calendar_last_modified(request, *args, **kwargs):  # noqa: ARG001
+    """Get the timestamp of the last change to the calendar data."""
+    return events_last_modified()
+
+
 class EventFillerView(View):
-    """View for the event filler."""
+    """View for the event filler.
 
-    def get(self, request):  # noqa: ARG002
+    The calendar requests the events for the visible window only. The occurrences of
+    series of recurring events that aren't stored yet are generated for that window.
+    The response is cached and is revalidated using the timestamp of the last change to
+    any event.
+    """
+
+    @method_decorator(
+        condition(etag_func=_calendar_etag, last_modified_func=_calendar_last_modified)
+    )
+    def get(self, request):
         """Get the events for the calendar."""
-        events = Event.objects.all()
-        data = []
-        for event in events:
-            if event.published:
-                data.append(
+        start, end = _calendar_window(request)
+        key = calendar_cache_key(start, end)
+        data = cache.get(key)
+        if data is None:
+            events = Event.objects.published().overlapping(start, end)
+            data = [
+                {
+                    "title": title,
+                    "start": event_start,
+                    "end": event_end,
+                    "url": reverse("events:event", kwargs={"slug": slug}),
+                }
+                for title, event_start, event_end, slug in events.order_by(
+                    "start"
+                ).values_list("title", "start", "end", "slug")
+            ]
+            data += [
+                {
+                    "title": occurrence.title,
+                    "start": occurrence.start,
+                    "end": occurrence.end,
+                    "url": occurrence.get_absolute_url(),
+                }
+                for occurrence in EventSeries.objects.occurrences(start, end)
+            ]
+            data.sort(key=lambda item: item["start"])
+            cache.set(key, data)
+        return JsonResponse(data, safe=False)
+
+
+def _encode_cursor(start, pk):
+    """Encode the position after an event in the event list as an opaque cursor."""
+    return urlsafe_b64encode(f"{start.isoformat()}|{pk}".encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """Decode a cursor to the start and primary key of the event it points after."""
+    try:
+        start, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        start = parse_datetime(start)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError) as error:
+        raise ValueError("Invalid cursor.") from error
+    if start is None or timezone.is_naive(start):
+        raise ValueError("Invalid cursor.")
+    return start, pk
+
+
+def _list_position(event):
+    """Get the position of an event in the event list, as used in the cursor.
+
+    Occurrences of series that aren't stored yet have no primary key. They are placed
+    before the events with the same start, using the negated primary key of the series.
+    """
+    return event["start"], event["id"] if event["id"] is not None else -event["series"]
+
+
+class EventListApiView(View):
+    """Read-only JSON API listing events, ordered by start.
+
+    The list is paginated with a cursor on ``(start, id)`` instead of an offset, so
+    that every page is a range scan on the index of the start, however far a client
+    pages. The response contains the events of the page and the URL of the next page,
+    which is ``null`` on the last page.
+
+    The following query parameters filter the events:
+
+    ``category``
+        The category of the events, may be given multiple times.
+    ``start``, ``end``
+        Only events overlapping this window, in ISO 8601.
+    ``registered``
+        If ``true``, only the events for which the user has an active or queued
+        registration.
+    ``published``
+        Superusers can list unpublished events with ``false``, or both with ``all``.
+        Other users only see published events.
+    ``limit``
+        The number of events per page, at most :attr:`max_limit`.
+    ``cursor``
+        The cursor of the page, taken from the URL of the next page.
+
+    The registration counts and the status of the registration of the user are part
+    of the single query for the page. The occurrences of series of recurring events
+    that aren't stored yet are generated up to the last event of the page, and merged
+    into it.
+    """
+
+    default_limit = 50
+    max_limit = 200
+
+    fields = (
+        "id",
+        "slug",
+        "title",
+        "start",
+        "end",
+        "location",
+        "category",
+        "capacity",
+        "admission",
+        "price",
+        "published",
+        "series",
+        "num_active",
+        "num_queued",
+        "num_pending",
+        "user_registration_status",
+        "user_queue_position",
+    )
+
+    def get(self, request):
+        """Get a page of events."""
+        try:
+            events = self.filter_events(request)
+            limit = min(
+                int(request.GET.get("limit", self.default_limit)), self.max_limit
+            )
+            if limit < 1:
+                raise ValueError("The limit must be positive.")
+            cursor = None
+            if "cursor" in request.GET:
+                cursor = start, pk = _decode_cursor(request.GET["cursor"])
+                events = events.filter(Q(start__gt=start) | Q(start=start, pk__gt=pk))
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+
+        page = list(events.order_by("start", "pk").values(*self.fields)[: limit + 1])
+        last = page[limit]["start"] if len(page) > limit else None
+        page = sorted(
+            page + self.get_occurrences(request, cursor, last), key=_list_position
+        )[: limit + 1]
+        next_url = None
+        if len(page) > limit:
+            page = page[:limit]
+            params = request.GET.copy()
+            params["cursor"] = _encode_cursor(*_list_position(page[-1]))
+            next_url = f"{request.path}?{params.urlencode()}"
+
+        return JsonResponse(
+            {"results": [self.serialize(event) for event in page], "next": next_url}
+        )
+
+    def filter_events(self, request):
+        """Get the events matching the filters of the request.
+
+        Raises
+        ------
+        ValueError
+            If a filter has an invalid value.
+        """
+        events = Event.objects.with_registration_info(request.user)
+
+        published = request.GET.get("published", "true")
+        if not request.user.is_superuser or published == "true":
+            events = events.published()
+        elif published == "false":
+            events = events.filter(published=False)
+        elif published != "all":
+            raise ValueError("Invalid value for published.")
+
+        if categories := request.GET.getlist("category"):
+            if not set(categories) <= {str(value) for value in EventCategories.values}:
+                raise ValueError("Invalid category.")
+            events = events.filter(category__in=categories)
+
+        start, end = _calendar_window(request)
+        events = events.overlapping(start, end)
+
+        if request.GET.get("registered") == "true":
+            events = events.filter(user_registration_status__isnull=False)
+        return events
+
+    def get_occurrences(self, request, cursor, last):
+        """Get the values of the occurrences that aren't stored yet for a page.
+
+        Parameters
+        ----------
+        request : ~django.http.HttpRequest
+            The request, of which the filters are already validated.
+        cursor : tuple of ~datetime.datetime and int, None
+            The position after which the page starts, if any.
+        last : ~datetime.datetime, None
+            The start of the first event after the page, or ``None`` if the page is the
+            last one.
+        """
+        if request.GET.get("registered") == "true":
+            return []
+
+        start, end = _calendar_window(request)
+        if cursor is not None:
+            start = cursor[0] if start is None else max(start, cursor[0])
+        if last is not None:
+            # The occurrences starting at the same time as the event come before it.
+            last += timedelta(microseconds=1)
+            end = last if end is None else min(end, last)
+        published = request.GET.get("published", "true")
+        if not request.user.is_superuser or published == "true":
+            occurrences = EventSeries.objects.occurrences(start, end)
+        else:
+            occurrences = EventSeries.objects.occurrences(start, end, published=None)
+            if published == "false":
+                occurrences = [item for item in occurrences if not item.published]
+        if categories := request.GET.getlist("category"):
+            occurrences = [
+                item for item in occurrences if str(item.category) in categories
+            ]
+
+        values = []
+        for occurrence in occurrences:
+            occurrence.user_registration_status = None
+            occurrence.user_queue_position = None
+            values.append(
+                {
+                    **{field: getattr(occurrence, field) for field in self.fields},
+                    "slug": None,
+                    "series": occurrence.series_id,
+                    "url": occurrence.get_absolute_url(),
+                }
+            )
+        return [
+            value
+            for value in values
+            if cursor is None or _list_position(value) > cursor
+        ]
+
+    @staticmethod
+    def serialize(event):
+        """Convert the values of an event to their JSON representation."""
+        status = event.pop("user_registration_status")
+        position = event.pop("user_queue_position")
+        url = event.pop("url", None)
+        return {
+            **event,
+            "url": url or reverse("events:event", kwargs={"slug": event["slug"]}),
+            "registration_status": (
+                None if status is None else RegistrationStatus(status).name.lower()
+            ),
+            "queue_position": position,
+        }
+
+
+class EventSearchView(View):
+    """Read-only JSON API searching the published events.
+
+    The search text is given with the query parameter ``q``. The results are ordered
+    by relevance, and contain a snippet of the description with the matches in
+    ``<mark>`` elements. See :mod:`loefsys.events.search` for the full-text search.
+    The number of results is given with ``limit``, at most :attr:`max_limit`.
+    """
+
+    default_limit = 20
+    max_limit = 50
+
+    fields = ("id", "slug", "title", "start", "end", "location", "rank", "snippet")
+
+    def get(self, request):
+        """Get the events matching the search text."""
+        text = request.GET.get("q", "").strip()
+        try:
+            if not text:
+                raise ValueError("The search text is missing.")
+            limit = min(
+                int(request.GET.get("limit", self.default_limit)), self.max_limit
+            )
+            if limit < 1:
+                raise ValueError("The limit must be positive.")
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+
+        events = search_events(Event.objects.published(), text)
+        return JsonResponse(
+            {
+                "results": [
                     {
-                        "title": event.title,
-                        "start": event.start,
-                        "end": event.end,
-                        "url": event.get_absolute_url(),
+                        **event,
+                        "url": reverse("events:event", kwargs={"slug": event["slug"]}),
+                        "snippet": highlight(event["snippet"], text),
                     }
-                )
-        return JsonResponse(data, safe=False)
+                    for event in events.values(*self.fields)[:limit]
+                ]
+            }
+        )
 
 
 class EventFeedView(TemplateView, LoginRequiredMixin):
-    """View for the event feed."""
+    """View for the event feed.
+
+    The feed URLs stay the same until the user requests new ones, which invalidates
+    the previous URLs.
+    """
 
     template_name = "events/event_feed.html"
 
@@ -240,3 +627,48 @@ class EventFeedView(TemplateView, LoginRequiredMixin):
         context["other_event_feed"] = f"{reverse('events:other_event_feed')}?u={token}"
 
         return context
+
+    def post(self, request, *args, **kwargs):  # noqa ARG002
+        """Rotate the feed token of the user."""
+        if request.user.is_authenticated and request.POST.get("action") == "rotate":
+            FeedToken.objects.get_or_create(user=request.user)[0].rotate()
+        return redirect("events:event_feed_view")
+
+
+class RegistrationExportView(LoginRequiredMixin, View):
+    """View exporting the registrations of an event for its organizers.
+
+    The format is given by the query parameter ``format``, either ``csv`` (the
+    default) or ``xlsx``. Besides the organizers, superusers can export the
+    registrations of any event.
+    """
+
+    def get(self, request, slug):
+        """Stream the export of the registrations."""
+        event = get_object_or_404(Event, slug=slug)
+        if not (request.user.is_superuser or event.is_organizer(request.user)):
+            raise PermissionDenied
+        export_format = request.GET.get("format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            raise Http404
+        return export_response(event, export_format)
+
+
+class OrganizerDashboardView(LoginRequiredMixin, ListView):
+    """View listing the events that the user organizes, with their statistics.
+
+    The events are those organized by the user directly or through one of their
+    groups. The statistics of all events are computed in a single query, see
+    :meth:`~loefsys.events.models.managers.EventQuerySet.with_statistics`.
+    """
+
+    template_name = "events/organizer_dashboard.html"
+    context_object_name = "events"
+
+    def get_queryset(self):
+        """Get the events organized by the user, the most recent first."""
+        return (
+            Event.objects.organized_by(self.request.user)
+            .with_statistics()
+            .order_by("-start", "-pk")
+        )
@@ -1,8 +1,7 @@
 """Module defining the view for the index page."""
 
-from datetime import datetime
-
 from django.shortcuts import render
+from django.utils import timezone
 from django.views.generic import View
 
 from loefsys.events.models import Event
@@ -14,17 +13,15 @@ class HomeView(View):
 
     def get(self, request):
         """Handle the get request for the index page."""
+        now = timezone.now()
         announcements = Announcement.objects.filter(
-            published=True,
-            announcement_start__lte=datetime.now(),
-            announcement_end__gte=datetime.now(),
+            published=True, announcement_start__lte=now, announcement_end__gte=now
         ).order_by("-announcement_start")
         announcements = announcements[:2]
-        events = Event.objects.filter(start__gte=datetime.now()).order_by("start")
-        if self.request.user.is_active:
-            events = events[:2]
-        else:
-            events = events.filter(published=True)[:2]
+        events = Event.objects.upcoming()
+        if not self.request.user.is_active:
+            events = events.published()
+        events = events.order_by("start")[:2]
         return render(
             request, "home.html", {"announcements": announcements, "events": events}
         )
@@ -0,0 +1,112 @@
+"""Module containing the enforcement of query budgets for views.
+
+The query budget of a view is the maximum number of SQL queries that a request to it
+may execute. The budgets are configured per URL name in the ``QUERY_BUDGETS``
+setting, such as ``{"events:event": 8}``, or per HTTP method, such as
+``{"events:event": {"GET": 3, "POST": 16}}``. :class:`QueryBudgetMiddleware` records the
+queries of every request to a view with a budget, and logs a warning with the SQL
+when the budget is exceeded. With the ``QUERY_BUDGET_STRICT`` setting enabled, the
+request fails instead. The middleware is only enabled in debug mode, so that
+production requests don't pay for recording their queries.
+
+The tests of a view assert its budget with
+:class:`~loefsys.tests.utils.QueryBudgetTestMixin`, so that an increase of the number
+of queries, such as an N+1 pattern in a template, is caught before deploying.
+"""
+
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceededError(Exception):
+    """Raised when a request exceeds the query budget of its view."""
+
+
+def get_query_budget(view_name: str, method: str = "GET") -> int | None:
+    """Get the query budget of a view.
+
+    Parameters
+    ----------
+    view_name : str
+        The URL name of the view, including its namespace.
+    method : str
+        The HTTP method of the request, for views with a budget per method.
+
+    Returns
+    -------
+    int, None
+        The maximum number of queries, or ``None`` if the view has no budget.
+    """
+    budget = getattr(settings, "QUERY_BUDGETS", {}).get(view_name)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+def describe_queries(view_name: str, budget: int, queries: list[str]) -> str:
+    """Describe the queries of a request that exceeded its budget.
+
+    Repeated queries are listed once with their count, which points out N+1 patterns.
+
+    Parameters
+    ----------
+    view_name : str
+        The URL name of the view.
+    budget : int
+        The query budget of the view.
+    queries : list of str
+        The SQL of the queries.
+
+    Returns
+    -------
+    str
+        The description.
+    """
+    lines = [f"{view_name} executed {len(queries)} queries, its budget is {budget}:"]
+    lines += [f"  {count} x {sql}" for sql, count in Counter(queries).most_common()]
+    return "\n".join(lines)
+
+
+class QueryRecorder:
+    """Execute wrapper of a database connection that records the SQL of queries.
+
+    See :meth:`~django.db.backends.base.base.BaseDatabaseWrapper.execute_wrapper`.
+    Unlike the queries logged in debug mode, it works in production.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):  # noqa: D102
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    """Middleware enforcing the query budgets of views.
+
+    The queries of the request are recorded by a :class:`QueryRecorder`, which
+    includes the queries of the other middleware, such as loading the session.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):  # noqa: D102
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        budget = get_query_budget(match.view_name, request.method) if match else None
+        if budget is not None and len(recorder.queries) > budget:
+            message = describe_queries(match.view_name, budget, recorder.queries)
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceededError(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,193 @@
+"""Module containing the computation of the availability of reservable items.
+
+The availability of many items is computed from their indexes, see
+:mod:`loefsys.reservations.caching`. If the window starts before the indexes, it is
+computed from a single query for the reservations overlapping the window, ordered by
+item and start. The reservations of each item are then swept in order, merging the
+overlapping and adjacent ones into the intervals in which the item is busy. The
+intervals in which it is free are the gaps between those, in which
+:func:`find_free_slots` looks for the earliest slots of a given duration.
+"""
+
+import heapq
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+
+from .caching import get_indexes, is_indexed
+from .models import Reservation
+
+MAX_WINDOW = timedelta(days=62)
+"""The longest window of which the availability can be requested at once."""
+
+SLOT_ALIGNMENT = timedelta(minutes=15)
+"""The times at which the free slots found by :func:`find_free_slots` start."""
+
+type Interval = tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Merge overlapping and adjacent intervals.
+
+    Parameters
+    ----------
+    intervals : ~collections.abc.Iterable of tuple of ~datetime.datetime
+        The intervals, ordered by start.
+
+    Returns
+    -------
+    list of tuple of ~datetime.datetime
+        The merged intervals, ordered by start.
+    """
+    merged: list[Interval] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_intervals(
+    busy: list[Interval], start: datetime, end: datetime
+) -> list[Interval]:
+    """Get the gaps between the busy intervals of an item within a window.
+
+    Parameters
+    ----------
+    busy : list of tuple of ~datetime.datetime
+        The merged busy intervals of the item, see :func:`merge_intervals`.
+    start : ~datetime.datetime
+        The start of the window.
+    end : ~datetime.datetime
+        The end of the window.
+
+    Returns
+    -------
+    list of tuple of ~datetime.datetime
+        The free intervals within the window, ordered by start.
+    """
+    free = []
+    for busy_start, busy_end in busy:
+        if busy_start > start:
+            free.append((start, min(busy_start, end)))
+        start = max(start, busy_end)
+        if start >= end:
+            return free
+    if start < end:
+        free.append((start, end))
+    return free
+
+
+def busy_intervals(
+    item_pks: Iterable[int], start: datetime, end: datetime, exclude: int | None = None
+) -> dict[int, list[Interval]]:
+    """Get the intervals in which items are reserved within a window.
+
+    If the indexes cover the window, they give the intervals, see
+    :func:`~loefsys.reservations.caching.is_indexed`. Otherwise the reservations of
+    all items are loaded in a single query.
+
+    Parameters
+    ----------
+    item_pks : ~collections.abc.Iterable of int
+        The primary keys of the items.
+    start : ~datetime.datetime
+        The start of the window.
+    end : ~datetime.datetime
+        The end of the window.
+    exclude : int, None
+        The primary key of a reservation to leave out, such as the reservation that
+        is being changed.
+
+    Returns
+    -------
+    dict of int to list of tuple of ~datetime.datetime
+        For each item, the merged busy intervals, clipped to the window.
+    """
+    busy: dict[int, list[Interval]] = {pk: [] for pk in item_pks}
+    if is_indexed(start):
+        indexes = get_indexes(busy)
+        return {pk: index.busy(start, end, exclude) for pk, index in indexes.items()}
+
+    reservations = (
+        Reservation.objects.filter(reserved_item__in=list(busy))
+        .overlapping(start, end)
+        .order_by("reserved_item", "start")
+        .values_list("reserved_item", "start", "end")
+    )
+    if exclude is not None:
+        reservations = reservations.exclude(pk=exclude)
+
+    for item_pk, rows in groupby(reservations, key=itemgetter(0)):
+        busy[item_pk] = merge_intervals(
+            (max(row_start, start), min(row_end, end)) for _, row_start, row_end in rows
+        )
+    return busy
+
+
+def align(time: datetime) -> datetime:
+    """Round a time up to the next multiple of :data:`SLOT_ALIGNMENT`.
+
+    Parameters
+    ----------
+    time : ~datetime.datetime
+        The time to round.
+
+    Returns
+    -------
+    ~datetime.datetime
+        The rounded time.
+    """
+    remainder = (time - datetime.min.replace(tzinfo=time.tzinfo)) % SLOT_ALIGNMENT
+    return time + (SLOT_ALIGNMENT - remainder) % SLOT_ALIGNMENT
+
+
+def find_free_slots(
+    item_pks: Iterable[int],
+    duration: timedelta,
+    start: datetime,
+    end: datetime,
+    count: int,
+) -> list[tuple[int, datetime, datetime]]:
+    """Find the earliest free slots of a duration among items.
+
+    The busy intervals of all items are loaded at once, see :func:`busy_intervals`,
+    after which the gaps between them are swept. Each gap that is long enough gives
+    back-to-back slots from its start, aligned to :data:`SLOT_ALIGNMENT`, so that the
+    slots are distinct options rather than the same gap shifted by a few minutes.
+
+    Parameters
+    ----------
+    item_pks : ~collections.abc.Iterable of int
+        The primary keys of the candidate items.
+    duration : ~datetime.timedelta
+        The duration of the slots.
+    start : ~datetime.datetime
+        The earliest start of the slots.
+    end : ~datetime.datetime
+        The latest end of the slots.
+    count : int
+        The maximum number of slots.
+
+    Returns
+    -------
+    list of tuple of int, ~datetime.datetime and ~datetime.datetime
+        The item, start and end of each slot, ordered by start and then by item.
+    """
+    busy = busy_intervals(item_pks, start, end)
+
+    def slots(item_pk):
+        for gap_start, gap_end in free_intervals(busy[item_pk], start, end):
+            slot_start = align(gap_start)
+            while slot_start + duration <= gap_end:
+                yield slot_start, item_pk, slot_start + duration
+                slot_start = align(slot_start + duration)
+
+    earliest = heapq.merge(*(slots(item_pk) for item_pk in sorted(busy)))
+    return [
+        (item_pk, slot_start, slot_end)
+        for slot_start, item_pk, slot_end in islice(earliest, count)
+    ]
@@ -0,0 +1,195 @@
+"""Module containing the benchmark of the conflict checks of reservations.
+
+The benchmark seeds a fleet of items with a season of bookings, three per day, and
+measures checking random periods for conflicts with each of these methods:
+
+``predicates``
+    The query with three predicates on the start and end that was used before the
+    periods of reservations were indexed.
+``overlapping``
+    The query of :meth:`~.models.managers.ReservationQuerySet.overlapping`.
+``index``
+    The in-memory index of the item, see :mod:`loefsys.reservations.caching`.
+
+All data is created in a transaction that is rolled back afterwards, so the benchmark
+can be run against a copy of the production database.
+"""
+
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .caching import get_index, get_indexes, touch_item
+from .models import ReservableItem, ReservableType, Reservation
+from .models.choices import ReservableCategories
+
+METHODS = ("predicates", "overlapping", "index")
+"""The methods of the benchmark, in the order in which they are run."""
+
+BOOKINGS = ((9, 12), (13, 17), (18, 21))
+"""The hours at which the daily bookings of each item start and end."""
+
+
+def _seed(items: int, weeks: int) -> tuple[list[int], datetime, datetime]:
+    """Create the items and their bookings.
+
+    Returns the primary keys of the items and the start and end of the season.
+    """
+    season_start = timezone.localtime().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(days=1)
+    season_end = season_start + timedelta(weeks=weeks)
+
+    reservable_type = ReservableType.objects.create(
+        name=f"Benchmark {season_start:%Y%m%d%H%M%S%f}",
+        category=ReservableCategories.BOAT,
+        description="Benchmark",
+    )
+    fleet = ReservableItem.objects.bulk_create(
+        ReservableItem(
+            name=f"Benchmark {index}",
+            description="Benchmark",
+            reservable_type=reservable_type,
+        )
+        for index in range(items)
+    )
+    user = get_user_model()(
+        email=f"benchmark-{reservable_type.pk}@example.com",
+        first_name="Benchmark",
+        last_name="Reservations",
+    )
+    user.set_unusable_password()
+    user.save()
+
+    Reservation.objects.bulk_create(
+        (
+            Reservation(
+                reserved_item=item,
+                reservee_user=user,
+                start=season_start + timedelta(days=day, hours=start),
+                end=season_start + timedelta(days=day, hours=end),
+            )
+            for item in fleet
+            for day in range(weeks * 7)
+            for start, end in BOOKINGS
+        ),
+        batch_size=1000,
+    )
+    for item in fleet:
+        touch_item(item.pk)
+    return [item.pk for item in fleet], season_start, season_end
+
+
+def _check(method: str, item_pk: int, start: datetime, end: datetime) -> bool:
+    """Check whether an item is reserved during a period with a method."""
+    match method:
+        case "predicates":
+            return (
+                Reservation.objects.filter(reserved_item=item_pk)
+                .filter(
+                    Q(start__range=(start, end))
+                    | Q(end__range=(start, end))
+                    | Q(start__lt=start, end__gt=end)
+                )
+                .exists()
+            )
+        case "overlapping":
+            return (
+                Reservation.objects.filter(reserved_item=item_pk)
+                .overlapping(start, end)
+                .exists()
+            )
+        case "index":
+            return get_index(item_pk).overlaps(start, end)
+    raise ValueError(f"Unknown method {method}.")
+
+
+def _summarize(durations: list[float], conflicts: int) -> dict:
+    """Summarize the measurements of the checks of a method."""
+    durations = sorted(duration * 1e6 for duration in durations)
+    return {
+        "median_us": round(statistics.median(durations), 1),
+        "p95_us": round(
+            durations[min(len(durations) - 1, len(durations) * 95 // 100)], 1
+        ),
+        "mean_us": round(statistics.fmean(durations), 1),
+        "conflicts": conflicts,
+    }
+
+
+def run_benchmark(
+    items: int = 20,
+    weeks: int = 30,
+    checks: int = 1000,
+    methods: tuple[str, ...] = METHODS,
+) -> dict:
+    """Run the benchmark of the conflict checks.
+
+    Parameters
+    ----------
+    items : int
+        The number of items in the fleet.
+    weeks : int
+        The length of the season in weeks.
+    checks : int
+        The number of periods to check with each method. The periods are the same
+        for each method, and are two hours long, starting at a random quarter of an
+        hour in the season.
+    methods : tuple of str
+        The methods to run, see :data:`METHODS`.
+
+    Returns
+    -------
+    dict
+        The results, with the time to load the indexes of the fleet in milliseconds,
+        and for each method the median, 95th percentile and mean duration of a check
+        in microseconds, and the number of checks that found a conflict.
+
+    Raises
+    ------
+    ValueError
+        If the fleet, the season or the number of checks is empty.
+    """
+    if min(items, weeks, checks) < 1:
+        raise ValueError("The items, weeks and checks must be positive.")
+
+    results = {}
+    with transaction.atomic():
+        item_pks, season_start, season_end = _seed(items, weeks)
+        quarters = int((season_end - season_start) / timedelta(minutes=15)) - 8
+        rng = random.Random(items * weeks)
+        periods = []
+        for _ in range(checks):
+            start = season_start + rng.randrange(quarters) * timedelta(minutes=15)
+            periods.append((rng.choice(item_pks), start, start + timedelta(hours=2)))
+
+        load_start = time.perf_counter()
+        get_indexes(item_pks)
+        load_ms = (time.perf_counter() - load_start) * 1000
+
+        for method in methods:
+            durations, conflicts = [], 0
+            for item_pk, start, end in periods:
+                check_start = time.perf_counter()
+                conflicts += _check(method, item_pk, start, end)
+                durations.append(time.perf_counter() - check_start)
+            results[method] = _summarize(durations, conflicts)
+        transaction.set_rollback(True)
+
+    for item_pk in item_pks:
+        touch_item(item_pk)
+    return {
+        "database": connection.vendor,
+        "items": items,
+        "weeks": weeks,
+        "reservations": items * weeks * 7 * len(BOOKINGS),
+        "checks": checks,
+        "index_load_ms": round(load_ms, 3),
+        "methods": results,
+    }
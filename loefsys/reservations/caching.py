@@ -0,0 +1,294 @@
+"""Module containing the in-memory index of the reservations of each item.
+
+Checking whether an item is available is the most frequent question the reservations
+app answers. Instead of querying the database each time, every process keeps an
+:class:`ItemIndex` of the upcoming reservations of each item it was asked about. As
+the reservations of an item never overlap, their starts and ends are both sorted, so
+an overlap check is a binary search.
+
+The indexes are invalidated with a version per item in the default cache, which is
+shared by all processes through Redis, see ``DJANGO_CACHE_URL``. Without it, as in
+development, a change made by one process doesn't invalidate the indexes of the
+others. The version is replaced by the signal handlers in
+:mod:`loefsys.reservations.signals` whenever a reservation of the item is saved or
+deleted, both immediately and once the transaction is committed, so that no process
+keeps an index loaded from uncommitted data. Changes that bypass the signals, such
+as :meth:`~django.db.models.query.QuerySet.update`, must call :func:`touch_item`.
+"""
+
+import uuid
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Reservation
+
+INDEX_LOOKBACK = timedelta(days=1)
+"""How long before loading an index its reservations start to be included."""
+
+_indexes: dict[int, "ItemIndex"] = {}
+"""The indexes of this process, by the primary key of their item."""
+
+
+def _version_key(item_pk: int) -> str:
+    return f"reservations:version:{item_pk}"
+
+
+class ItemIndex:
+    """Sorted arrays of the reservations of an item, from some time onwards.
+
+    Parameters
+    ----------
+    version : str
+        The version of the reservations of the item when they were loaded.
+    since : ~datetime.datetime
+        The time from which the reservations are included. Queries for windows that
+        start earlier can't be answered, see :func:`is_indexed`.
+    reservations : ~collections.abc.Iterable of tuple of int, \
+            ~datetime.datetime and ~datetime.datetime
+        The primary key, start and end of the reservations ending after ``since``,
+        ordered by start.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        since: datetime,
+        reservations: Iterable[tuple[int, datetime, datetime]],
+    ):
+        self.version = version
+        self.since = since
+        self.pks: list[int] = []
+        self.starts: list[datetime] = []
+        self.ends: list[datetime] = []
+        for pk, start, end in reservations:
+            self.pks.append(pk)
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self):
+        return len(self.pks)
+
+    def _window(self, start: datetime, end: datetime) -> range:
+        """Get the positions of the reservations overlapping a window."""
+        # As the reservations don't overlap, the ends are sorted like the starts.
+        return range(bisect_right(self.ends, start), bisect_left(self.starts, end))
+
+    def overlaps(
+        self, start: datetime, end: datetime, exclude: int | None = None
+    ) -> bool:
+        """Check whether any reservation overlaps a period.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime
+            The start of the period.
+        end : ~datetime.datetime
+            The end of the period.
+        exclude : int, None
+            The primary key of a reservation to leave out.
+
+        Returns
+        -------
+        bool
+            ``True`` if a reservation overlaps the period.
+        """
+        return any(self.pks[i] != exclude for i in self._window(start, end))
+
+    def busy(
+        self, start: datetime, end: datetime, exclude: int | None = None
+    ) -> list[tuple[datetime, datetime]]:
+        """Get the merged intervals in which the item is reserved within a window.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime
+            The start of the window.
+        end : ~datetime.datetime
+            The end of the window.
+        exclude : int, None
+            The primary key of a reservation to leave out.
+
+        Returns
+        -------
+        list of tuple of ~datetime.datetime
+            The busy intervals, clipped to the window.
+        """
+        busy: list[tuple[datetime, datetime]] = []
+        for i in self._window(start, end):
+            if self.pks[i] == exclude:
+                continue
+            interval_start, interval_end = (
+                max(self.starts[i], start),
+                min(self.ends[i], end),
+            )
+            if busy and busy[-1][1] == interval_start:
+                busy[-1] = (busy[-1][0], interval_end)
+            else:
+                busy.append((interval_start, interval_end))
+        return busy
+
+    def free_slot(
+        self, duration: timedelta, start: datetime, end: datetime
+    ) -> tuple[datetime, datetime] | None:
+        """Find the earliest free slot of a duration within a window.
+
+        Parameters
+        ----------
+        duration : ~datetime.timedelta
+            The duration of the slot.
+        start : ~datetime.datetime
+            The earliest start of the slot.
+        end : ~datetime.datetime
+            The latest end of the slot.
+
+        Returns
+        -------
+        tuple of ~datetime.datetime, None
+            The start and end of the slot, or ``None`` if there is no free slot.
+        """
+        for i in self._window(start, end):
+            if self.starts[i] - start >= duration:
+                break
+            start = max(start, self.ends[i])
+        if end - start < duration:
+            return None
+        return start, start + duration
+
+
+def is_indexed(start: datetime) -> bool:
+    """Check whether the indexes can answer queries for a window.
+
+    Parameters
+    ----------
+    start : ~datetime.datetime
+        The start of the window.
+
+    Returns
+    -------
+    bool
+        ``True`` if the window starts after :data:`INDEX_LOOKBACK` ago, so that it
+        is covered by any index, including one that is loaded now.
+    """
+    return start >= timezone.now() - INDEX_LOOKBACK
+
+
+def touch_item(item_pk: int) -> None:
+    """Mark the reservations of an item as changed, invalidating its indexes.
+
+    The indexes of all processes sharing the default cache are invalidated.
+
+    Parameters
+    ----------
+    item_pk : int
+        The primary key of the item.
+
+    Returns
+    -------
+    None
+    """
+    cache.set(_version_key(item_pk), uuid.uuid4().hex, timeout=None)
+
+
+def get_indexes(item_pks: Iterable[int]) -> dict[int, ItemIndex]:
+    """Get the indexes of items, loading those that are missing or outdated.
+
+    The versions are fetched from the cache at once, and the reservations of all
+    items of which the index must be loaded are fetched in a single query.
+
+    Parameters
+    ----------
+    item_pks : ~collections.abc.Iterable of int
+        The primary keys of the items.
+
+    Returns
+    -------
+    dict of int to ItemIndex
+        The index of each item.
+    """
+    keys = {_version_key(pk): pk for pk in item_pks}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    for pk in keys.values():
+        if pk not in versions:
+            version = uuid.uuid4().hex
+            # Another process may have set the version in the meantime.
+            cache.add(_version_key(pk), version, timeout=None)
+            versions[pk] = cache.get(_version_key(pk), version)
+
+    indexes = {}
+    outdated = []
+    for pk, version in versions.items():
+        index = _indexes.get(pk)
+        if index is not None and index.version == version:
+            indexes[pk] = index
+        else:
+            outdated.append(pk)
+    if outdated:
+        since = timezone.now() - INDEX_LOOKBACK
+        reservations = (
+            Reservation.objects.filter(reserved_item__in=outdated, end__gt=since)
+            .order_by("reserved_item", "start")
+            .values_list("reserved_item", "pk", "start", "end")
+        )
+        rows: dict[int, list[tuple[int, datetime, datetime]]] = {
+            pk: [] for pk in outdated
+        }
+        for item_pk, pk, start, end in reservations:
+            rows[item_pk].append((pk, start, end))
+        for pk in outdated:
+            indexes[pk] = _indexes[pk] = ItemIndex(versions[pk], since, rows[pk])
+    return indexes
+
+
+def get_index(item_pk: int) -> ItemIndex:
+    """Get the index of an item, loading it if it is missing or outdated.
+
+    Parameters
+    ----------
+    item_pk : int
+        The primary key of the item.
+
+    Returns
+    -------
+    ItemIndex
+        The index of the item.
+    """
+    return get_indexes([item_pk])[item_pk]
+
+
+def is_reserved(
+    item_pk: int, start: datetime, end: datetime, exclude: int | None = None
+) -> bool:
+    """Check whether an item is reserved during a period.
+
+    The index of the item answers the check if it covers the period, see
+    :func:`is_indexed`. Otherwise the database is queried.
+
+    Parameters
+    ----------
+    item_pk : int
+        The primary key of the item.
+    start : ~datetime.datetime
+        The start of the period.
+    end : ~datetime.datetime
+        The end of the period.
+    exclude : int, None
+        The primary key of a reservation to leave out, such as the reservation that
+        is being changed.
+
+    Returns
+    -------
+    bool
+        ``True`` if a reservation of the item overlaps the period.
+    """
+    if is_indexed(start):
+        return get_index(item_pk).overlaps(start, end, exclude)
+    reservations = Reservation.objects.filter(reserved_item=item_pk).overlapping(
+        start, end
+    )
+    if exclude is not None:
+        reservations = reservations.exclude(pk=exclude)
+    return reservations.exists()
@@ -1,11 +1,14 @@
 """Module defining the forms for the reservations."""
 
 from django import forms
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
 
 from loefsys.members.models.user_skippership import UserSkippership
 from loefsys.reservations.models.log import Question
 
 from .models import ReservableItem, Reservation
+from .recurrence import get_occurrences
 
 
 class CreateReservationForm(forms.ModelForm):
@@ -36,6 +39,59 @@ class CreateReservationForm(forms.ModelForm):
         fields = ("reserved_item", "start", "end", "authorized_userskippership")
 
 
+class RecurringReservationForm(forms.Form):
+    """A form to reserve an item at the occurrences of a recurrence rule.
+
+    The start and end are those of the first occurrence. When the form is valid, the
+    cleaned data contains the unsaved ``reservation`` with the item and the skipper,
+    and the ``occurrences``, see
+    :func:`~loefsys.reservations.recurrence.get_occurrences`.
+    """
+
+    reserved_item = forms.ModelChoiceField(
+        queryset=ReservableItem.objects.none(), widget=forms.RadioSelect
+    )
+    start = forms.DateTimeField(
+        widget=forms.DateTimeInput(attrs={"type": "datetime-local"})
+    )
+    end = forms.DateTimeField(
+        widget=forms.DateTimeInput(attrs={"type": "datetime-local"})
+    )
+    recurrence = forms.CharField(
+        max_length=255,
+        initial="FREQ=WEEKLY;COUNT=30",
+        help_text=_("An RFC 5545 RRULE, for example FREQ=WEEKLY;COUNT=30."),
+    )
+    authorized_userskippership = forms.ModelChoiceField(
+        queryset=UserSkippership.objects.all(), required=False
+    )
+
+    def clean(self):
+        """Expand the recurrence rule and check the item and the skipper."""
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        start, end = cleaned_data["start"], cleaned_data["end"]
+        if end <= start:
+            raise ValidationError(_("End time cannot be before the start time."))
+        try:
+            cleaned_data["occurrences"] = get_occurrences(
+                cleaned_data["recurrence"], start, end - start
+            )
+        except ValueError as error:
+            raise ValidationError({"recurrence": str(error)}) from error
+
+        reservation = Reservation(
+            reserved_item=cleaned_data["reserved_item"],
+            authorized_userskippership=cleaned_data["authorized_userskippership"],
+            start=start,
+            end=end,
+        )
+        reservation.validate_item()
+        cleaned_data["reservation"] = reservation
+        return cleaned_data
+
+
 class SortByReservationForm(forms.Form):
     """A form to sort reservations."""
 
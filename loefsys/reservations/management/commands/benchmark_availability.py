@@ -0,0 +1,57 @@
+"""Management command to benchmark the conflict checks of reservations."""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loefsys.reservations.benchmark import METHODS, run_benchmark
+
+
+class Command(BaseCommand):
+    """Benchmark checking periods for conflicting reservations.
+
+    The results are written as JSON, to standard output or to a file. The benchmark
+    data is rolled back afterwards.
+    """
+
+    help = "Benchmark the conflict checks of reservations against a season of bookings."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            "--items", type=int, default=20, help="The number of items in the fleet."
+        )
+        parser.add_argument(
+            "--weeks", type=int, default=30, help="The length of the season in weeks."
+        )
+        parser.add_argument(
+            "--checks",
+            type=int,
+            default=1000,
+            help="The number of periods to check with each method.",
+        )
+        parser.add_argument(
+            "--method",
+            action="append",
+            choices=METHODS,
+            dest="methods",
+            help="A method to run. By default, all methods are run.",
+        )
+        parser.add_argument("--output", type=Path, help="The file for the results.")
+
+    def handle(self, *args, **options):  # noqa: ARG002 D102
+        try:
+            results = run_benchmark(
+                options["items"],
+                options["weeks"],
+                options["checks"],
+                tuple(options["methods"] or METHODS),
+            )
+        except ValueError as error:
+            raise CommandError(str(error)) from error
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            options["output"].write_text(output + "\n")
+        else:
+            self.stdout.write(output)
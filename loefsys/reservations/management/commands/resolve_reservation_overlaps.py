@@ -0,0 +1,76 @@
+"""Management command to resolve overlapping reservations."""
+
+from bisect import bisect_right
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from loefsys.reservations.models import Reservation
+
+
+class Command(BaseCommand):
+    """Report the reservations that overlap an earlier one, and optionally delete them.
+
+    Reservations of the same item may not overlap, which PostgreSQL enforces with an
+    exclusion constraint, see :mod:`loefsys.reservations.overlap`. Overlaps stored
+    before the constraint was added make the migration adding it fail, so this command
+    must be run before that migration. The reservations are taken in the order in
+    which they were made: a reservation that overlaps a reservation made before it is
+    reported, and is deleted when the ``--resolve`` option is given. As the periods are
+    half-open, back-to-back reservations don't overlap.
+
+    Only the columns that exist before the migration are read, so the command can be
+    run against the database as it is before migrating.
+    """
+
+    help = "Report reservations that overlap an earlier one, and delete them."
+
+    def add_arguments(self, parser):  # noqa: D102
+        parser.add_argument(
+            "--resolve",
+            action="store_true",
+            help="Delete the reservations that overlap an earlier one.",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002 D102
+        with transaction.atomic():
+            reservations = (
+                Reservation.objects.select_for_update()
+                .order_by("date_of_creation", "pk")
+                .values_list("pk", "reserved_item_id", "start", "end")
+            )
+            # The kept reservations of each item don't overlap, so both their starts
+            # and their ends are sorted.
+            kept: dict[int, tuple[list, list]] = {}
+            overlapping = []
+            for pk, item_pk, start, end in reservations:
+                starts, ends = kept.setdefault(item_pk, ([], []))
+                index = bisect_right(starts, start)
+                if (index > 0 and ends[index - 1] > start) or (
+                    index < len(starts) and starts[index] < end
+                ):
+                    overlapping.append(pk)
+                    self.stdout.write(
+                        f"Reservation {pk} of item {item_pk} from {start} to {end} "
+                        "overlaps an earlier reservation."
+                    )
+                else:
+                    starts.insert(index, start)
+                    ends.insert(index, end)
+
+            if not overlapping:
+                self.stdout.write(self.style.SUCCESS("No reservations overlap."))
+            elif options["resolve"]:
+                Reservation.objects.filter(pk__in=overlapping).only(
+                    "pk", "reserved_item"
+                ).delete()
+                self.stdout.write(
+                    self.style.SUCCESS(f"Deleted {len(overlapping)} reservations.")
+                )
+            else:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{len(overlapping)} reservations overlap an earlier one. "
+                        "Run with --resolve to delete them."
+                    )
+                )
@@ -0,0 +1,75 @@
+"""Module containing the model managers for the reservations app."""
+
+from functools import reduce
+from operator import or_
+from typing import TYPE_CHECKING, Self
+
+from django.contrib.postgres.fields.ranges import DateTimeTZRange
+from django.db import models
+from django.db.models import Q
+
+from loefsys.reservations.overlap import supports_exclusion
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import datetime
+
+
+class ReservationQuerySet(models.QuerySet["Reservation"]):
+    """Query set for reservations, with filters on their period."""
+
+    def overlapping(self, start: "datetime", end: "datetime") -> Self:
+        """Filter for reservations that overlap a period.
+
+        On PostgreSQL, the period of the reservations is compared as a range, which
+        uses the index of the exclusion constraint, see
+        :mod:`loefsys.reservations.overlap`.
+
+        Parameters
+        ----------
+        start : ~datetime.datetime
+            The start of the period.
+        end : ~datetime.datetime
+            The end of the period, which is not included.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of \
+                ~loefsys.reservations.models.reservation.Reservation
+            A query of the reservations overlapping the period.
+        """
+        return self.filter(self._overlap_condition(start, end))
+
+    def overlapping_any(self, periods: "Iterable[tuple[datetime, datetime]]") -> Self:
+        """Filter for reservations that overlap any of several periods.
+
+        Parameters
+        ----------
+        periods : ~collections.abc.Iterable of tuple of ~datetime.datetime
+            The start and end of each period.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of \
+                ~loefsys.reservations.models.reservation.Reservation
+            A query of the reservations overlapping at least one of the periods.
+        """
+        return self.filter(
+            reduce(
+                or_,
+                (self._overlap_condition(start, end) for start, end in periods),
+                Q(pk__in=[]),
+            )
+        )
+
+    def _overlap_condition(self, start: "datetime", end: "datetime") -> Q:
+        if supports_exclusion(self.db):
+            return Q(period__overlap=DateTimeTZRange(start, end, "[)"))
+        return Q(start__lt=end, end__gt=start)
+
+
+class ReservationManager(models.Manager.from_queryset(ReservationQuerySet)):  # type: ignore
+    """Model manager for reservations.
+
+    The filters of :class:`ReservationQuerySet` are available on the manager as well.
+    """
@@ -1,6 +1,6 @@
 """Module defining the model for a reservation."""
 
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
 from django.db.models import CheckConstraint, F, Q
 from django.forms import ValidationError
 from django.urls import reverse
@@ -10,7 +10,15 @@ from loefsys.members.models.user import User
 from loefsys.members.models.user_skippership import UserSkippership
 from loefsys.reservations.models.boat import Boat
 from loefsys.reservations.models.choices import ReservableCategories
+from loefsys.reservations.models.managers import ReservationManager
 from loefsys.reservations.models.reservable import ReservableItem
+from loefsys.reservations.overlap import (
+    OVERLAP_MESSAGE,
+    NoOverlapConstraint,
+    ReservationPeriod,
+    is_overlap_violation,
+    supports_exclusion,
+)
 
 
 class Reservation(models.Model):
@@ -43,6 +51,10 @@ class Reservation(models.Model):
         The start timestamp of the reservation.
     end : ~datetime.datetime
         The end timestamp of the reservation.
+    period : ~psycopg.types.range.Range
+        The period from the start to the end, generated by the database. No two
+        reservations of the same item may have overlapping periods, see
+        :mod:`loefsys.reservations.overlap`.
     """
 
     reserved_item = models.ForeignKey(ReservableItem, on_delete=models.CASCADE)
@@ -64,8 +76,18 @@ class Reservation(models.Model):
 
     start = models.DateTimeField(verbose_name=_("Start time"))
     end = models.DateTimeField(verbose_name=_("End time"))
+    period = models.GeneratedField(
+        expression=ReservationPeriod(),
+        output_field=ReservationPeriod.output_field,
+        db_persist=True,
+    )
     date_of_creation = models.DateTimeField(auto_now_add=True)
 
+    objects = ReservationManager()
+
+    _loaded_item_id: int | None = None
+    """The item as stored in the database, used to invalidate its index on a move."""
+
     class Meta:
         constraints = (
             CheckConstraint(
@@ -73,15 +95,53 @@ class Reservation(models.Model):
                 name="end_gt_start",
                 violation_error_message="End time cannot be before the start time.",
             ),
+            NoOverlapConstraint(),
         )
 
     def __str__(self) -> str:
         return f"Reservation for {self.reserved_item}"
 
+    def save(self, *args, **kwargs):
+        """Save the reservation, unless it overlaps another reservation of the item.
+
+        The check in :meth:`clean` can't prevent two overlapping reservations that
+        are saved at the same time. On PostgreSQL, the exclusion constraint prevents
+        them. On other databases, the row of the item is locked while checking for
+        overlaps and saving. SQLite doesn't lock rows, but it allows a single writing
+        transaction at a time, so a concurrent save fails rather than overlaps.
+
+        Raises
+        ------
+            ValidationError: This item has already been reserved during this timeslot.
+        """
+        using = kwargs.get("using") or router.db_for_write(Reservation, instance=self)
+        try:
+            with transaction.atomic(using=using):
+                if not supports_exclusion(using):
+                    list(
+                        ReservableItem.objects.using(using)
+                        .select_for_update()
+                        .filter(pk=self.reserved_item_id)
+                        .values_list("pk")
+                    )
+                    if self.conflicts().using(using).exists():
+                        raise ValidationError(OVERLAP_MESSAGE)
+                super().save(*args, **kwargs)
+        except IntegrityError as error:
+            if is_overlap_violation(error):
+                raise ValidationError(OVERLAP_MESSAGE) from error
+            raise
+
     def get_absolute_url(self):
         """Return the detail page url for this reservation."""
         return reverse("reservation-detail", kwargs={"pk": self.pk})
 
+    @classmethod
+    def from_db(cls, db, field_names, values):  # noqa: D102
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_item_id = instance.__dict__.get("reserved_item_id")
+        return instance
+
     def clean(self):
         """Check whether any of the other reservations overlap and if the boat requires a skippership.
 
@@ -92,38 +152,54 @@ class Reservation(models.Model):
             ValidationError: The boat selected requires an authorized skipper to be set.
             ValidationError: The skipper set is not authorized for this boat.
         """  # noqa: E501
-        try:
-            Reservation.objects.get(
-                ~Q(pk=self.pk)
-                & Q(reserved_item=self.reserved_item)
-                & (
-                    Q(start__range=(self.start, self.end))
-                    | Q(end__range=(self.start, self.end))
-                    | Q(start__lt=self.start, end__gt=self.end)
-                )
-            )
-            raise ValidationError(
-                "This item has already been reserved during this timeslot."
-            )
-        except Reservation.DoesNotExist:
-            if not self.reserved_item.is_reservable:
-                raise ValidationError("This item is not reservable at the moment.")
-
-            if self.reserved_item.reservable_type.category == ReservableCategories.BOAT:
-                requires_skippership = Boat.objects.get(
-                    pk=self.reserved_item.pk
-                ).requires_skippership
-                if requires_skippership:
-                    if not self.authorized_userskippership:
-                        raise ValidationError(
-                            "The boat selected requires an authorized skipper to be set."  # noqa: E501
-                        )
-
-                    if (
-                        requires_skippership
-                        != self.authorized_userskippership.skippership
-                    ):
-                        raise ValidationError(
-                            "The skipper set is not authorized for this boat."
-                        )
-            return
+        # The caching module imports this model.
+        from loefsys.reservations.caching import is_reserved  # noqa: PLC0415
+
+        if is_reserved(self.reserved_item_id, self.start, self.end, exclude=self.pk):
+            raise ValidationError(OVERLAP_MESSAGE)
+        self.validate_item()
+
+    def validate_item(self):
+        """Check whether the item is reservable and if the boat requires a skippership.
+
+        These checks don't depend on the period, so they are done once for all
+        occurrences of a recurring reservation, see
+        :class:`~loefsys.reservations.forms.RecurringReservationForm`.
+
+        Raises
+        ------
+            ValidationError: This item is not reservable at the moment.
+            ValidationError: The boat selected requires an authorized skipper to be set.
+            ValidationError: The skipper set is not authorized for this boat.
+        """
+        if not self.reserved_item.is_reservable:
+            raise ValidationError("This item is not reservable at the moment.")
+
+        if self.reserved_item.reservable_type.category == ReservableCategories.BOAT:
+            requires_skippership = Boat.objects.get(
+                pk=self.reserved_item.pk
+            ).requires_skippership
+            if requires_skippership:
+                if not self.authorized_userskippership:
+                    raise ValidationError(
+                        "The boat selected requires an authorized skipper to be set."
+                    )
+
+                if requires_skippership != self.authorized_userskippership.skippership:
+                    raise ValidationError(
+                        "The skipper set is not authorized for this boat."
+                    )
+
+    def conflicts(self) -> models.QuerySet["Reservation"]:
+        """Get the other reservations of the item that overlap this reservation.
+
+        Returns
+        -------
+        ~django.db.models.query.QuerySet of Reservation
+            A query of the overlapping reservations.
+        """
+        return (
+            Reservation.objects.filter(reserved_item=self.reserved_item_id)
+            .exclude(pk=self.pk)
+            .overlapping(self.start, self.end)
+        )
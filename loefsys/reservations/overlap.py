@@ -0,0 +1,147 @@
+"""Module containing the prevention of overlapping reservations.
+
+On PostgreSQL, reservations have a generated ``tstzrange`` column with their period,
+which is protected by an exclusion constraint: no two reservations of the same item
+may have overlapping periods. The constraint is enforced by a GiST index, which the
+queries for overlapping reservations use as well. The item is compared in the index
+as the range containing just its primary key, as GiST supports ranges without the
+``btree_gist`` extension.
+
+Other databases, such as SQLite in the tests, don't support this. The column then
+contains the start and end as text, and the reservations of an item are checked for
+overlaps while the row of the item is locked, see
+:meth:`~loefsys.reservations.models.reservation.Reservation.save`.
+
+Periods are half-open: a reservation that ends at 12:00 doesn't overlap one that
+starts at 12:00.
+
+Adding the constraint fails while overlapping reservations are stored, which was
+possible before. The management command ``resolve_reservation_overlaps`` reports
+them, and deletes the reservations that overlap an earlier one with ``--resolve``.
+It must be run before the migration adding the constraint.
+"""
+
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections
+from django.db.models import Case, F, Func, Value, When
+from django.db.models.functions import Concat
+from django.utils.translation import gettext_lazy as _
+
+OVERLAP_MESSAGE = _("This item has already been reserved during this timeslot.")
+"""The error when a reservation overlaps another reservation of the same item."""
+
+OVERLAP_CONSTRAINT = "reservation_no_overlap"
+"""The name of the exclusion constraint preventing overlapping reservations."""
+
+
+class ReservationPeriod(Func):
+    """Expression of the period of a reservation, for a generated column.
+
+    On PostgreSQL, this is the half-open ``tstzrange`` from the start to the end. It
+    is ``NULL`` if the end isn't after the start, so that the check constraint on the
+    times rejects the reservation rather than the range. On other databases it is the
+    start and the end as text.
+    """
+
+    output_field = DateTimeRangeField()
+
+    def __init__(self):
+        super().__init__(
+            Case(
+                When(
+                    end__gt=F("start"),
+                    then=Func(F("start"), F("end"), Value("[)"), function="TSTZRANGE"),
+                ),
+                default=None,
+                output_field=DateTimeRangeField(),
+            ),
+            Concat(F("start"), Value("/"), F("end")),
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):  # noqa: ARG002 D102
+        return compiler.compile(self.source_expressions[1])
+
+    def as_postgresql(self, compiler, connection, **extra_context):  # noqa: ARG002 D102
+        return compiler.compile(self.source_expressions[0])
+
+
+class NoOverlapConstraint(ExclusionConstraint):
+    """Exclusion constraint on the periods of the reservations of each item.
+
+    The constraint is only created on PostgreSQL. It isn't validated by
+    :meth:`~django.db.models.Model.full_clean`, as
+    :meth:`~loefsys.reservations.models.reservation.Reservation.clean` already checks
+    for overlaps on all databases.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("name", OVERLAP_CONSTRAINT)
+        kwargs.setdefault(
+            "expressions",
+            [
+                ("period", RangeOperators.OVERLAPS),
+                (
+                    Func(
+                        F("reserved_item"),
+                        F("reserved_item"),
+                        Value("[]"),
+                        function="INT8RANGE",
+                    ),
+                    RangeOperators.EQUAL,
+                ),
+            ],
+        )
+        kwargs.setdefault("violation_error_message", OVERLAP_MESSAGE)
+        super().__init__(**kwargs)
+
+    def constraint_sql(self, model, schema_editor):  # noqa: D102
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):  # noqa: D102
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):  # noqa: D102
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, model, instance, exclude=None, using=DEFAULT_DB_ALIAS):  # noqa: ARG002 D102
+        return
+
+
+def is_overlap_violation(error: IntegrityError) -> bool:
+    """Check whether an error is a violation of the constraint against overlaps.
+
+    Parameters
+    ----------
+    error : ~django.db.IntegrityError
+        The error raised when saving a reservation.
+
+    Returns
+    -------
+    bool
+        ``True`` if the reservation overlaps another reservation of the item.
+    """
+    diag = getattr(error.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None) == OVERLAP_CONSTRAINT
+
+
+def supports_exclusion(using: str = DEFAULT_DB_ALIAS) -> bool:
+    """Check whether a database enforces the constraint against overlaps.
+
+    Parameters
+    ----------
+    using : str
+        The alias of the database.
+
+    Returns
+    -------
+    bool
+        ``True`` on PostgreSQL, otherwise ``False``.
+    """
+    return connections[using].vendor == "postgresql"
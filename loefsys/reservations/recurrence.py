@@ -0,0 +1,183 @@
+"""Module containing the booking of recurring reservations.
+
+A recurring reservation is a recurrence rule for an item, such as the weekly training
+slots of a season. The rule is expanded into its occurrences by
+:func:`get_occurrences`, which :func:`book_occurrences` books at once: the existing
+reservations overlapping any of the occurrences are loaded in a single query, and
+the occurrences without conflicts are inserted in a single bulk insert. The others are
+reported with the reservations they conflict with.
+"""
+
+from datetime import datetime, timedelta
+from itertools import islice, pairwise
+from typing import NamedTuple
+
+from dateutil.rrule import rrule, rrulestr
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .caching import touch_item
+from .models import ReservableItem, Reservation
+from .overlap import OVERLAP_MESSAGE, is_overlap_violation
+
+MAX_OCCURRENCES = 52
+"""The maximum number of occurrences of a recurring reservation."""
+
+
+class OccurrenceResult(NamedTuple):
+    """The result of booking an occurrence of a recurring reservation.
+
+    Attributes
+    ----------
+    start : ~datetime.datetime
+        The start of the occurrence.
+    end : ~datetime.datetime
+        The end of the occurrence.
+    reservation : ~loefsys.reservations.models.reservation.Reservation, None
+        The reservation of the occurrence, or ``None`` if it wasn't booked.
+    conflicts : list of ~loefsys.reservations.models.reservation.Reservation
+        The existing reservations that overlap the occurrence.
+    """
+
+    start: datetime
+    end: datetime
+    reservation: Reservation | None
+    conflicts: list[Reservation]
+
+    @property
+    def booked(self) -> bool:
+        """Whether the occurrence was booked."""
+        return self.reservation is not None
+
+
+def get_occurrences(
+    recurrence: str, first_start: datetime, duration: timedelta
+) -> list[tuple[datetime, datetime]]:
+    """Expand a recurrence rule into its occurrences.
+
+    The rule is evaluated in local time, like the rules of
+    :class:`~loefsys.events.models.series.EventSeries`, so that the occurrences keep
+    starting at the same time of day when daylight saving time starts or ends.
+
+    Parameters
+    ----------
+    recurrence : str
+        The recurrence rule as an RFC 5545 ``RRULE``, for example
+        ``FREQ=WEEKLY;COUNT=30``.
+    first_start : ~datetime.datetime
+        The start of the first occurrence.
+    duration : ~datetime.timedelta
+        The duration of each occurrence.
+
+    Returns
+    -------
+    list of tuple of ~datetime.datetime
+        The start and end of each occurrence, in order.
+
+    Raises
+    ------
+    ValueError
+        If the rule is invalid, has more than :data:`MAX_OCCURRENCES` occurrences or
+        has occurrences that overlap each other.
+    """
+    rule = rrulestr(recurrence, dtstart=timezone.localtime(first_start))
+    if not isinstance(rule, rrule):
+        raise ValueError(_("Only a single RRULE is supported."))
+    starts = list(islice(rule, MAX_OCCURRENCES + 1))
+    if len(starts) > MAX_OCCURRENCES:
+        raise ValueError(
+            _("A recurring reservation has at most %(count)d occurrences.")
+            % {"count": MAX_OCCURRENCES}
+        )
+    if any(later - earlier < duration for earlier, later in pairwise(starts)):
+        raise ValueError(_("The occurrences overlap each other."))
+    return [(start, start + duration) for start in starts]
+
+
+def book_occurrences(
+    reservation: Reservation, occurrences: list[tuple[datetime, datetime]]
+) -> list[OccurrenceResult]:
+    """Book the occurrences of a recurring reservation that don't have conflicts.
+
+    The row of the item is locked while checking for conflicts and inserting, like in
+    :meth:`~loefsys.reservations.models.reservation.Reservation.save`. As the
+    reservations are inserted in bulk, the signals aren't sent, so the index of the
+    item is invalidated here, see :mod:`loefsys.reservations.caching`.
+
+    Parameters
+    ----------
+    reservation : ~loefsys.reservations.models.reservation.Reservation
+        An unsaved reservation with the item, the reservee and the skipper of the
+        occurrences. Its period isn't used.
+    occurrences : list of tuple of ~datetime.datetime
+        The start and end of each occurrence, in order and without overlaps, see
+        :func:`get_occurrences`.
+
+    Returns
+    -------
+    list of OccurrenceResult
+        The result of each occurrence, in order.
+
+    Raises
+    ------
+    ValidationError
+        If a conflicting reservation was saved at the same time.
+    """
+    using = router.db_for_write(Reservation)
+    item_pk = reservation.reserved_item_id
+    try:
+        with transaction.atomic(using=using):
+            list(
+                ReservableItem.objects.using(using)
+                .select_for_update()
+                .filter(pk=item_pk)
+                .values_list("pk")
+            )
+            existing = list(
+                Reservation.objects.using(using)
+                .filter(reserved_item=item_pk)
+                .overlapping_any(occurrences)
+                .order_by("start")
+            )
+
+            # As neither the existing reservations nor the occurrences overlap each
+            # other, the conflicts of each occurrence follow those of the previous.
+            conflicts, index = [], 0
+            for start, end in occurrences:
+                while index < len(existing) and existing[index].end <= start:
+                    index += 1
+                others = []
+                for other in existing[index:]:
+                    if other.start >= end:
+                        break
+                    others.append(other)
+                conflicts.append(others)
+
+            booked = iter(
+                Reservation.objects.using(using).bulk_create(
+                    Reservation(
+                        reserved_item_id=item_pk,
+                        reservee_user_id=reservation.reservee_user_id,
+                        authorized_userskippership_id=(
+                            reservation.authorized_userskippership_id
+                        ),
+                        start=start,
+                        end=end,
+                    )
+                    for (start, end), others in zip(occurrences, conflicts, strict=True)
+                    if not others
+                )
+            )
+            touch_item(item_pk)
+            transaction.on_commit(lambda: touch_item(item_pk), using=using)
+    except IntegrityError as error:
+        if is_overlap_violation(error):
+            raise ValidationError(OVERLAP_MESSAGE) from error
+        raise
+
+    return [
+        OccurrenceResult(start, end, None if others else next(booked), others)
+        for (start, end), others in zip(occurrences, conflicts, strict=True)
+    ]
@@ -0,0 +1,39 @@
+"""Module for registering signals for reservation-related models."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch.dispatcher import receiver
+
+from .caching import touch_item
+from .models import ReservableItem, Reservation
+
+
+def _touch_items(*item_pks: int | None) -> None:
+    """Invalidate the indexes of items now and once the transaction is committed.
+
+    Invalidating now prevents this process from using an outdated index during the
+    transaction. Other processes may load the index again before the transaction is
+    committed, which the second invalidation undoes.
+    """
+    for item_pk in {pk for pk in item_pks if pk is not None}:
+        touch_item(item_pk)
+        transaction.on_commit(lambda pk=item_pk: touch_item(pk))
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def on_reservation_change(*, instance, **_):
+    """Invalidate the indexes of the items of a saved or deleted reservation."""
+    _touch_items(instance.reserved_item_id, instance._loaded_item_id)
+    instance._loaded_item_id = instance.reserved_item_id
+
+
+@receiver(post_save)
+def on_item_create(*, instance, created, **_):
+    """Invalidate the index of a new item, in case its primary key is reused.
+
+    The signal is sent with the concrete class of the item as sender, such as
+    :class:`~loefsys.reservations.models.boat.Boat`.
+    """
+    if created and isinstance(instance, ReservableItem):
+        _touch_items(instance.pk)
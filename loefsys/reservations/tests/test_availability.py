@@ -0,0 +1,140 @@
+"""Module defining the tests for the availability of reservable items."""
+
+from datetime import UTC, datetime, timedelta
+
+from django.test import TestCase
+from django_dynamic_fixture import G
+
+from loefsys.reservations.availability import (
+    align,
+    busy_intervals,
+    find_free_slots,
+    free_intervals,
+    merge_intervals,
+)
+from loefsys.reservations.models import Reservation
+from loefsys.reservations.models.reservable import ReservableItem
+
+
+def at(hour):
+    """Get a time on the first of June."""
+    return datetime(2025, 6, 1, tzinfo=UTC) + timedelta(hours=hour)
+
+
+class IntervalTestCase(TestCase):
+    """Tests for merging intervals and finding the gaps between them."""
+
+    def test_merge(self):
+        """Test that overlapping and adjacent intervals are merged."""
+        self.assertEqual(
+            merge_intervals(
+                [(at(1), at(3)), (at(2), at(4)), (at(4), at(5)), (at(6), at(7))]
+            ),
+            [(at(1), at(5)), (at(6), at(7))],
+        )
+        self.assertEqual(
+            merge_intervals([(at(1), at(5)), (at(2), at(3))]), [(at(1), at(5))]
+        )
+
+    def test_free(self):
+        """Test that the gaps within the window are found."""
+        busy = [(at(2), at(3)), (at(5), at(6))]
+        self.assertEqual(
+            free_intervals(busy, at(0), at(8)),
+            [(at(0), at(2)), (at(3), at(5)), (at(6), at(8))],
+        )
+        self.assertEqual(free_intervals(busy, at(2), at(5)), [(at(3), at(5))])
+        self.assertEqual(free_intervals([(at(0), at(8))], at(1), at(7)), [])
+
+    def test_align(self):
+        """Test that times are rounded up to a quarter of an hour."""
+        self.assertEqual(align(at(1)), at(1))
+        self.assertEqual(align(at(1) + timedelta(minutes=1)), at(1.25))
+        self.assertEqual(align(at(1) + timedelta(minutes=59)), at(2))
+
+
+class BusyIntervalsTestCase(TestCase):
+    """Tests for finding the busy intervals of many items."""
+
+    def setUp(self):
+        self.items = [G(ReservableItem) for _ in range(3)]
+        for item, start, end in (
+            (self.items[0], 1, 3),
+            (self.items[0], 3, 5),
+            (self.items[0], 7, 9),
+            (self.items[1], -2, 2),
+            (self.items[1], 30, 32),
+        ):
+            G(Reservation, reserved_item=item, start=at(start), end=at(end))
+
+    def test_busy(self):
+        """Test that the reservations of all items are merged in a single query."""
+        with self.assertNumQueries(1):
+            busy = busy_intervals([item.pk for item in self.items], at(0), at(24))
+        self.assertEqual(
+            busy,
+            {
+                self.items[0].pk: [(at(1), at(5)), (at(7), at(9))],
+                self.items[1].pk: [(at(0), at(2))],
+                self.items[2].pk: [],
+            },
+        )
+
+    def test_exclude(self):
+        """Test that a reservation can be left out."""
+        reservation = Reservation.objects.get(reserved_item=self.items[1], end=at(2))
+        busy = busy_intervals([self.items[1].pk], at(0), at(24), reservation.pk)
+        self.assertEqual(busy, {self.items[1].pk: []})
+
+    def test_free_slots(self):
+        """Test that the earliest slots of all items are found."""
+        items = [item.pk for item in self.items]
+        with self.assertNumQueries(1):
+            slots = find_free_slots(items, timedelta(hours=2), at(0), at(24), 7)
+        self.assertEqual(
+            slots,
+            [
+                (self.items[2].pk, at(0), at(2)),
+                (self.items[1].pk, at(2), at(4)),
+                (self.items[2].pk, at(2), at(4)),
+                (self.items[1].pk, at(4), at(6)),
+                (self.items[2].pk, at(4), at(6)),
+                (self.items[0].pk, at(5), at(7)),
+                (self.items[1].pk, at(6), at(8)),
+            ],
+        )
+
+    def test_free_slots_single_item(self):
+        """Test that a long gap of a single item gives several slots."""
+        slots = find_free_slots(
+            [self.items[0].pk], timedelta(hours=2), at(0), at(24 * 7), 5
+        )
+        self.assertEqual(
+            slots,
+            [
+                (self.items[0].pk, at(5), at(7)),
+                (self.items[0].pk, at(9), at(11)),
+                (self.items[0].pk, at(11), at(13)),
+                (self.items[0].pk, at(13), at(15)),
+                (self.items[0].pk, at(15), at(17)),
+            ],
+        )
+
+    def test_free_slots_aligned(self):
+        """Test that the slots start at a quarter of an hour within the horizon."""
+        start = at(0) + timedelta(minutes=50)
+        slots = find_free_slots(
+            [self.items[0].pk], timedelta(hours=3), start, at(10), 5
+        )
+        self.assertEqual(slots, [])
+        slots = find_free_slots(
+            [self.items[2].pk], timedelta(hours=3), start, at(10), 5
+        )
+        self.assertEqual(
+            slots,
+            [
+                (self.items[2].pk, at(1), at(4)),
+                (self.items[2].pk, at(4), at(7)),
+                (self.items[2].pk, at(7), at(10)),
+            ],
+        )
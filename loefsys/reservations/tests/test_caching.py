@@ -0,0 +1,152 @@
+"""Module defining the tests for the indexes of the reservations of items."""
+
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.reservations.availability import busy_intervals
+from loefsys.reservations.caching import ItemIndex, get_index, is_reserved
+from loefsys.reservations.models import Reservation
+from loefsys.reservations.models.reservable import ReservableItem
+
+
+class ItemIndexTestCase(TestCase):
+    """Tests for answering queries from the sorted reservations of an item."""
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.index = ItemIndex(
+            "version",
+            self.now,
+            [
+                (1, self.at(1), self.at(3)),
+                (2, self.at(3), self.at(4)),
+                (3, self.at(6), self.at(8)),
+            ],
+        )
+
+    def at(self, hour):
+        """Get a time some hours after the index starts."""
+        return self.now + timedelta(hours=hour)
+
+    def test_overlaps(self):
+        """Test that overlaps are found and periods are half-open."""
+        self.assertTrue(self.index.overlaps(self.at(2), self.at(2.5)))
+        self.assertTrue(self.index.overlaps(self.at(0), self.at(10)))
+        self.assertFalse(self.index.overlaps(self.at(4), self.at(6)))
+        self.assertFalse(self.index.overlaps(self.at(8), self.at(9)))
+        self.assertTrue(self.index.overlaps(self.at(3.5), self.at(5)))
+        self.assertFalse(self.index.overlaps(self.at(3.5), self.at(5), exclude=2))
+
+    def test_busy(self):
+        """Test that adjacent reservations are merged and clipped to the window."""
+        self.assertEqual(
+            self.index.busy(self.at(2), self.at(7)),
+            [(self.at(2), self.at(4)), (self.at(6), self.at(7))],
+        )
+        self.assertEqual(
+            self.index.busy(self.at(0), self.at(5), exclude=1),
+            [(self.at(3), self.at(4))],
+        )
+
+    def test_free_slot(self):
+        """Test that the earliest gap that is long enough is found."""
+        self.assertEqual(
+            self.index.free_slot(timedelta(hours=1), self.at(0), self.at(10)),
+            (self.at(0), self.at(1)),
+        )
+        self.assertEqual(
+            self.index.free_slot(timedelta(hours=2), self.at(0), self.at(10)),
+            (self.at(4), self.at(6)),
+        )
+        self.assertEqual(
+            self.index.free_slot(timedelta(hours=3), self.at(2), self.at(10)), None
+        )
+
+
+class IndexInvalidationTestCase(TestCase):
+    """Tests for loading the indexes and invalidating them on changes."""
+
+    def setUp(self):
+        self.item = G(ReservableItem)
+        self.start = timezone.now() + timedelta(days=1)
+        self.end = self.start + timedelta(hours=2)
+
+    def test_loaded_once(self):
+        """Test that an index is reused until a reservation of the item changes."""
+        with self.assertNumQueries(1):
+            get_index(self.item.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(is_reserved(self.item.pk, self.start, self.end))
+            busy_intervals([self.item.pk], self.start, self.end)
+
+        reservation = G(
+            Reservation, reserved_item=self.item, start=self.start, end=self.end
+        )
+        self.assertTrue(is_reserved(self.item.pk, self.start, self.end))
+        self.assertFalse(
+            is_reserved(self.item.pk, self.start, self.end, exclude=reservation.pk)
+        )
+
+        reservation.delete()
+        self.assertFalse(is_reserved(self.item.pk, self.start, self.end))
+
+    def test_moved(self):
+        """Test that moving a reservation to another item invalidates both items."""
+        other = G(ReservableItem)
+        reservation = G(
+            Reservation, reserved_item=self.item, start=self.start, end=self.end
+        )
+        reservation = Reservation.objects.get(pk=reservation.pk)
+        self.assertTrue(is_reserved(self.item.pk, self.start, self.end))
+        self.assertFalse(is_reserved(other.pk, self.start, self.end))
+
+        reservation.reserved_item = other
+        reservation.save()
+        self.assertFalse(is_reserved(self.item.pk, self.start, self.end))
+        self.assertTrue(is_reserved(other.pk, self.start, self.end))
+
+    def test_past(self):
+        """Test that periods before the index are checked in the database."""
+        start = timezone.now() - timedelta(days=7)
+        G(
+            Reservation,
+            reserved_item=self.item,
+            start=start,
+            end=start + timedelta(hours=1),
+        )
+        get_index(self.item.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                is_reserved(self.item.pk, start, start + timedelta(hours=2))
+            )
+
+
+class BenchmarkTestCase(TestCase):
+    """Tests for running the benchmark of the conflict checks."""
+
+    def test_results(self):
+        """Test that the methods agree and the data is rolled back."""
+        out = StringIO()
+        call_command(
+            "benchmark_availability",
+            "--items=2",
+            "--weeks=1",
+            "--checks=50",
+            stdout=out,
+        )
+        results = json.loads(out.getvalue())
+        self.assertEqual(results["reservations"], 42)
+        conflicts = {
+            method: result["conflicts"] for method, result in results["methods"].items()
+        }
+        self.assertGreater(conflicts["index"], 0)
+        self.assertEqual(conflicts["overlapping"], conflicts["index"])
+        self.assertGreaterEqual(conflicts["predicates"], conflicts["index"])
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(ReservableItem.objects.exists())
@@ -1,7 +1,10 @@
 # TODO remove line too long ignores.
 import datetime
+from io import StringIO
+from unittest import skipIf, skipUnless
 
-from django.db import IntegrityError
+from django.core.management import call_command
+from django.db import IntegrityError, connection
 from django.forms import ValidationError
 from django.test import TestCase
 from django_dynamic_fixture import G
@@ -10,6 +13,7 @@ from loefsys.members.models.user import User
 from loefsys.reservations.models import Boat, Material, ReservableType, Reservation
 from loefsys.reservations.models.choices import Locations, ReservableCategories
 from loefsys.reservations.models.reservable import ReservableItem
+from loefsys.reservations.overlap import OVERLAP_MESSAGE
 
 
 class BoatTestCase(TestCase):
@@ -264,3 +268,67 @@ class ReservationTestCase(TestCase):
             )
             reservation.save()
             reservation.clean()
+
+    def reserve(self, start_hour, end_hour):
+        """Build a reservation of the reservable item on the first of January."""
+        return Reservation(
+            reserved_item=self.reservable_item,
+            reservee_user=self.reservee_user,
+            start=datetime.datetime(2025, 1, 1, hour=start_hour, tzinfo=datetime.UTC),
+            end=datetime.datetime(2025, 1, 1, hour=end_hour, tzinfo=datetime.UTC),
+        )
+
+    def test_back_to_back(self):
+        """Tests that a reservation can start when the previous one ends."""
+        self.reserve(11, 12).save()
+        reservation = self.reserve(12, 13)
+        reservation.clean()
+        reservation.save()
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_overlap_on_save(self):
+        """Tests that saving an overlapping reservation fails without cleaning it."""
+        self.reserve(11, 13).save()
+        with self.assertRaisesMessage(ValidationError, str(OVERLAP_MESSAGE)):
+            self.reserve(12, 14).save()
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_overlapping(self):
+        """Tests that the reservations overlapping a period are found."""
+        reservation = self.reserve(11, 13)
+        reservation.save()
+        start = datetime.datetime(2025, 1, 1, hour=12, tzinfo=datetime.UTC)
+        self.assertEqual(
+            list(
+                Reservation.objects.overlapping(
+                    start, start + datetime.timedelta(hours=2)
+                )
+            ),
+            [reservation],
+        )
+        self.assertFalse(
+            Reservation.objects.overlapping(
+                start + datetime.timedelta(hours=1), start + datetime.timedelta(hours=2)
+            ).exists()
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "Requires exclusion constraints.")
+    def test_exclusion_constraint(self):
+        """Tests that the database rejects overlaps that bypass the model."""
+        self.reserve(11, 13).save()
+        with self.assertRaises(IntegrityError):
+            Reservation.objects.bulk_create([self.reserve(12, 14)])
+
+    @skipIf(connection.vendor == "postgresql", "Overlaps can't be stored.")
+    def test_resolve_overlaps(self):
+        """Tests that the reservations overlapping an earlier one are deleted."""
+        first, _, third, _ = Reservation.objects.bulk_create(
+            [self.reserve(hour, hour + 2) for hour in range(11, 15)]
+        )
+        out = StringIO()
+        call_command("resolve_reservation_overlaps", stdout=out)
+        self.assertIn("2 reservations overlap", out.getvalue())
+        self.assertEqual(Reservation.objects.count(), 4)
+
+        call_command("resolve_reservation_overlaps", "--resolve", stdout=StringIO())
+        self.assertQuerySetEqual(Reservation.objects.order_by("start"), [first, third])
@@ -0,0 +1,149 @@
+"""Module defining the tests for recurring reservations."""
+
+from datetime import datetime, timedelta
+
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.members.models.user import User
+from loefsys.reservations.caching import is_reserved
+from loefsys.reservations.models import ReservableType, Reservation
+from loefsys.reservations.models.choices import Locations, ReservableCategories
+from loefsys.reservations.models.reservable import ReservableItem
+from loefsys.reservations.recurrence import (
+    MAX_OCCURRENCES,
+    book_occurrences,
+    get_occurrences,
+)
+from loefsys.reservations.views import RecurringReservationCreateView
+from loefsys.tests.utils import QueryBudgetTestMixin
+
+SEASON = 30
+"""The number of weeks of the season that is booked in the tests."""
+
+
+class OccurrencesTestCase(TestCase):
+    """Tests for expanding a recurrence rule into its occurrences."""
+
+    def test_weekly(self):
+        """Test that the occurrences keep their local time across daylight saving."""
+        first = timezone.make_aware(datetime(2025, 9, 2, 19))
+        occurrences = get_occurrences("FREQ=WEEKLY;COUNT=10", first, timedelta(hours=2))
+        self.assertEqual(len(occurrences), 10)
+        self.assertEqual(occurrences[0], (first, first + timedelta(hours=2)))
+        for start, end in occurrences:
+            self.assertEqual(timezone.localtime(start).hour, 19)
+            self.assertEqual(end - start, timedelta(hours=2))
+
+    def test_invalid(self):
+        """Test that unbounded, overlapping and invalid rules are rejected."""
+        first = timezone.now()
+        with self.assertRaisesMessage(ValueError, str(MAX_OCCURRENCES)):
+            get_occurrences("FREQ=DAILY", first, timedelta(hours=1))
+        with self.assertRaisesMessage(ValueError, "overlap"):
+            get_occurrences("FREQ=DAILY;COUNT=3", first, timedelta(days=2))
+        with self.assertRaises(ValueError):
+            get_occurrences("FREQ=FORTNIGHTLY", first, timedelta(hours=1))
+
+
+class BookOccurrencesTestCase(QueryBudgetTestMixin, TestCase):
+    """Tests for booking the occurrences of a recurring reservation."""
+
+    def setUp(self):
+        self.item = G(
+            ReservableItem,
+            location=Locations.KRAAIJ,
+            reservable_type=G(ReservableType, category=ReservableCategories.ROOM),
+            is_reservable=True,
+        )
+        self.user = G(User, picture=None)
+        self.first = timezone.localtime().replace(
+            hour=19, minute=0, second=0, microsecond=0
+        ) + timedelta(days=1)
+        self.occurrences = get_occurrences(
+            f"FREQ=WEEKLY;COUNT={SEASON}", self.first, timedelta(hours=2)
+        )
+        # A reservation overlapping the second occurrence and one spanning the
+        # fourth and fifth.
+        self.conflicts = [
+            G(
+                Reservation,
+                reserved_item=self.item,
+                start=self.occurrences[1][0] + timedelta(hours=1),
+                end=self.occurrences[1][1] + timedelta(hours=1),
+            ),
+            G(
+                Reservation,
+                reserved_item=self.item,
+                start=self.occurrences[3][0],
+                end=self.occurrences[4][1],
+            ),
+        ]
+
+    def test_book(self):
+        """Test that the occurrences without conflicts are booked at once."""
+        self.assertFalse(is_reserved(self.item.pk, *self.occurrences[0]))
+        with self.assertNumQueries(5):
+            results = book_occurrences(
+                Reservation(reserved_item=self.item, reservee_user=self.user),
+                self.occurrences,
+            )
+
+        self.assertEqual(len(results), SEASON)
+        self.assertEqual(sum(result.booked for result in results), SEASON - 3)
+        self.assertEqual(results[1].conflicts, self.conflicts[:1])
+        self.assertEqual(results[3].conflicts, self.conflicts[1:])
+        self.assertEqual(results[4].conflicts, self.conflicts[1:])
+        for result in results:
+            self.assertEqual(result.booked, not result.conflicts)
+            if result.booked:
+                self.assertEqual(
+                    (result.reservation.start, result.reservation.end),
+                    (result.start, result.end),
+                )
+        self.assertEqual(
+            Reservation.objects.filter(reservee_user=self.user).count(), SEASON - 3
+        )
+        self.assertTrue(is_reserved(self.item.pk, *self.occurrences[0]))
+
+    def test_view(self):
+        """Test that a season is booked with a single request."""
+        request = RequestFactory().post(
+            "/",
+            {
+                "reserved_item": self.item.pk,
+                "start": self.first.strftime("%Y-%m-%dT%H:%M"),
+                "end": (self.first + timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M"),
+                "recurrence": f"FREQ=WEEKLY;COUNT={SEASON}",
+            },
+        )
+        request.user = self.user
+        with self.assertQueryBudget("reservations:reservation-add-recurring", "POST"):
+            response = RecurringReservationCreateView.as_view()(
+                request, location=Locations.KRAAIJ
+            )
+        self.assertEqual(response.context_data["booked_count"], SEASON - 3)
+        self.assertEqual(
+            [result.booked for result in response.context_data["results"][:5]],
+            [True, False, True, False, False],
+        )
+
+    def test_view_invalid(self):
+        """Test that an item of another location can't be booked."""
+        request = RequestFactory().post(
+            "/",
+            {
+                "reserved_item": self.item.pk,
+                "start": self.first.strftime("%Y-%m-%dT%H:%M"),
+                "end": (self.first + timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M"),
+                "recurrence": "FREQ=WEEKLY;COUNT=2",
+            },
+        )
+        request.user = self.user
+        response = RecurringReservationCreateView.as_view()(
+            request, location=Locations.BOARDROOM
+        )
+        self.assertIn("reserved_item", response.context_data["form"].errors)
+        self.assertNotIn("results", response.context_data)
+        self.assertEqual(Reservation.objects.count(), len(self.conflicts))
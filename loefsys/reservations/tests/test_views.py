@@ -0,0 +1,189 @@
+"""Module defining the tests for the views of the reservations."""
+
+from datetime import datetime, timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_dynamic_fixture import G
+
+from loefsys.members.models.user import User
+from loefsys.reservations.models import ReservableType, Reservation
+from loefsys.reservations.models.choices import Locations
+from loefsys.reservations.models.reservable import ReservableItem
+from loefsys.tests.utils import QueryBudgetTestMixin
+
+
+class ReservationListViewTestCase(QueryBudgetTestMixin, TestCase):
+    """Tests for the list of reservations of the user."""
+
+    def test_query_budget(self):
+        """Test that the reserved items are loaded with the reservations."""
+        user = G(User, picture=None)
+        now = timezone.now()
+        for days in range(1, 6):
+            G(
+                Reservation,
+                reservee_user=user,
+                reserved_item=G(ReservableItem),
+                start=now + timedelta(days=days),
+                end=now + timedelta(days=days, hours=2),
+            )
+        self.client.force_login(user)
+        with self.assertQueryBudget("reservations:reservations"):
+            response = self.client.get(reverse("reservations:reservations"))
+        self.assertEqual(len(response.context["reservations"]), 5)
+
+
+class CheckAvailabilityTestCase(TestCase):
+    """Tests for checking whether an item is available during a timeslot."""
+
+    def setUp(self):
+        self.item = G(ReservableItem)
+        self.reservation = G(
+            Reservation,
+            reserved_item=self.item,
+            start=timezone.make_aware(datetime(2025, 6, 1, 12)),
+            end=timezone.make_aware(datetime(2025, 6, 1, 14)),
+        )
+        self.client.force_login(G(User, picture=None))
+
+    def check(self, start, end, **params):
+        """Check the availability of the item between two times on the first of June."""
+        response = self.client.get(
+            reverse("reservations:check-availability"),
+            {
+                "start": f"2025-06-01T{start}",
+                "end": f"2025-06-01T{end}",
+                "reserved_item": self.item.pk,
+                **params,
+            },
+        )
+        return response.json()["available"]
+
+    def test_available(self):
+        """Test that the item is available before and after the reservation."""
+        self.assertTrue(self.check("10:00", "12:00"))
+        self.assertTrue(self.check("14:00", "16:00"))
+
+    def test_not_available(self):
+        """Test that the item isn't available during the reservation."""
+        self.assertFalse(self.check("13:00", "15:00"))
+        self.assertFalse(self.check("11:00", "15:00"))
+        self.assertFalse(self.check("15:00", "14:00"))
+        self.assertTrue(self.check("13:00", "15:00", object_pk=self.reservation.pk))
+
+
+class AvailabilityViewTestCase(QueryBudgetTestMixin, TestCase):
+    """Tests for the availability of all items at a location."""
+
+    def setUp(self):
+        self.boats = G(ReservableType, name="Valk")
+        self.items = [
+            G(ReservableItem, location=Locations.KRAAIJ, reservable_type=self.boats),
+            G(ReservableItem, location=Locations.KRAAIJ),
+            G(ReservableItem, location=Locations.BOARDROOM),
+        ]
+        G(
+            Reservation,
+            reserved_item=self.items[0],
+            start=timezone.make_aware(datetime(2025, 6, 1, 12)),
+            end=timezone.make_aware(datetime(2025, 6, 1, 14)),
+        )
+        self.client.force_login(G(User, picture=None))
+        self.url = reverse(
+            "reservations:availability", kwargs={"location": Locations.KRAAIJ}
+        )
+
+    def test_availability(self):
+        """Test that the busy intervals of the items at the location are listed."""
+        with self.assertQueryBudget("reservations:availability"):
+            response = self.client.get(
+                self.url, {"start": "2025-06-01", "end": "2025-06-02"}
+            ).json()
+        self.assertEqual(
+            [item["id"] for item in response["items"]],
+            [self.items[0].pk, self.items[1].pk],
+        )
+        busy = [
+            [datetime.fromisoformat(time) for time in interval]
+            for interval in response["items"][0]["busy"]
+        ]
+        self.assertEqual(
+            busy,
+            [
+                [
+                    timezone.make_aware(datetime(2025, 6, 1, 12)),
+                    timezone.make_aware(datetime(2025, 6, 1, 14)),
+                ]
+            ],
+        )
+        self.assertEqual(response["items"][1]["busy"], [])
+
+    def test_reservable_type(self):
+        """Test that the items can be filtered on their type."""
+        response = self.client.get(
+            self.url,
+            {"start": "2025-06-01", "end": "2025-06-02", "reservable_type": "Valk"},
+        ).json()
+        self.assertEqual([item["id"] for item in response["items"]], [self.items[0].pk])
+
+    def test_invalid(self):
+        """Test that an invalid or too long window is rejected."""
+        for start, end in (("2025-06-02", "2025-06-01"), ("2025-06-01", "2026-06-01")):
+            response = self.client.get(self.url, {"start": start, "end": end})
+            self.assertEqual(response.status_code, 400)
+        url = reverse("reservations:availability", kwargs={"location": 99})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class NextAvailableViewTestCase(TestCase):
+    """Tests for searching the earliest free slots."""
+
+    def setUp(self):
+        self.boats = G(ReservableType, name="Valk")
+        self.items = [
+            G(ReservableItem, reservable_type=self.boats, is_reservable=True)
+            for _ in range(2)
+        ]
+        G(ReservableItem, reservable_type=self.boats, is_reservable=False)
+        G(
+            Reservation,
+            reserved_item=self.items[0],
+            start=timezone.make_aware(datetime(2025, 6, 1, 12)),
+            end=timezone.make_aware(datetime(2025, 6, 1, 14)),
+        )
+        self.client.force_login(G(User, picture=None))
+        self.url = reverse("reservations:next-available")
+
+    def search(self, **params):
+        """Search the slots from noon on the first of June."""
+        return self.client.get(
+            self.url, {"start": "2025-06-01T12:00", "duration": 60, **params}
+        )
+
+    def test_item(self):
+        """Test that the slots of an item start after its reservations."""
+        slots = self.search(reserved_item=self.items[0].pk, count=1).json()["slots"]
+        self.assertEqual(
+            datetime.fromisoformat(slots[0]["start"]),
+            timezone.make_aware(datetime(2025, 6, 1, 14)),
+        )
+
+    def test_type(self):
+        """Test that the slots of all reservable items of the type are searched."""
+        slots = self.search(reservable_type="Valk", count=3).json()["slots"]
+        self.assertEqual(
+            [slot["item"] for slot in slots],
+            [self.items[1].pk, self.items[1].pk, self.items[0].pk],
+        )
+
+    def test_invalid(self):
+        """Test that invalid searches are rejected."""
+        for params in (
+            {},
+            {"reservable_type": "Valk", "duration": 0},
+            {"reservable_type": "Valk", "horizon": 365},
+            {"reservable_type": "Valk", "count": "many"},
+        ):
+            self.assertEqual(self.search(**params).status_code, 400)
@@ -3,7 +3,10 @@
 from django.urls import path
 
 from .views import (
+    AvailabilityView,
     LogCreateView,
+    NextAvailableView,
+    RecurringReservationCreateView,
     ReservationCreateView,
     ReservationDeleteView,
     ReservationDetailView,
@@ -16,6 +19,11 @@ app_name = "reservations"
 urlpatterns = [
     path("", ReservationListView.as_view(), name="reservations"),
     path("add/<int:location>", ReservationCreateView.as_view(), name="reservation-add"),
+    path(
+        "add/recurring/<int:location>",
+        RecurringReservationCreateView.as_view(),
+        name="reservation-add-recurring",
+    ),
     path(
         "update/<int:pk>/<int:location>",
         ReservationUpdateView.as_view(),
@@ -33,5 +41,9 @@ urlpatterns = [
         ReservationUpdateView.check_availability,
         name="check-availability",
     ),
+    path(
+        "availability/<int:location>", AvailabilityView.as_view(), name="availability"
+    ),
+    path("availability/next", NextAvailableView.as_view(), name="next-available"),
     path("add/log/<int:pk>", LogCreateView.as_view(), name="log-add"),
 ]
@@ -1,24 +1,64 @@
 """Module defining the class-based views for the reservations."""
 
+from datetime import datetime, timedelta
+
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+from django.core.exceptions import ValidationError
 from django.db.models.functions import Lower
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
 from django.views.generic.detail import DetailView
-from django.views.generic.edit import CreateView, DeleteView, UpdateView
+from django.views.generic.edit import CreateView, DeleteView, FormView, UpdateView
 from django.views.generic.list import ListView
 
+from loefsys.reservations.availability import (
+    MAX_WINDOW,
+    busy_intervals,
+    find_free_slots,
+)
+from loefsys.reservations.caching import is_reserved
 from loefsys.reservations.forms import (
     CreateLogForm,
     CreateReservationForm,
+    RecurringReservationForm,
     SortByReservationForm,
 )
-from loefsys.reservations.models.choices import ReservableCategories
+from loefsys.reservations.models.choices import Locations, ReservableCategories
 from loefsys.reservations.models.log import Log, Question
 from loefsys.reservations.models.reservable import ReservableItem, ReservableType
 from loefsys.reservations.models.reservation import Reservation
+from loefsys.reservations.recurrence import book_occurrences
+
+
+def parse_period(params) -> tuple[datetime, datetime] | None:
+    """Parse the period of a reservation from the parameters of a request.
+
+    Parameters
+    ----------
+    params : ~django.http.QueryDict
+        The parameters, with the ``start`` and ``end`` in ISO 8601 format. Times without
+        a time zone are in the current time zone.
+
+    Returns
+    -------
+    tuple of ~datetime.datetime and ~datetime.datetime, None
+        The start and the end, or ``None`` if either is missing or invalid, or if the
+        end isn't after the start.
+    """
+    try:
+        start, end = (parse_datetime(params.get(key) or "") for key in ("start", "end"))
+    except ValueError:
+        return None
+    if start is None or end is None:
+        return None
+    start, end = (
+        timezone.make_aware(value) if timezone.is_naive(value) else value
+        for value in (start, end)
+    )
+    return (start, end) if start < end else None
 
 
 class ReservationListView(LoginRequiredMixin, ListView):
@@ -43,9 +83,13 @@ class ReservationListView(LoginRequiredMixin, ListView):
                 case _:
                     sort_by = form.cleaned_data["sort_by"]
 
-        return Reservation.objects.filter(
-            reservee_user=self.request.user, start__gt=timezone.now()
-        ).order_by(sort_by)
+        return (
+            Reservation.objects.filter(
+                reservee_user=self.request.user, start__gt=timezone.now()
+            )
+            .select_related("reserved_item")
+            .order_by(sort_by)
+        )
 
     def get_context_data(self, **kwargs):
         """Include the sort form in the context data."""
@@ -79,9 +123,17 @@ class ReservationCreateView(LoginRequiredMixin, CreateView):
         return form
 
     def form_valid(self, form):
-        """Add the user who made the reservation to the Reservation instance."""
+        """Add the user who made the reservation to the Reservation instance.
+
+        A reservation that overlaps one saved after the form was validated is
+        rejected when saving, which is shown as an error of the form.
+        """
         form.instance.reservee_user = self.request.user
-        return super().form_valid(form)
+        try:
+            return super().form_valid(form)
+        except ValidationError as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
 
     def get_context_data(self, **kwargs):
         """Include the location in the context data."""
@@ -96,25 +148,60 @@ class ReservationCreateView(LoginRequiredMixin, CreateView):
     @staticmethod
     def check_availability(request):
         """Check if an item is available during the given timeslot."""
-        start = request.GET.get("start")
-        end = request.GET.get("end")
-        reserved_item_id = request.GET.get("reserved_item")
-
-        if start < end:
-            conflicts = Reservation.objects.filter(
-                reserved_item_id=reserved_item_id
-            ).filter(
-                Q(start__range=(start, end))
-                | Q(end__range=(start, end))
-                | Q(start__lt=start, end__gt=end)
-            )
-            available = not conflicts.exists()
-        else:
-            available = False
+        period = parse_period(request.GET)
+        item = request.GET.get("reserved_item", "")
+        available = (
+            period is not None
+            and item.isdigit()
+            and not is_reserved(int(item), *period)
+        )
 
         return JsonResponse({"available": available})
 
 
+class RecurringReservationCreateView(LoginRequiredMixin, FormView):
+    """View to reserve an item at the occurrences of a recurrence rule at once.
+
+    The occurrences without conflicts are booked, and the page lists for each
+    occurrence whether it was booked or which reservations it conflicts with, see
+    :func:`~loefsys.reservations.recurrence.book_occurrences`.
+    """
+
+    form_class = RecurringReservationForm
+    template_name = "reservations/recurring_reservation_form.html"
+
+    def get_form(self, form_class=None):
+        """Include the items at the location in the form."""
+        form = super().get_form(form_class)
+        form.fields["reserved_item"].queryset = ReservableItem.objects.filter(
+            location=self.kwargs.get("location")
+        ).order_by("-is_reservable")
+        return form
+
+    def form_valid(self, form):
+        """Book the occurrences and show the result of each occurrence."""
+        reservation = form.cleaned_data["reservation"]
+        reservation.reservee_user = self.request.user
+        try:
+            results = book_occurrences(reservation, form.cleaned_data["occurrences"])
+        except ValidationError as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
+        return self.render_to_response(
+            self.get_context_data(
+                form=form,
+                results=results,
+                booked_count=sum(result.booked for result in results),
+            )
+        )
+
+    def get_context_data(self, **kwargs):
+        """Include the location in the context data."""
+        context = super().get_context_data(**kwargs)
+        context["location"] = self.kwargs.get("location")
+        return context
+
+
 class ReservationUpdateView(LoginRequiredMixin, UpdateView):
     """Reservation update view."""
 
@@ -140,9 +227,17 @@ class ReservationUpdateView(LoginRequiredMixin, UpdateView):
         return form
 
     def form_valid(self, form):
-        """Add the user who made the reservation to the Reservation instance."""
+        """Add the user who made the reservation to the Reservation instance.
+
+        A reservation that overlaps one saved after the form was validated is
+        rejected when saving, which is shown as an error of the form.
+        """
         form.instance.reservee_user = self.request.user
-        return super().form_valid(form)
+        try:
+            return super().form_valid(form)
+        except ValidationError as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
 
     def get_context_data(self, **kwargs):
         """Include the location in the context data."""
@@ -164,24 +259,18 @@ class ReservationUpdateView(LoginRequiredMixin, UpdateView):
 
         Excluding the to be updated reservation as conflict.
         """
-        start = request.GET.get("start")
-        end = request.GET.get("end")
-        reserved_item_id = request.GET.get("reserved_item")
-        object_pk = request.GET.get("object_pk")
-
-        if start < end:
-            conflicts = (
-                Reservation.objects.exclude(pk=object_pk)
-                .filter(reserved_item_id=reserved_item_id)
-                .filter(
-                    Q(start__range=(start, end))
-                    | Q(end__range=(start, end))
-                    | Q(start__lt=start, end__gt=end)
-                )
+        period = parse_period(request.GET)
+        item = request.GET.get("reserved_item", "")
+        reservation = request.GET.get("object_pk", "")
+        available = (
+            period is not None
+            and item.isdigit()
+            and not is_reserved(
+                int(item),
+                *period,
+                exclude=int(reservation) if reservation.isdigit() else None,
             )
-            available = not conflicts.exists()
-        else:
-            available = False
+        )
 
         return JsonResponse({"available": available})
 
@@ -204,6 +293,159 @@ class ReservationDetailView(LoginRequiredMixin, DetailView):
         return Reservation.objects.filter(reservee_user=self.request.user)
 
 
+class AvailabilityView(LoginRequiredMixin, View):
+    """JSON API with the availability of all items at a location during a window.
+
+    The following query parameters are accepted:
+
+    ``start``, ``end``
+        The window, in ISO 8601, at most
+        :data:`~loefsys.reservations.availability.MAX_WINDOW` long.
+    ``reservable_type``
+        The name of a type, to only include the items of that type.
+    ``exclude``
+        The primary key of a reservation to leave out, such as the reservation that
+        is being changed.
+
+    For each item, the response contains the merged intervals in which it is
+    reserved. The reservations of all items are loaded with a single query, see
+    :func:`~loefsys.reservations.availability.busy_intervals`.
+    """
+
+    def get(self, request, location):
+        """Get the availability of the items."""
+        if location not in Locations.values:
+            raise Http404
+        period = parse_period(request.GET)
+        if period is None:
+            return JsonResponse({"error": "Invalid start or end."}, status=400)
+        start, end = period
+        if end - start > MAX_WINDOW:
+            return JsonResponse({"error": "The window is too long."}, status=400)
+        try:
+            exclude = (
+                int(request.GET["exclude"]) if request.GET.get("exclude") else None
+            )
+        except ValueError:
+            return JsonResponse({"error": "Invalid reservation."}, status=400)
+
+        items = ReservableItem.objects.filter(location=location).order_by("pk")
+        if reservable_type := request.GET.get("reservable_type"):
+            items = items.filter(reservable_type__name=reservable_type)
+        items = list(items.values("pk", "name", "is_reservable"))
+        busy = busy_intervals([item["pk"] for item in items], start, end, exclude)
+
+        return JsonResponse(
+            {
+                "start": start,
+                "end": end,
+                "items": [
+                    {
+                        "id": item["pk"],
+                        "name": item["name"],
+                        "is_reservable": item["is_reservable"],
+                        "busy": busy[item["pk"]],
+                    }
+                    for item in items
+                ],
+            }
+        )
+
+
+class NextAvailableView(LoginRequiredMixin, View):
+    """JSON API with the earliest free slots of an item or of the items of a type.
+
+    The following query parameters are accepted:
+
+    ``reserved_item``
+        The primary key of the item to search the slots of.
+    ``reservable_type``
+        The name of a type, to search the slots of all reservable items of that type,
+        if no item is given.
+    ``location``
+        The location of the items of the type, optional.
+    ``duration``
+        The duration of the slots in minutes.
+    ``start``
+        The earliest start of the slots in ISO 8601, now by default.
+    ``horizon``
+        The number of days after the start to search, at most
+        :data:`~loefsys.reservations.availability.MAX_WINDOW`.
+    ``count``
+        The maximum number of slots, at most :attr:`max_count`.
+
+    The reservations of all candidate items are loaded with a single query, see
+    :func:`~loefsys.reservations.availability.find_free_slots`.
+    """
+
+    default_horizon = 14
+    default_count = 5
+    max_count = 20
+
+    def get(self, request):
+        """Get the earliest free slots."""
+        try:
+            items = self.get_items(request)
+            if "duration" not in request.GET:
+                raise ValueError("The duration is required.")
+            duration = timedelta(minutes=int(request.GET["duration"]))
+            if duration <= timedelta(0):
+                raise ValueError("The duration must be positive.")
+            start = timezone.now()
+            if "start" in request.GET:
+                start = parse_datetime(request.GET["start"])
+                if start is None:
+                    raise ValueError("Invalid start.")
+                if timezone.is_naive(start):
+                    start = timezone.make_aware(start)
+            horizon = timedelta(
+                days=int(request.GET.get("horizon", self.default_horizon))
+            )
+            if not duration <= horizon <= MAX_WINDOW:
+                raise ValueError("Invalid horizon.")
+            count = min(
+                int(request.GET.get("count", self.default_count)), self.max_count
+            )
+            if count < 1:
+                raise ValueError("The count must be positive.")
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+
+        names = dict(items.values_list("pk", "name"))
+        slots = find_free_slots(names, duration, start, start + horizon, count)
+        return JsonResponse(
+            {
+                "slots": [
+                    {
+                        "item": item_pk,
+                        "name": names[item_pk],
+                        "start": slot_start,
+                        "end": slot_end,
+                    }
+                    for item_pk, slot_start, slot_end in slots
+                ]
+            }
+        )
+
+    def get_items(self, request):
+        """Get the candidate items of the request.
+
+        Raises
+        ------
+        ValueError
+            If neither an item nor a type is given.
+        """
+        items = ReservableItem.objects.filter(is_reservable=True).order_by("pk")
+        if reserved_item := request.GET.get("reserved_item"):
+            return items.filter(pk=int(reserved_item))
+        if reservable_type := request.GET.get("reservable_type"):
+            items = items.filter(reservable_type__name=reservable_type)
+            if location := request.GET.get("location"):
+                items = items.filter(location=int(location))
+            return items
+        raise ValueError("Either an item or a type is required.")
+
+
 class LogCreateView(LoginRequiredMixin, CreateView):
     """Reservation create view."""
 
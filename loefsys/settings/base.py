@@ -2,7 +2,7 @@
 
 from collections.abc import Sequence
 from pathlib import Path
-from typing import cast
+from typing import ClassVar, cast
 
 from cbs import BaseSettings as ClassySettings, env
 from django_components import ComponentsSettings
@@ -37,6 +37,46 @@ class BaseSettings(ClassySettings):
 
     TAILWIND_APP_NAME = "loefsys.theme"
 
+    QUERY_BUDGET_STRICT = denv.bool(False)
+    """Whether requests that exceed their query budget fail instead of being logged."""
+
+    QUERY_BUDGETS: ClassVar[dict[str, int | dict[str, int]]] = {
+        "events:event": {"GET": 3, "POST": 16},
+        "events:registration": 9,
+        "events:organizer_dashboard": 3,
+        "reservations:reservations": 3,
+        "reservations:availability": 4,
+        "reservations:reservation-add-recurring": 9,
+    }
+    """The maximum number of queries of a request for each URL name.
+
+    The budget of a URL name may also be set per HTTP method, see
+    :mod:`loefsys.querybudget`.
+    """
+
+    cache_url = denv("", key="CACHE_URL")
+    """The URL of the Redis server of the cache, such as ``redis://localhost:6379/1``.
+
+    The cache must be shared by all web and Celery processes, as the cache entries of
+    the events and the indexes of the reservations are invalidated through it.
+    """
+
+    def CACHES(self) -> dict:  # noqa N802 D102
+        if self.cache_url:
+            return {
+                "default": {
+                    "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                    "LOCATION": self.cache_url,
+                }
+            }
+        if not self.DEBUG:
+            raise ValueError("Environment variable DJANGO_CACHE_URL must be set.")
+        # The memory of a single process is only shared with itself, which is
+        # sufficient for the development server and the tests.
+        return {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+
     @env
     def NPM_BIN_PATH(self) -> str:  # noqa N802 D102
         return "npm"
@@ -80,5 +120,9 @@ class BaseSettings(ClassySettings):
 
     def MIDDLEWARE(self) -> Sequence[str]:  # noqa N802 D102
         middleware = ("django_browser_reload.middleware.BrowserReloadMiddleware",)
+        if not self.DEBUG:
+            return middleware
+        # The query budgets are enforced first, to record the queries of all middleware.
+        budget_middleware = ("loefsys.querybudget.QueryBudgetMiddleware",)
         debug_middleware = ("debug_toolbar.middleware.DebugToolbarMiddleware",)
-        return middleware + debug_middleware if self.DEBUG else middleware
+        return budget_middleware + middleware + debug_middleware
@@ -0,0 +1,35 @@
+"""Module containing the utilities shared by the tests of the apps."""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from loefsys.querybudget import describe_queries, get_query_budget
+
+
+class QueryBudgetTestMixin:
+    """Mixin for test cases that asserts the query budgets of views."""
+
+    @contextmanager
+    def assertQueryBudget(  # noqa: N802
+        self, view_name: str, method: str = "GET"
+    ) -> Iterator[CaptureQueriesContext]:
+        """Assert that the requests in the block stay within the budget of a view.
+
+        Parameters
+        ----------
+        view_name : str
+            The URL name of the view, which must have a budget.
+        method : str
+            The HTTP method of the requests, for views with a budget per method.
+        """
+        budget = get_query_budget(view_name, method)
+        if budget is None:
+            self.fail(f"{view_name} has no query budget for {method}.")
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = [query["sql"] for query in context.captured_queries]
+        if len(queries) > budget:
+            self.fail(describe_queries(view_name, budget, queries))